@@ -0,0 +1 @@
+"""Solkit benchmarks."""
@@ -0,0 +1 @@
+"""Broker benchmarks."""
@@ -0,0 +1,127 @@
+"""Benchmark the broker repository overhead against the in-memory broker, no Kafka cluster needed.
+
+Runs the produce, consume and retry paths for every consume mode and the replay, e.g.:
+
+    python -m benchmarks.broker.memory_throughput --messages 20000 --partitions 4
+"""
+
+import argparse
+import asyncio
+import datetime
+import logging
+import time
+
+from solkit.broker import BrokerRecord, BrokerRepository
+from solkit.broker.constants import BrokerConsumeMode
+from solkit.broker.memory import BrokerMemoryAdapter, BrokerMemoryCluster
+from solkit.broker.settings import BrokerKafkaConsumerSettings, BrokerKafkaProducerSettings
+
+TOPIC = 'benchmark'
+
+
+def reset_cluster(partitions: int) -> None:
+    """Start each benchmark on an empty in-memory cluster."""
+    BrokerMemoryCluster.reset()
+    BrokerMemoryCluster.get('memory').partitions = partitions
+
+
+def build_adapter(consume_mode: BrokerConsumeMode, retry_max_times: int) -> BrokerMemoryAdapter:
+    """Build an in-memory adapter consuming the benchmark topic."""
+    return BrokerMemoryAdapter(
+        producer_settings=BrokerKafkaProducerSettings(BROKER_BOOTSTRAP_SERVERS='memory'),
+        consumer_settings=BrokerKafkaConsumerSettings(
+            BROKER_BOOTSTRAP_SERVERS='memory',
+            BROKER_TOPICS=TOPIC,
+            BROKER_GROUP_ID='benchmark',
+            BROKER_CONSUME_MODE=consume_mode,
+            BROKER_RETRY_MAX_TIMES=retry_max_times,
+            BROKER_MAX_POLL_RECORDS=500,
+            BROKER_COMMIT_MAX_MESSAGES=500,
+        ),
+    )
+
+
+async def produce(messages: int, payload_size: int) -> float:
+    """Produce the messages in bulk and return the messages/s."""
+    adapter = BrokerMemoryAdapter(producer_settings=BrokerKafkaProducerSettings(BROKER_BOOTSTRAP_SERVERS='memory'))
+    await adapter.connect()
+    repository = BrokerRepository(adapter=adapter)
+    items = [(str(index), {'payload': 'x' * payload_size}) for index in range(messages)]
+    started_at = time.perf_counter()
+    await repository.produce_many(TOPIC, items)
+    return messages / (time.perf_counter() - started_at)
+
+
+async def benchmark_consume(
+    consume_mode: BrokerConsumeMode, messages: int, partitions: int, payload_size: int, retry: bool
+) -> float:
+    """Consume freshly produced messages, failing each once when retrying, and return the handled messages/s."""
+    reset_cluster(partitions)
+    await produce(messages, payload_size)
+    adapter = build_adapter(consume_mode, retry_max_times=1 if retry else 0)
+    await adapter.connect()
+    repository = BrokerRepository(adapter=adapter)
+    expected = messages * 2 if retry else messages
+    handled = 0
+    done = asyncio.Event()
+
+    async def handler(message: BrokerRecord) -> None:
+        nonlocal handled
+        handled += 1
+        if handled >= expected:
+            done.set()
+        if retry and message.retry_count == 0:
+            raise ValueError('retry')
+
+    started_at = time.perf_counter()
+    consumption = asyncio.create_task(repository.consume(handler, wait_time=0))
+    await done.wait()
+    elapsed = time.perf_counter() - started_at
+    await repository.stop()
+    await consumption
+    return handled / elapsed
+
+
+async def benchmark_replay(messages: int, partitions: int, payload_size: int) -> float:
+    """Replay freshly produced messages from the beginning and return the replayed messages/s."""
+    reset_cluster(partitions)
+    await produce(messages, payload_size)
+    adapter = build_adapter(BrokerConsumeMode.SEQUENTIAL, retry_max_times=0)
+    await adapter.connect()
+    repository = BrokerRepository(adapter=adapter)
+
+    async def handler(messages: list[BrokerRecord]) -> None:
+        for message in messages:
+            _ = message.data
+
+    progress = await repository.replay(handler, [TOPIC], since=datetime.datetime.fromtimestamp(0, datetime.UTC))
+    await adapter.disconnect()
+    return progress.rate
+
+
+async def main() -> None:
+    """Run the produce, consume and retry benchmarks for every consume mode, then the replay benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=10000)
+    parser.add_argument('--partitions', type=int, default=4)
+    parser.add_argument('--payload-size', type=int, default=512)
+    args = parser.parse_args()
+    logging.getLogger('solkit').setLevel(logging.CRITICAL)
+
+    print(f'{"benchmark":<24}{"messages/s":>14}')
+    reset_cluster(args.partitions)
+    produced = await produce(args.messages, args.payload_size)
+    print(f'{"produce_many":<24}{produced:>14.0f}')
+    for retry in (False, True):
+        for consume_mode in BrokerConsumeMode:
+            consumed = await benchmark_consume(
+                consume_mode, args.messages, args.partitions, args.payload_size, retry=retry
+            )
+            name = f'{"retry" if retry else "consume"} {consume_mode.value}'
+            print(f'{name:<24}{consumed:>14.0f}')
+    replayed = await benchmark_replay(args.messages, args.partitions, args.payload_size)
+    print(f'{"replay":<24}{replayed:>14.0f}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+"""Benchmark the producer throughput profiles against a Kafka cluster.
+
+Reads the usual ``BROKER_*`` environment variables, e.g.:
+
+    BROKER_BOOTSTRAP_SERVERS=localhost:9092 python -m benchmarks.broker.producer_profiles --messages 50000
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from solkit.broker import BrokerKafkaAdapter, BrokerRepository
+from solkit.broker.constants import BrokerKafkaProducerProfile
+from solkit.broker.settings import BrokerKafkaProducerSettings
+
+
+async def benchmark_profile(
+    profile: BrokerKafkaProducerProfile, topic: str, messages: int, payload_size: int
+) -> tuple[float, float]:
+    """Produce the messages with a profile and return the messages/s and the p99 ack latency in ms."""
+    settings = BrokerKafkaProducerSettings().model_copy(update={'profile': profile})
+    adapter = BrokerKafkaAdapter(producer_settings=settings)
+    await adapter.connect()
+    value = BrokerRepository._parse_message_value({'payload': 'x' * payload_size}, {})
+    latencies: list[float] = []
+
+    def record_latency(sent_at: float) -> None:
+        latencies.append((time.perf_counter() - sent_at) * 1000)
+
+    try:
+        started_at = time.perf_counter()
+        deliveries = []
+        for index in range(messages):
+            sent_at = time.perf_counter()
+            delivery = await adapter.producer.send(topic=topic, key=str(index).encode(), value=value)
+            delivery.add_done_callback(lambda _, sent_at=sent_at: record_latency(sent_at))
+            deliveries.append(delivery)
+        await asyncio.gather(*deliveries)
+        elapsed = time.perf_counter() - started_at
+    finally:
+        await adapter.producer.stop()
+    return messages / elapsed, statistics.quantiles(latencies, n=100)[98]
+
+
+async def main() -> None:
+    """Run the benchmark for every producer profile."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--topic', default='solkit-benchmark')
+    parser.add_argument('--messages', type=int, default=10000)
+    parser.add_argument('--payload-size', type=int, default=512)
+    args = parser.parse_args()
+
+    print(f'{"profile":<12}{"messages/s":>14}{"p99 ack ms":>14}')
+    for profile in BrokerKafkaProducerProfile:
+        throughput, p99 = await benchmark_profile(profile, args.topic, args.messages, args.payload_size)
+        print(f'{profile.value:<12}{throughput:>14.0f}{p99:>14.2f}')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -1,9 +1,32 @@
 """Solfacil Broker Package."""
 
 from .adapter import BrokerKafkaAdapter
+from .claim_check import BrokerCacheBlobStore, BrokerClaimCheck, BrokerFileBlobStore
+from .codecs import BrokerCodec, BrokerJsonCodec, BrokerMsgpackCodec, BrokerOrjsonCodec
+from .dedupe import BrokerDeduplicator
+from .exceptions import BrokerBatchException
+from .metrics import BrokerMetrics
+from .record import BrokerRecord
+from .replay import BrokerReplayProgress
 from .repository import BrokerRepository
+from .supervisor import BrokerSupervisor
+from .table import BrokerTable
 
 __all__ = [
+    'BrokerBatchException',
+    'BrokerCacheBlobStore',
+    'BrokerClaimCheck',
+    'BrokerCodec',
+    'BrokerDeduplicator',
+    'BrokerFileBlobStore',
+    'BrokerJsonCodec',
     'BrokerKafkaAdapter',
+    'BrokerMetrics',
+    'BrokerMsgpackCodec',
+    'BrokerOrjsonCodec',
+    'BrokerRecord',
+    'BrokerReplayProgress',
     'BrokerRepository',
+    'BrokerSupervisor',
+    'BrokerTable',
 ]
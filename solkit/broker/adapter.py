@@ -1,8 +1,11 @@
 import logging
+from collections.abc import Callable
 
 from aiokafka import AIOKafkaConsumer, AIOKafkaProducer
 
 from .abstracts import BrokerAdapterAbstract
+from .constants import BrokerConsumeLane
+from .rebalance import BrokerRebalanceListener
 from .settings import BrokerKafkaConsumerSettings, BrokerKafkaProducerSettings
 
 logger = logging.getLogger(__name__)
@@ -11,6 +14,9 @@ logger = logging.getLogger(__name__)
 class BrokerKafkaAdapter(BrokerAdapterAbstract):
     """Broker Kafka adapter."""
 
+    producer_class: Callable[..., AIOKafkaProducer] = AIOKafkaProducer
+    consumer_class: Callable[..., AIOKafkaConsumer] = AIOKafkaConsumer
+
     @classmethod
     def producer_config(cls) -> 'BrokerKafkaAdapter':
         """Create a producer configuration."""
@@ -34,34 +40,61 @@ class BrokerKafkaAdapter(BrokerAdapterAbstract):
         self._consumer_settings = consumer_settings
         self._producer: AIOKafkaProducer
         self._consumer: AIOKafkaConsumer
+        self._rebalance_listener = BrokerRebalanceListener()
+        self._lane: BrokerConsumeLane | None = None
 
     def __create_producer(self) -> None:
         if self._producer_settings is None:
             raise ValueError('Producer settings are not set')
-        self._producer = AIOKafkaProducer(
+        self._producer = self.producer_class(
             bootstrap_servers=self._producer_settings.bootstrap_servers,
             request_timeout_ms=self._producer_settings.request_timeout_ms,
             acks=self._producer_settings.parsed_acks(),
             connections_max_idle_ms=self._producer_settings.connections_max_idle_ms,
+            **self._producer_settings.parsed_profile(),
+            **self._producer_settings.parsed_transaction(),
         )
 
     def __create_consumer(self) -> None:
         if self._consumer_settings is None:
             raise ValueError('Consumer settings are not set')
-        self._consumer = AIOKafkaConsumer(
-            *self._consumer_settings.get_topics(),
+        self._consumer = self.consumer_class(
             bootstrap_servers=self._consumer_settings.bootstrap_servers,
             enable_auto_commit=self._consumer_settings.enable_auto_commit,
             request_timeout_ms=self._consumer_settings.request_timeout_ms,
             group_id=self._consumer_settings.group_id,
+            group_instance_id=self._consumer_settings.group_instance_id,
             max_poll_records=self._consumer_settings.max_poll_records,
             max_poll_interval_ms=self._consumer_settings.max_poll_interval_ms,
             session_timeout_ms=self._consumer_settings.session_timeout_ms,
             heartbeat_interval_ms=self._consumer_settings.heartbeat_interval_ms,
+            isolation_level=self._consumer_settings.isolation_level,
+        )
+        lane = self._lane or (BrokerConsumeLane.MAIN if self._consumer_settings.consume_lanes else None)
+        self._consumer.subscribe(topics=self._consumer_settings.get_topics(lane), listener=self._rebalance_listener)
+
+    def create_replay_consumer(self) -> AIOKafkaConsumer:
+        """Create a consumer outside of the consumer group, with large fetches, for manually assigned partitions.
+
+        It never commits, so the offsets of the consumer group are left untouched. An offset below the log start
+        offset resets to the first message still in the partition, instead of skipping the partition to its end.
+        """
+        return self.consumer_class(
+            bootstrap_servers=self.consumer_settings.bootstrap_servers,
+            enable_auto_commit=False,
+            request_timeout_ms=self.consumer_settings.request_timeout_ms,
+            group_id=None,
+            auto_offset_reset='earliest',
+            isolation_level=self.consumer_settings.isolation_level,
+            max_poll_records=self.consumer_settings.replay_max_records,
+            max_partition_fetch_bytes=self.consumer_settings.replay_max_partition_fetch_bytes,
         )
 
     async def __start_producer(self) -> None:
         logger.info(f'[ADAPTER][BROKER][ACKS: {self._producer_settings.acks}]')  # type: ignore
+        logger.info(f'[ADAPTER][BROKER][PRODUCER PROFILE: {self._producer_settings.profile}]')  # type: ignore
+        if self.transactional:
+            logger.info(f'[ADAPTER][BROKER][TRANSACTIONAL ID: {self._producer_settings.transactional_id}]')  # type: ignore
         self.__create_producer()
         await self._producer.start()
 
@@ -72,9 +105,20 @@ class BrokerKafkaAdapter(BrokerAdapterAbstract):
         logger.info(f'[ADAPTER][BROKER][TOPICS: {await self._consumer.topics()}]')
         # logger.info(f"[ADAPTER][BROKER][ASSIGNED PARTITIONS: {self._consumer.assignment()}]")
 
+    def lane(self, lane: BrokerConsumeLane) -> 'BrokerKafkaAdapter':
+        """Create an adapter consuming the topics of a lane with the lane settings, sharing this adapter producer.
+
+        The lane adapter only connects and disconnects its own consumer.
+        """
+        adapter = type(self)(consumer_settings=self.consumer_settings.lane_settings(lane))
+        adapter._lane = lane
+        adapter._producer = self._producer
+        return adapter
+
     async def connect(self) -> None:
         """Connect the producer and consumer."""
-        logger.info(f'[ADAPTER][BROKER][BOOTSTRAP SERVERS: {self._producer_settings.bootstrap_servers}]')  # type: ignore
+        settings = self._producer_settings or self._consumer_settings
+        logger.info(f'[ADAPTER][BROKER][BOOTSTRAP SERVERS: {settings.bootstrap_servers}]')  # type: ignore
         if self._producer_settings is not None:
             await self.__start_producer()
         if self._consumer_settings is not None:
@@ -85,11 +129,28 @@ class BrokerKafkaAdapter(BrokerAdapterAbstract):
         """Get the producer."""
         return self._producer
 
+    @property
+    def transactional(self) -> bool:
+        """Check if the producer is transactional."""
+        return self._producer_settings is not None and self._producer_settings.transactional_id is not None
+
     @property
     def consumer(self) -> AIOKafkaConsumer:
         """Get the consumer."""
         return self._consumer
 
+    @property
+    def rebalance_listener(self) -> BrokerRebalanceListener:
+        """Get the consumer rebalance listener."""
+        return self._rebalance_listener
+
+    @property
+    def consumer_settings(self) -> BrokerKafkaConsumerSettings:
+        """Get the consumer settings."""
+        if self._consumer_settings is None:
+            raise ValueError('Consumer settings are not set')
+        return self._consumer_settings
+
     async def __disconnect_producer(self) -> None:
         """Disconnect the producer."""
         await self._producer.flush()
@@ -103,5 +164,7 @@ class BrokerKafkaAdapter(BrokerAdapterAbstract):
 
     async def disconnect(self) -> None:
         """Disconnect the producer and consumer."""
-        await self.__disconnect_producer()
-        await self.__disconnect_consumer()
+        if self._producer_settings is not None:
+            await self.__disconnect_producer()
+        if self._consumer_settings is not None:
+            await self.__disconnect_consumer()
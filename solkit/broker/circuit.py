@@ -0,0 +1,146 @@
+import asyncio
+import logging
+from collections import deque
+
+from aiokafka import AIOKafkaConsumer
+from aiokafka.structs import TopicPartition
+
+from .constants import LOG_PREFIX, BrokerCircuitState
+from .exceptions import BrokerCircuitOpenException
+from .flow import BrokerPartitionPauser
+
+logger = logging.getLogger(__name__)
+
+
+class BrokerCircuitBreaker:
+    """Stop calling a failing handler instead of routing every message to the retry topics.
+
+    The circuit opens once the failure rate of the last ``window`` handler calls reaches ``failure_rate``:
+    the assigned partitions are paused and the messages failing or waiting to be handled are held, so their
+    offsets are not committed. After ``open_time`` seconds the circuit is half-open and a single held message
+    probes the handler, a success closes the circuit and resumes the partitions, a failure opens it again.
+    Partitions assigned while the circuit is not closed are paused as well, and the held messages of revoked
+    partitions are dropped since another member consumes them from their committed offsets.
+    """
+
+    reason = 'circuit'
+
+    def __init__(
+        self,
+        consumer: AIOKafkaConsumer,
+        pauser: BrokerPartitionPauser | None = None,
+        failure_rate: float = 0.5,
+        window: int = 20,
+        open_time: float = 30.0,
+    ) -> None:
+        """Initialize a closed circuit breaker."""
+        self._consumer = consumer
+        self._pauser = pauser or BrokerPartitionPauser(consumer)
+        self._failure_rate = failure_rate
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._open_time = open_time
+        self.state = BrokerCircuitState.CLOSED
+        self._changed = asyncio.Event()
+        self._probing = False
+        self._released = False
+        self._paused: set[TopicPartition] = set()
+        self._revocations: dict[TopicPartition, int] = {}
+        self._half_open: asyncio.TimerHandle | None = None
+
+    def _wake(self) -> None:
+        """Wake up the held messages."""
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def _transition(self, state: BrokerCircuitState) -> None:
+        """Move to a state, waking up the held messages."""
+        self.state = state
+        self._wake()
+        logger.warning(f'{LOG_PREFIX}[CIRCUIT][{state.upper()}]')
+
+    def _open(self) -> None:
+        """Open the circuit, pausing the assigned partitions until it is half-open."""
+        self._outcomes.clear()
+        self._probing = False
+        for partition in self._consumer.assignment() - self._paused:
+            self._pauser.pause(partition, self.reason)
+            self._paused.add(partition)
+        self._half_open = asyncio.get_running_loop().call_later(
+            self._open_time, self._transition, BrokerCircuitState.HALF_OPEN
+        )
+        self._transition(BrokerCircuitState.OPEN)
+
+    def _close(self) -> None:
+        """Close the circuit, resuming the paused partitions."""
+        self._probing = False
+        for partition in self._paused:
+            self._pauser.resume(partition, self.reason)
+        self._paused.clear()
+        self._transition(BrokerCircuitState.CLOSED)
+
+    def revocations(self, partition: TopicPartition) -> int:
+        """Get the number of times a partition was revoked."""
+        return self._revocations.get(partition, 0)
+
+    async def acquire(self, partition: TopicPartition | None = None, revocations: int = 0) -> bool:
+        """Wait until a message can be handled, returning whether it is the probe of a half-open circuit.
+
+        Raises:
+            BrokerCircuitOpenException: when the circuit breaker is released while not closed, or when
+                the partition of the message was revoked since its ``revocations`` were read.
+        """
+        while True:
+            if partition is not None and self.revocations(partition) != revocations:
+                raise BrokerCircuitOpenException(f'Partition {partition} revoked')
+            if self.state == BrokerCircuitState.CLOSED:
+                return False
+            if self._released:
+                raise BrokerCircuitOpenException(f'Circuit {self.state}')
+            if self.state == BrokerCircuitState.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            await self._changed.wait()
+
+    def success(self, probe: bool) -> None:
+        """Record a successful handler call, a successful probe closes the circuit."""
+        if probe:
+            self._close()
+        elif self.state == BrokerCircuitState.CLOSED:
+            self._outcomes.append(True)
+
+    def failure(self, probe: bool) -> bool:
+        """Record a failed handler call, returning whether the message is held instead of retried."""
+        if probe:
+            self._open()
+            return True
+        if self.state != BrokerCircuitState.CLOSED:
+            return True
+        self._outcomes.append(False)
+        if (
+            len(self._outcomes) == self._outcomes.maxlen
+            and self._outcomes.count(False) / len(self._outcomes) >= self._failure_rate
+        ):
+            self._open()
+            return True
+        return False
+
+    async def assign(self, partitions: set[TopicPartition]) -> None:
+        """Pause the assigned partitions while the circuit is not closed."""
+        if self.state == BrokerCircuitState.CLOSED:
+            return
+        for partition in partitions - self._paused:
+            self._pauser.pause(partition, self.reason)
+            self._paused.add(partition)
+
+    async def release(self, partitions: set[TopicPartition] | None = None) -> None:
+        """Drop the held messages of the given revoked partitions, or of every partition when not provided."""
+        if partitions is not None:
+            self._paused.difference_update(partitions)
+            for partition in partitions:
+                self._revocations[partition] = self.revocations(partition) + 1
+            self._wake()
+            return
+        if self._half_open:
+            self._half_open.cancel()
+        self._released = True
+        self._wake()
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import uuid
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from .constants import (
+    BROKER_CLAIM_CHECK_HEADER,
+    BROKER_CLAIM_CHECK_KEY_PREFIX,
+    BROKER_CLAIM_CHECK_THRESHOLD,
+    BROKER_CLAIM_CHECK_TTL,
+    LOG_PREFIX,
+)
+from .exceptions import BrokerBlobNotFoundException
+from .protocols import BrokerBlobStoreProtocol
+from .record import BrokerRecord
+
+if TYPE_CHECKING:
+    from solkit.cache.protocol import CacheRepositoryProtocol
+
+logger = logging.getLogger(__name__)
+
+
+class BrokerCacheBlobStore:
+    """Blob store keeping the values in the cache, expiring after ``ttl`` seconds.
+
+    The ttl should outlive the retention of the topics, so every reference on a topic can be rehydrated.
+    """
+
+    def __init__(
+        self,
+        cache: 'CacheRepositoryProtocol',
+        ttl: int | None = BROKER_CLAIM_CHECK_TTL,
+        key_prefix: str = BROKER_CLAIM_CHECK_KEY_PREFIX,
+    ) -> None:
+        """Initialize the cache blob store."""
+        self._cache = cache
+        self._ttl = ttl
+        self._key_prefix = key_prefix
+
+    async def put(self, reference: str, value: bytes) -> None:
+        """Store a value under its reference."""
+        await self._cache.set_bytes(f'{self._key_prefix}:{reference}', value, self._ttl)
+
+    async def get(self, reference: str) -> bytes:
+        """Get the value of a reference."""
+        if (value := await self._cache.get_bytes(f'{self._key_prefix}:{reference}')) is None:
+            raise BrokerBlobNotFoundException(reference)
+        return value
+
+
+class BrokerFileBlobStore:
+    """Blob store keeping each value in a file of a local or mounted directory.
+
+    Files are written under a temporary name and renamed, so a reader never sees a partial value.
+    The files are not deleted, their cleanup is left to the directory retention policy.
+    """
+
+    def __init__(self, directory: str | Path) -> None:
+        """Initialize the file blob store, creating the directory when missing."""
+        self._directory = Path(directory)
+        self._directory.mkdir(parents=True, exist_ok=True)
+
+    def _write(self, reference: str, value: bytes) -> None:
+        """Write a value atomically."""
+        path = self._directory / reference
+        temporary_path = path.with_suffix('.tmp')
+        temporary_path.write_bytes(value)
+        temporary_path.replace(path)
+
+    def _read(self, reference: str) -> bytes:
+        """Read a value."""
+        try:
+            return (self._directory / reference).read_bytes()
+        except FileNotFoundError:
+            raise BrokerBlobNotFoundException(reference) from None
+
+    async def put(self, reference: str, value: bytes) -> None:
+        """Store a value under its reference, off the event loop."""
+        await asyncio.to_thread(self._write, reference, value)
+
+    async def get(self, reference: str) -> bytes:
+        """Get the value of a reference, off the event loop."""
+        return await asyncio.to_thread(self._read, reference)
+
+
+class BrokerClaimCheck:
+    """Offload the encoded values above ``threshold`` bytes to a blob store, only a reference goes on the topic.
+
+    The reference travels in the claim check header with an empty value, the content type and envelope headers
+    are kept so the consumer decodes the rehydrated value as usual.
+    """
+
+    def __init__(self, store: BrokerBlobStoreProtocol, threshold: int = BROKER_CLAIM_CHECK_THRESHOLD) -> None:
+        """Initialize the claim check."""
+        self._store = store
+        self._threshold = threshold
+
+    async def offload(self, topic: str, value: bytes) -> tuple[bytes, list[tuple[str, bytes]]]:
+        """Store an oversized value, returning the value and headers to produce."""
+        if len(value) <= self._threshold:
+            return value, []
+        reference = uuid.uuid4().hex
+        await self._store.put(reference, value)
+        logger.info(f'{LOG_PREFIX}[CLAIM CHECK][OFFLOAD][TOPIC: {topic} - REFERENCE: {reference} - SIZE: {len(value)}]')
+        return b'', [(BROKER_CLAIM_CHECK_HEADER, bytes(reference, 'utf-8'))]
+
+    async def rehydrate(self, record: BrokerRecord) -> BrokerRecord:
+        """Load the value of a claim-checked record from the blob store, other records are returned as is."""
+        if record.claim_check is not None:
+            record.payload = await self._store.get(record.claim_check)
+        return record
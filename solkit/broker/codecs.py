@@ -0,0 +1,83 @@
+import json
+from abc import ABC, abstractmethod
+from typing import Any, ClassVar
+
+from .constants import BrokerContentType
+
+
+class BrokerCodec(ABC):
+    """Abstract codec encoding the message envelope to bytes and back."""
+
+    content_type: ClassVar[BrokerContentType]
+
+    @abstractmethod
+    def encode(self, value: dict[str, Any]) -> bytes:
+        """Encode a value to bytes."""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def decode(self, value: bytes) -> dict[str, Any]:
+        """Decode a value from bytes."""
+        raise NotImplementedError()
+
+
+class BrokerJsonCodec(BrokerCodec):
+    """JSON codec based on the standard library."""
+
+    content_type = BrokerContentType.JSON
+
+    def encode(self, value: dict[str, Any]) -> bytes:
+        """Encode a value to JSON bytes."""
+        return bytes(json.dumps(value), 'utf-8')
+
+    def decode(self, value: bytes) -> dict[str, Any]:
+        """Decode a value from JSON bytes."""
+        return json.loads(value)
+
+
+class BrokerOrjsonCodec(BrokerCodec):
+    """JSON codec based on orjson, requires the ``orjson`` package."""
+
+    content_type = BrokerContentType.JSON
+
+    def __init__(self) -> None:
+        """Initialize the codec."""
+        import orjson
+
+        self._orjson = orjson
+
+    def encode(self, value: dict[str, Any]) -> bytes:
+        """Encode a value to JSON bytes."""
+        return self._orjson.dumps(value)
+
+    def decode(self, value: bytes) -> dict[str, Any]:
+        """Decode a value from JSON bytes."""
+        return self._orjson.loads(value)
+
+
+class BrokerMsgpackCodec(BrokerCodec):
+    """MessagePack codec, requires the ``msgpack`` package."""
+
+    content_type = BrokerContentType.MSGPACK
+
+    def __init__(self) -> None:
+        """Initialize the codec."""
+        import msgpack
+
+        self._msgpack = msgpack
+
+    def encode(self, value: dict[str, Any]) -> bytes:
+        """Encode a value to MessagePack bytes."""
+        return self._msgpack.packb(value)  # type: ignore
+
+    def decode(self, value: bytes) -> dict[str, Any]:
+        """Decode a value from MessagePack bytes."""
+        return self._msgpack.unpackb(value)
+
+
+BROKER_DEFAULT_CODEC = BrokerJsonCodec()
+
+BROKER_CODECS: dict[BrokerContentType, type[BrokerCodec]] = {
+    BrokerContentType.JSON: BrokerJsonCodec,
+    BrokerContentType.MSGPACK: BrokerMsgpackCodec,
+}
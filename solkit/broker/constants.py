@@ -6,6 +6,23 @@ BROKER_HEARTBEAT_PER_SESSION = 4
 BROKER_RETRY_SUFFIX = '-RETRY-'
 BROKER_DEAD_LETTER_QUEUE_SUFFIX = '-DLQ'
 BROKER_TOPIC_PATTERN = r'^[a-z-.]+$'
+BROKER_RETRY_NOT_BEFORE_HEADER = 'X-Retry-Not-Before'
+BROKER_CONTENT_TYPE_HEADER = 'Content-Type'
+BROKER_ENVELOPE_VERSION_HEADER = 'X-Envelope-Version'
+BROKER_METADATA_HEADER_PREFIX = 'X-Metadata-'
+BROKER_ERROR_HEADER = 'X-Error'
+BROKER_RETRY_COUNT_HEADER = 'X-Retry-Count'
+BROKER_MESSAGE_ID_HEADER = 'X-Message-ID'
+BROKER_DEDUPE_KEY_PREFIX = 'broker:dedupe'
+BROKER_DEDUPE_TTL = 24 * 60 * 60
+BROKER_FETCH_TIMEOUT_MS = 1000
+BROKER_CLAIM_CHECK_HEADER = 'X-Claim-Check'
+BROKER_CLAIM_CHECK_KEY_PREFIX = 'broker:claim-check'
+BROKER_CLAIM_CHECK_THRESHOLD = 256 * 1024
+BROKER_CLAIM_CHECK_TTL = 7 * 24 * 60 * 60
+BROKER_RATE_LIMIT_KEY_PREFIX = 'broker:rate'
+BROKER_TABLE_SNAPSHOT_MAGIC = b'BKTS'
+BROKER_METRICS_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
 
 
 class BrokerKafkaAcks(StrEnum):
@@ -14,3 +31,92 @@ class BrokerKafkaAcks(StrEnum):
     ALL = 'all'
     ZERO = '0'
     ONE = '1'
+
+
+class BrokerKafkaIsolationLevel(StrEnum):
+    """Valid values for Kafka Consumer isolation level."""
+
+    READ_COMMITTED = 'read_committed'
+    READ_UNCOMMITTED = 'read_uncommitted'
+
+
+class BrokerEnvelopeVersion(StrEnum):
+    """Valid values for the message envelope version.
+
+    - ``1``: the value is ``{"data": ..., "metadata": ...}``
+    - ``2``: the value is the raw data, metadata, error and retry count travel as headers
+    """
+
+    V1 = '1'
+    V2 = '2'
+
+
+class BrokerContentType(StrEnum):
+    """Valid values for the message content type header."""
+
+    JSON = 'application/json'
+    MSGPACK = 'application/msgpack'
+
+
+class BrokerConsumeMode(StrEnum):
+    """Valid values for the consume dispatch mode."""
+
+    SEQUENTIAL = 'sequential'
+    PARTITION = 'partition'
+    KEY = 'key'
+
+
+class BrokerCircuitState(StrEnum):
+    """Valid values for the states of the handler circuit breaker."""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+
+class BrokerConsumeLane(StrEnum):
+    """Valid values for the consumption lanes, each lane consumes its topics with its own consumer."""
+
+    MAIN = 'main'
+    RETRY = 'retry'
+    DLQ = 'dlq'
+
+
+class BrokerKafkaProducerProfile(StrEnum):
+    """Valid values for the Kafka Producer throughput profile."""
+
+    LATENCY = 'latency'
+    BALANCED = 'balanced'
+    THROUGHPUT = 'throughput'
+
+
+class BrokerKafkaCompressionType(StrEnum):
+    """Valid values for the Kafka Producer compression type."""
+
+    NONE = 'none'
+    GZIP = 'gzip'
+    SNAPPY = 'snappy'
+    LZ4 = 'lz4'
+    ZSTD = 'zstd'
+
+
+BROKER_PRODUCER_PROFILES: dict[BrokerKafkaProducerProfile, dict[str, int | BrokerKafkaCompressionType]] = {
+    BrokerKafkaProducerProfile.LATENCY: {
+        'compression_type': BrokerKafkaCompressionType.NONE,
+        'linger_ms': 0,
+        'max_batch_size': 16 * 1024,
+        'max_request_size': 1024 * 1024,
+    },
+    BrokerKafkaProducerProfile.BALANCED: {
+        'compression_type': BrokerKafkaCompressionType.NONE,
+        'linger_ms': 5,
+        'max_batch_size': 64 * 1024,
+        'max_request_size': 1024 * 1024,
+    },
+    BrokerKafkaProducerProfile.THROUGHPUT: {
+        'compression_type': BrokerKafkaCompressionType.GZIP,
+        'linger_ms': 50,
+        'max_batch_size': 512 * 1024,
+        'max_request_size': 4 * 1024 * 1024,
+    },
+}
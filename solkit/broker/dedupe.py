@@ -0,0 +1,78 @@
+import logging
+from typing import TYPE_CHECKING
+
+from aiokafka.structs import ConsumerRecord
+
+from .constants import BROKER_DEDUPE_KEY_PREFIX, BROKER_DEDUPE_TTL, BROKER_MESSAGE_ID_HEADER, LOG_PREFIX
+
+if TYPE_CHECKING:
+    from solkit.cache.protocol import CacheRepositoryProtocol
+
+logger = logging.getLogger(__name__)
+
+
+class BrokerDeduplicator:
+    """Skip the messages already processed by a consumer group.
+
+    Processed messages are kept in a seen-set of the cache expiring after ``ttl`` seconds. A message is
+    identified by its message id header, or by its topic, partition and offset when the header is missing.
+    """
+
+    def __init__(
+        self,
+        cache: 'CacheRepositoryProtocol',
+        group_id: str,
+        ttl: int = BROKER_DEDUPE_TTL,
+        message_id_header: str = BROKER_MESSAGE_ID_HEADER,
+    ) -> None:
+        """Initialize the deduplicator."""
+        self._cache = cache
+        self._group_id = group_id
+        self._ttl = ttl
+        self._message_id_header = message_id_header
+        self._processed: dict[str, str] = {}
+        self.duplicates = 0
+
+    def _key(self, message: ConsumerRecord) -> str:
+        """Build the seen-set key of a message."""
+        for name, value in message.headers:
+            if name == self._message_id_header:
+                return f'{BROKER_DEDUPE_KEY_PREFIX}:{self._group_id}:{message.topic}:{value.decode("utf-8")}'
+        return f'{BROKER_DEDUPE_KEY_PREFIX}:{self._group_id}:{message.topic}:{message.partition}:{message.offset}'
+
+    async def check(self, messages: list[ConsumerRecord]) -> list[bool]:
+        """Flag the duplicated messages of a fetched batch with a single pipelined lookup.
+
+        The messages are processed when the cache is unavailable or answers with a mismatched number of flags,
+        keeping the at-least-once delivery.
+        """
+        if not messages:
+            return []
+        try:
+            duplicates = await self._cache.exists_keys(*(self._key(message) for message in messages))
+            flagged = list(zip(messages, duplicates, strict=True))
+        except Exception as err:
+            logger.error(f'{LOG_PREFIX}[DEDUPE][CHECK][ERROR: {err}]')
+            return [False] * len(messages)
+        for message, duplicate in flagged:
+            if duplicate:
+                self.duplicates += 1
+                logger.info(
+                    f'{LOG_PREFIX}[DEDUPE][SKIP][TOPIC: {message.topic} - PARTITION: {message.partition} - '
+                    f'OFFSET: {message.offset}]'
+                )
+        return duplicates
+
+    def mark(self, message: ConsumerRecord) -> None:
+        """Add a processed message to the pending seen-set entries."""
+        self._processed[self._key(message)] = '1'
+
+    async def flush(self) -> None:
+        """Write the pending seen-set entries with a single pipeline."""
+        if not self._processed:
+            return
+        processed, self._processed = self._processed, {}
+        try:
+            await self._cache.set_keys(processed, ttl=self._ttl)
+        except Exception as err:
+            logger.error(f'{LOG_PREFIX}[DEDUPE][FLUSH][ERROR: {err}]')
@@ -0,0 +1,50 @@
+from .record import BrokerRecord
+
+
+class BrokerBatchException(Exception):
+    """Raised by a batch handler to report the records of the batch that failed.
+
+    The records not listed are considered processed, only the listed ones are routed to the retry topics.
+    """
+
+    def __init__(self, failures: list[tuple[BrokerRecord, Exception]]) -> None:
+        """Initialize the batch exception with the failed records and their errors."""
+        super().__init__(f'{len(failures)} records failed in batch')
+        self.failures = failures
+
+    def __reduce__(self) -> tuple[type['BrokerBatchException'], tuple[list[tuple[BrokerRecord, Exception]]]]:
+        """Pickle with the failures, so the exception can be raised by a handler in another process."""
+        return self.__class__, (self.failures,)
+
+
+class BrokerBlobNotFoundException(Exception):
+    """Raised when the value of a claim-checked message is missing from the blob store."""
+
+    def __init__(self, reference: str) -> None:
+        """Initialize the exception with the missing reference."""
+        super().__init__(f'Claim-checked value not found: {reference}')
+        self.reference = reference
+
+    def __reduce__(self) -> tuple[type['BrokerBlobNotFoundException'], tuple[str]]:
+        """Pickle with the reference."""
+        return self.__class__, (self.reference,)
+
+
+class BrokerCircuitOpenException(Exception):
+    """Raised to a message held by an open circuit breaker when the consumption stops.
+
+    The message is neither processed nor committed, it is consumed again from the last committed offset.
+    """
+
+
+class BrokerHandlerTimeoutException(Exception):
+    """Raised when a handler runs past the handler timeout, the message is routed to the retry topics."""
+
+    def __init__(self, timeout: float) -> None:
+        """Initialize the exception with the timeout in seconds."""
+        super().__init__(f'Handler timed out after {timeout}s')
+        self.timeout = timeout
+
+    def __reduce__(self) -> tuple[type['BrokerHandlerTimeoutException'], tuple[float]]:
+        """Pickle with the timeout."""
+        return self.__class__, (self.timeout,)
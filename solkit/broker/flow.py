@@ -0,0 +1,90 @@
+import logging
+
+from aiokafka import AIOKafkaConsumer
+from aiokafka.structs import TopicPartition
+
+from .constants import LOG_PREFIX
+
+logger = logging.getLogger(__name__)
+
+
+class BrokerPartitionPauser:
+    """Pause partitions on behalf of several reasons, a partition is resumed once every reason is lifted."""
+
+    def __init__(self, consumer: AIOKafkaConsumer) -> None:
+        """Initialize the partition pauser."""
+        self._consumer = consumer
+        self._reasons: dict[TopicPartition, set[str]] = {}
+
+    def pause(self, partition: TopicPartition, reason: str) -> None:
+        """Pause a partition for a reason."""
+        self._reasons.setdefault(partition, set()).add(reason)
+        self._consumer.pause(partition)
+        logger.info(
+            f'{LOG_PREFIX}[PAUSE][{reason.upper()}][TOPIC: {partition.topic} - PARTITION: {partition.partition}]'
+        )
+
+    def resume(self, partition: TopicPartition, reason: str) -> None:
+        """Lift a pause reason, resuming the partition when no reason is left and it is still assigned."""
+        reasons = self._reasons.get(partition, set())
+        reasons.discard(reason)
+        if reasons:
+            return
+        self._reasons.pop(partition, None)
+        if partition in self._consumer.assignment():
+            self._consumer.resume(partition)
+            logger.info(
+                f'{LOG_PREFIX}[RESUME][{reason.upper()}][TOPIC: {partition.topic} - PARTITION: {partition.partition}]'
+            )
+
+    def is_paused(self, partition: TopicPartition, reason: str | None = None) -> bool:
+        """Check if a partition is paused, for a given reason when provided."""
+        reasons = self._reasons.get(partition, set())
+        return reason in reasons if reason else bool(reasons)
+
+    async def release(self, partitions: set[TopicPartition] | None = None) -> None:
+        """Forget the pause reasons of the given partitions, or of every partition when not provided."""
+        for partition in list(self._reasons):
+            if partitions is None or partition in partitions:
+                del self._reasons[partition]
+
+
+class BrokerBackpressure:
+    """Bound the in-flight messages of each partition.
+
+    A partition is paused once its in-flight messages reach the high watermark and resumed once they drop
+    to the low watermark, the consumer keeps polling meanwhile so the group membership stays alive.
+    """
+
+    reason = 'backpressure'
+
+    def __init__(self, pauser: BrokerPartitionPauser, high_watermark: int, low_watermark: int) -> None:
+        """Initialize the backpressure."""
+        self._pauser = pauser
+        self._high_watermark = high_watermark
+        self._low_watermark = low_watermark
+        self._in_flight: dict[TopicPartition, int] = {}
+
+    def in_flight(self, partition: TopicPartition) -> int:
+        """Get the in-flight messages of a partition."""
+        return self._in_flight.get(partition, 0)
+
+    def add(self, partition: TopicPartition) -> None:
+        """Register an in-flight message, pausing its partition at the high watermark."""
+        in_flight = self._in_flight[partition] = self.in_flight(partition) + 1
+        if in_flight >= self._high_watermark and not self._pauser.is_paused(partition, self.reason):
+            self._pauser.pause(partition, self.reason)
+
+    def done(self, partition: TopicPartition) -> None:
+        """Unregister a processed message, resuming its partition at the low watermark."""
+        if partition not in self._in_flight:
+            return
+        in_flight = self._in_flight[partition] = self._in_flight[partition] - 1
+        if in_flight <= self._low_watermark and self._pauser.is_paused(partition, self.reason):
+            self._pauser.resume(partition, self.reason)
+
+    async def release(self, partitions: set[TopicPartition] | None = None) -> None:
+        """Forget the in-flight messages of the given partitions, or of every partition when not provided."""
+        for partition in list(self._in_flight):
+            if partitions is None or partition in partitions:
+                del self._in_flight[partition]
@@ -0,0 +1,165 @@
+import asyncio
+import contextvars
+import inspect
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections.abc import Awaitable, Callable, Coroutine, Generator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from types import FrameType
+from typing import Any, TypeVar, cast
+
+from solkit.common.trace_correlation_id import get_trace_correlation_id, trace_correlation_id_context
+
+from .constants import LOG_PREFIX
+from .exceptions import BrokerHandlerTimeoutException
+from .record import BrokerRecord
+
+logger = logging.getLogger(__name__)
+
+BrokerHandler = Callable[[BrokerRecord], Awaitable[None] | None]
+BrokerBatchHandler = Callable[[list[BrokerRecord]], Awaitable[None] | None]
+
+T = TypeVar('T', BrokerRecord, list[BrokerRecord])
+
+
+def _run_with_correlation_id(func: Callable[[T], object], correlation_id: str | None, argument: T) -> None:
+    """Run a sync handler with the correlation id of the message, in a process without the caller context.
+
+    Raises:
+        TypeError: when the handler returns an awaitable, which cannot be awaited from the process.
+    """
+    trace_correlation_id_context.set(correlation_id)
+    result = func(argument)
+    if inspect.isawaitable(result):
+        if inspect.iscoroutine(result):
+            result.close()
+        raise TypeError(f'Handler {func!r} returned an awaitable, it cannot run on a process pool executor')
+
+
+def _run_in_context(
+    context: contextvars.Context, func: Callable[[T], object], argument: T, threads: list[int] | None = None
+) -> object:
+    """Run a sync handler in a copy of the caller context, appending its thread id to ``threads`` when provided."""
+    if threads is not None:
+        threads.append(threading.get_ident())
+    return context.run(func, argument)
+
+
+def _coroutine_frames(coroutine: Coroutine[Any, Any, Any] | Generator[Any, Any, Any] | None) -> list[FrameType]:
+    """Get the frames of a suspended coroutine and of the coroutines it awaits, from the outermost."""
+    frames: list[FrameType] = []
+    while coroutine is not None:
+        frame = getattr(coroutine, 'cr_frame', None) or getattr(coroutine, 'gi_frame', None)
+        if frame is not None:
+            frames.append(frame)
+        coroutine = getattr(coroutine, 'cr_await', None) or getattr(coroutine, 'gi_yieldfrom', None)
+    return frames
+
+
+class BrokerHandlerRunner:
+    """Await async handlers on the event loop and run sync handlers on an executor.
+
+    Sync handlers run on the given thread or process pool executor, or on the default thread pool of the loop,
+    at most ``concurrency`` at a time. Thread pool handlers run in a copy of the caller context, process pool
+    handlers get the correlation id only. The awaitable returned by a sync callable wrapping an async handler,
+    e.g. ``lambda message: handle(message, db)``, is awaited on the event loop.
+
+    A handler running past ``timeout`` seconds is cancelled and ``BrokerHandlerTimeoutException`` is raised.
+    A sync handler cannot be interrupted, it keeps its concurrency slot until it returns. The watchdog logs
+    the stack of the handlers still running after ``soft_timeout`` seconds, except for process pool handlers.
+    """
+
+    def __init__(
+        self,
+        executor: Executor | None = None,
+        concurrency: int = 10,
+        timeout: float | None = None,
+        soft_timeout: float | None = None,
+    ) -> None:
+        """Initialize the handler runner."""
+        self._executor = executor
+        self._slots = asyncio.Semaphore(concurrency)
+        self._timeout = timeout
+        self._soft_timeout = soft_timeout
+
+    @staticmethod
+    def is_async(func: Callable[..., object]) -> bool:
+        """Check if a handler is a coroutine function or an object with a coroutine ``__call__``."""
+        return inspect.iscoroutinefunction(func) or inspect.iscoroutinefunction(type(func).__call__)
+
+    async def run(self, func: Callable[[T], Awaitable[None] | None], argument: T) -> None:
+        """Run a handler, raising its exception.
+
+        Raises:
+            BrokerHandlerTimeoutException: when the handler runs past the timeout.
+        """
+        threads: list[int] = []
+        execution = await self._start(func, argument, threads)
+        watchdog = (
+            asyncio.get_running_loop().call_later(
+                self._soft_timeout, self._log_stack, func, asyncio.current_task(), threads, time.monotonic()
+            )
+            if self._soft_timeout
+            else None
+        )
+        deadline = asyncio.timeout(self._timeout)
+        try:
+            async with deadline:
+                await execution
+        except TimeoutError as err:
+            if not deadline.expired():
+                raise
+            raise BrokerHandlerTimeoutException(cast(float, self._timeout)) from err
+        finally:
+            if watchdog:
+                watchdog.cancel()
+
+    async def _start(
+        self, func: Callable[[T], Awaitable[None] | None], argument: T, threads: list[int]
+    ) -> Awaitable[None]:
+        """Call an async handler, or wait for a concurrency slot and start a sync handler on the executor.
+
+        The slot of a sync handler is released once it returns, even when it is no longer awaited, and the
+        awaitable it returns is then awaited on the event loop.
+        """
+        if self.is_async(func):
+            return cast(Awaitable[None], func(argument))
+        if isinstance(self._executor, ProcessPoolExecutor):
+            call = partial(_run_with_correlation_id, func, get_trace_correlation_id(), argument)
+        else:
+            call = partial(_run_in_context, contextvars.copy_context(), func, argument, threads)
+        await self._slots.acquire()
+        execution = asyncio.get_running_loop().run_in_executor(self._executor, call)
+        execution.add_done_callback(lambda _: self._slots.release())
+        return self._await_result(asyncio.shield(execution))
+
+    @staticmethod
+    async def _await_result(execution: Awaitable[object]) -> None:
+        """Wait for a sync handler, then await the awaitable it returned."""
+        result = await execution
+        if inspect.isawaitable(result):
+            await result
+
+    @staticmethod
+    def _log_stack(
+        func: Callable[..., object], task: asyncio.Task[Any] | None, threads: list[int], started: float
+    ) -> None:
+        """Log the stack of a handler running past the soft timeout."""
+        if threads:
+            frame = sys._current_frames().get(threads[0])
+            frames = traceback.format_stack(frame) if frame else []
+        elif task is not None and BrokerHandlerRunner.is_async(func):
+            summary = traceback.StackSummary.extract(
+                (frame, frame.f_lineno) for frame in _coroutine_frames(task.get_coro())
+            )
+            frames = summary.format()
+        else:
+            frames = []
+        name = getattr(func, '__qualname__', type(func).__qualname__)
+        logger.warning(
+            f'{LOG_PREFIX}[WATCHDOG][HANDLER: {name} - RUNNING: {time.monotonic() - started:.1f}s]\n' + ''.join(frames)
+        )
@@ -0,0 +1,459 @@
+import asyncio
+import itertools
+import time
+import zlib
+from collections.abc import Sequence
+from typing import ClassVar
+
+from aiokafka.errors import ConsumerStoppedError, IllegalOperation
+from aiokafka.structs import ConsumerRecord, OffsetAndTimestamp, RecordMetadata, TopicPartition
+
+from .adapter import BrokerKafkaAdapter
+from .rebalance import BrokerRebalanceListener
+
+
+class BrokerMemoryCluster:
+    """In-memory stand-in of a Kafka cluster holding topics, partitions, consumer groups and committed offsets.
+
+    Clusters are shared by bootstrap servers, so producers and consumers configured with the same servers
+    exchange messages. Topics are created on first use with ``partitions`` partitions. Transactional messages
+    are appended on send, the messages of aborted transactions are skipped by read committed consumers.
+    """
+
+    _clusters: ClassVar[dict[str, 'BrokerMemoryCluster']] = {}
+
+    def __init__(self, partitions: int = 1) -> None:
+        """Initialize the cluster."""
+        self.partitions = partitions
+        self._topics: dict[str, list[list[ConsumerRecord]]] = {}
+        self._committed: dict[tuple[str, TopicPartition], int] = {}
+        self._aborted: set[tuple[TopicPartition, int]] = set()
+        self._log_starts: dict[TopicPartition, int] = {}
+        self._groups: dict[str, list[BrokerMemoryConsumer]] = {}
+        self._waiters: set[asyncio.Future[None]] = set()
+
+    @classmethod
+    def get(cls, bootstrap_servers: str) -> 'BrokerMemoryCluster':
+        """Get the cluster of the bootstrap servers, creating it on first use."""
+        return cls._clusters.setdefault(bootstrap_servers, cls())
+
+    @classmethod
+    def reset(cls) -> None:
+        """Drop every shared cluster."""
+        cls._clusters.clear()
+
+    def create_topic(self, topic: str, partitions: int | None = None) -> None:
+        """Create a topic, existing topics are left untouched."""
+        if topic not in self._topics:
+            self._topics[topic] = [[] for _ in range(partitions or self.partitions)]
+
+    def topics(self) -> set[str]:
+        """Get the topics names."""
+        return set(self._topics)
+
+    def partitions_for(self, topic: str) -> list[TopicPartition]:
+        """Get the partitions of a topic, creating the topic on first use."""
+        self.create_topic(topic)
+        return [TopicPartition(topic, partition) for partition in range(len(self._topics[topic]))]
+
+    def append(
+        self,
+        partition: TopicPartition,
+        key: bytes | None,
+        value: bytes | None,
+        headers: Sequence[tuple[str, bytes]],
+        timestamp_ms: int,
+    ) -> RecordMetadata:
+        """Append a message to a partition and wake up the waiting consumers."""
+        self.create_topic(partition.topic)
+        log = self._topics[partition.topic][partition.partition]
+        log.append(
+            ConsumerRecord(
+                topic=partition.topic,
+                partition=partition.partition,
+                offset=len(log),
+                timestamp=timestamp_ms,
+                timestamp_type=0,
+                key=key,
+                value=value,
+                checksum=None,
+                serialized_key_size=len(key) if key is not None else -1,
+                serialized_value_size=len(value) if value is not None else -1,
+                headers=list(headers),
+            )
+        )
+        self.notify()
+        return RecordMetadata(partition.topic, partition.partition, partition, len(log) - 1, timestamp_ms, 0, 0)
+
+    def fetch(self, partition: TopicPartition, offset: int, max_records: int) -> list[ConsumerRecord]:
+        """Get up to ``max_records`` messages of a partition from an offset."""
+        return self._topics[partition.topic][partition.partition][offset : offset + max_records]
+
+    def delete_records(self, partition: TopicPartition, offset: int) -> None:
+        """Delete the messages of a partition before an offset, like the retention of a Kafka topic."""
+        self._log_starts[partition] = max(offset, self.log_start(partition))
+
+    def log_start(self, partition: TopicPartition) -> int:
+        """Get the offset of the first message of a partition which is not deleted."""
+        return self._log_starts.get(partition, 0)
+
+    def highwater(self, partition: TopicPartition) -> int:
+        """Get the offset following the last message of a partition."""
+        return len(self._topics[partition.topic][partition.partition])
+
+    def offset_for_time(self, partition: TopicPartition, timestamp_ms: int) -> OffsetAndTimestamp | None:
+        """Get the first message of a partition with a timestamp greater than or equal to a timestamp."""
+        for message in self._topics[partition.topic][partition.partition][self.log_start(partition) :]:
+            if message.timestamp >= timestamp_ms:
+                return OffsetAndTimestamp(message.offset, message.timestamp)
+        return None
+
+    def committed(self, group_id: str, partition: TopicPartition) -> int | None:
+        """Get the committed offset of a consumer group on a partition."""
+        return self._committed.get((group_id, partition))
+
+    def commit(self, group_id: str, offsets: dict[TopicPartition, int]) -> None:
+        """Commit the offsets of a consumer group."""
+        for partition, offset in offsets.items():
+            self._committed[(group_id, partition)] = offset
+
+    def abort(self, records: list[RecordMetadata]) -> None:
+        """Mark the messages of an aborted transaction."""
+        self._aborted.update((record.topic_partition, record.offset) for record in records)
+
+    def is_aborted(self, message: ConsumerRecord) -> bool:
+        """Check if a message belongs to an aborted transaction."""
+        return (TopicPartition(message.topic, message.partition), message.offset) in self._aborted
+
+    def notify(self) -> None:
+        """Wake up the consumers waiting for messages."""
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        self._waiters.clear()
+
+    async def wait(self, timeout: float) -> None:
+        """Wait for a message to be appended or for the timeout."""
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except TimeoutError:
+            self._waiters.discard(waiter)
+
+    async def join(self, consumer: 'BrokerMemoryConsumer') -> None:
+        """Add a consumer to its group and rebalance the group."""
+        if consumer.group_id is None:
+            await consumer.assign_partitions(self._subscribed_partitions([consumer]))
+            return
+        self._groups.setdefault(consumer.group_id, []).append(consumer)
+        await self._rebalance(consumer.group_id)
+
+    async def leave(self, consumer: 'BrokerMemoryConsumer') -> None:
+        """Remove a consumer from its group, revoking its partitions, and rebalance the group."""
+        await consumer.assign_partitions(set())
+        if consumer.group_id is None:
+            return
+        self._groups[consumer.group_id].remove(consumer)
+        await self._rebalance(consumer.group_id)
+
+    def _subscribed_partitions(self, members: list['BrokerMemoryConsumer']) -> set[TopicPartition]:
+        """Get the partitions of the topics subscribed by the members."""
+        topics = {topic for member in members for topic in member.subscription()}
+        return {partition for topic in topics for partition in self.partitions_for(topic)}
+
+    async def _rebalance(self, group_id: str) -> None:
+        """Spread the subscribed partitions over the group members in round robin.
+
+        A partition is only assigned to the members subscribed to its topic. Every member revokes its moved
+        partitions before any member is assigned new ones, so the offsets committed on revocation are seen
+        by the new owners.
+        """
+        members = self._groups[group_id]
+        assignments: dict[int, set[TopicPartition]] = {id(member): set() for member in members}
+        subscribers = itertools.count()
+        for partition in sorted(self._subscribed_partitions(members)):
+            subscribed = [member for member in members if partition.topic in member.subscription()]
+            assignments[id(subscribed[next(subscribers) % len(subscribed)])].add(partition)
+        for member in members:
+            await member.assign_partitions(member.assignment() & assignments[id(member)])
+        for member in members:
+            await member.assign_partitions(assignments[id(member)])
+
+
+class BrokerMemoryProducer:
+    """In-memory stand-in of ``AIOKafkaProducer`` with the API used by the broker adapter and repository."""
+
+    def __init__(
+        self,
+        bootstrap_servers: str = 'memory',
+        transactional_id: str | None = None,
+        cluster: BrokerMemoryCluster | None = None,
+        **_: object,
+    ) -> None:
+        """Initialize the producer, the other Kafka options are accepted and ignored."""
+        self._cluster = cluster or BrokerMemoryCluster.get(bootstrap_servers)
+        self._round_robin = itertools.count()
+        self._transactional_id = transactional_id
+        self._transaction: list[RecordMetadata] | None = None
+        self._transaction_offsets: dict[str, dict[TopicPartition, int]] = {}
+
+    async def start(self) -> None:
+        """Start the producer."""
+
+    async def stop(self) -> None:
+        """Stop the producer."""
+
+    async def flush(self) -> None:
+        """Flush the producer, messages are appended on send."""
+
+    def _partition(self, topic: str, key: bytes | None) -> TopicPartition:
+        """Pick the partition of a message by key hash, in round robin for messages without key."""
+        partitions = self._cluster.partitions_for(topic)
+        index = zlib.crc32(key) if key is not None else next(self._round_robin)
+        return partitions[index % len(partitions)]
+
+    async def send(
+        self,
+        topic: str,
+        value: bytes | None = None,
+        key: bytes | None = None,
+        partition: int | None = None,
+        timestamp_ms: int | None = None,
+        headers: Sequence[tuple[str, bytes]] | None = None,
+    ) -> asyncio.Future[RecordMetadata]:
+        """Append a message and return its already resolved delivery future."""
+        if self._transactional_id is not None and self._transaction is None:
+            raise IllegalOperation('Transactional producer sending outside of a transaction')
+        target = TopicPartition(topic, partition) if partition is not None else self._partition(topic, key)
+        metadata = self._cluster.append(
+            target, key, value, headers or [], timestamp_ms if timestamp_ms is not None else int(time.time() * 1000)
+        )
+        if self._transaction is not None:
+            self._transaction.append(metadata)
+        delivery: asyncio.Future[RecordMetadata] = asyncio.get_running_loop().create_future()
+        delivery.set_result(metadata)
+        return delivery
+
+    async def send_and_wait(
+        self,
+        topic: str,
+        value: bytes | None = None,
+        key: bytes | None = None,
+        partition: int | None = None,
+        timestamp_ms: int | None = None,
+        headers: Sequence[tuple[str, bytes]] | None = None,
+    ) -> RecordMetadata:
+        """Append a message and return its delivery metadata."""
+        return await (await self.send(topic, value, key, partition, timestamp_ms, headers))
+
+    async def begin_transaction(self) -> None:
+        """Begin a transaction."""
+        if self._transactional_id is None:
+            raise IllegalOperation('Producer has no transactional id')
+        self._transaction = []
+        self._transaction_offsets = {}
+
+    async def send_offsets_to_transaction(self, offsets: dict[TopicPartition, int], group_id: str) -> None:
+        """Add the consumed offsets of a consumer group to the transaction."""
+        if self._transaction is None:
+            raise IllegalOperation('No transaction in progress')
+        self._transaction_offsets.setdefault(group_id, {}).update(offsets)
+
+    async def commit_transaction(self) -> None:
+        """Commit the transaction offsets."""
+        for group_id, offsets in self._transaction_offsets.items():
+            self._cluster.commit(group_id, offsets)
+        self._transaction = None
+        self._transaction_offsets = {}
+
+    async def abort_transaction(self) -> None:
+        """Abort the transaction, its messages are skipped by read committed consumers."""
+        self._cluster.abort(self._transaction or [])
+        self._transaction = None
+        self._transaction_offsets = {}
+
+
+class BrokerMemoryConsumer:
+    """In-memory stand-in of ``AIOKafkaConsumer`` with the API used by the broker adapter and repository.
+
+    Partitions without committed offset are consumed from the earliest message.
+    """
+
+    def __init__(
+        self,
+        *topics: str,
+        bootstrap_servers: str = 'memory',
+        group_id: str | None = None,
+        max_poll_records: int | None = None,
+        isolation_level: str = 'read_uncommitted',
+        auto_offset_reset: str = 'latest',
+        cluster: BrokerMemoryCluster | None = None,
+        **_: object,
+    ) -> None:
+        """Initialize the consumer, the other Kafka options are accepted and ignored."""
+        self._cluster = cluster or BrokerMemoryCluster.get(bootstrap_servers)
+        self._auto_offset_reset = auto_offset_reset
+        self.group_id = group_id
+        self._read_committed = isolation_level == 'read_committed'
+        self._max_poll_records = max_poll_records or 500
+        self._subscription = set(topics)
+        self._listener: BrokerRebalanceListener | None = None
+        self._positions: dict[TopicPartition, int] = {}
+        self._paused: set[TopicPartition] = set()
+        self._started = False
+        self._rotation = itertools.count()
+
+    def subscribe(self, topics: Sequence[str], listener: BrokerRebalanceListener | None = None) -> None:
+        """Subscribe to topics, the partitions are assigned on start."""
+        self._subscription = set(topics)
+        self._listener = listener
+
+    def subscription(self) -> set[str]:
+        """Get the subscribed topics."""
+        return set(self._subscription)
+
+    async def start(self) -> None:
+        """Start the consumer, joining its group."""
+        self._started = True
+        await self._cluster.join(self)
+
+    async def stop(self) -> None:
+        """Stop the consumer, leaving its group, pending and next fetches raise ``ConsumerStoppedError``."""
+        if not self._started:
+            return
+        await self._cluster.leave(self)
+        self._started = False
+        self._cluster.notify()
+
+    async def topics(self) -> set[str]:
+        """Get the topics of the cluster."""
+        return self._cluster.topics()
+
+    async def assign_partitions(self, partitions: set[TopicPartition]) -> None:
+        """Replace the assigned partitions, notifying the rebalance listener of the changes."""
+        revoked = set(self._positions) - partitions
+        assigned = partitions - set(self._positions)
+        if revoked:
+            if self._listener:
+                await self._listener.on_partitions_revoked(sorted(revoked))
+            for partition in revoked:
+                del self._positions[partition]
+                self._paused.discard(partition)
+        if assigned:
+            for partition in assigned:
+                committed = self._cluster.committed(self.group_id, partition) if self.group_id else None
+                self._positions[partition] = committed or 0
+            if self._listener:
+                await self._listener.on_partitions_assigned(sorted(assigned))
+
+    def assignment(self) -> set[TopicPartition]:
+        """Get the assigned partitions."""
+        return set(self._positions)
+
+    def assign(self, partitions: Sequence[TopicPartition]) -> None:
+        """Assign partitions manually, outside of any group."""
+        self._positions = {partition: self._positions.get(partition, 0) for partition in partitions}
+        self._paused &= set(partitions)
+
+    def partitions_for_topic(self, topic: str) -> set[int]:
+        """Get the partition numbers of a topic."""
+        return {partition.partition for partition in self._cluster.partitions_for(topic)}
+
+    async def offsets_for_times(
+        self, timestamps: dict[TopicPartition, int]
+    ) -> dict[TopicPartition, OffsetAndTimestamp | None]:
+        """Get the first offset of each partition with a timestamp greater than or equal to the given one."""
+        return {
+            partition: self._cluster.offset_for_time(partition, timestamp)
+            for partition, timestamp in timestamps.items()
+        }
+
+    async def beginning_offsets(self, partitions: Sequence[TopicPartition]) -> dict[TopicPartition, int]:
+        """Get the first offset of the partitions."""
+        return {partition: self._cluster.log_start(partition) for partition in partitions}
+
+    async def end_offsets(self, partitions: Sequence[TopicPartition]) -> dict[TopicPartition, int]:
+        """Get the offset following the last message of the partitions."""
+        return {partition: self._cluster.highwater(partition) for partition in partitions}
+
+    def pause(self, *partitions: TopicPartition) -> None:
+        """Stop fetching from the partitions."""
+        self._paused.update(partition for partition in partitions if partition in self._positions)
+
+    def resume(self, *partitions: TopicPartition) -> None:
+        """Resume fetching from the partitions."""
+        self._paused.difference_update(partitions)
+
+    def paused(self) -> set[TopicPartition]:
+        """Get the paused partitions."""
+        return set(self._paused)
+
+    def seek(self, partition: TopicPartition, offset: int) -> None:
+        """Set the next offset to fetch from a partition."""
+        self._positions[partition] = offset
+
+    async def position(self, partition: TopicPartition) -> int:
+        """Get the next offset to fetch from a partition."""
+        return self._positions[partition]
+
+    def highwater(self, partition: TopicPartition) -> int | None:
+        """Get the offset following the last message of a partition."""
+        return self._cluster.highwater(partition)
+
+    async def committed(self, partition: TopicPartition) -> int | None:
+        """Get the committed offset of the group on a partition."""
+        return self._cluster.committed(self.group_id, partition) if self.group_id else None
+
+    async def commit(self, offsets: dict[TopicPartition, int] | None = None) -> None:
+        """Commit the given offsets, or the positions of the assigned partitions when not provided.
+
+        Raises:
+            ConsumerStoppedError: when the consumer is stopped, like a Kafka consumer which left its group.
+        """
+        if not self._started:
+            raise ConsumerStoppedError()
+        if self.group_id is None:
+            raise ValueError('Committing offsets requires a group id')
+        self._cluster.commit(self.group_id, offsets if offsets is not None else dict(self._positions))
+
+    async def getmany(
+        self, *partitions: TopicPartition, timeout_ms: int = 0, max_records: int | None = None
+    ) -> dict[TopicPartition, list[ConsumerRecord]]:
+        """Fetch the messages of the assigned and not paused partitions, waiting up to the timeout for one."""
+        deadline = time.monotonic() + timeout_ms / 1000
+        while True:
+            if not self._started:
+                raise ConsumerStoppedError()
+            if fetched := self._fetch(set(partitions), max_records or self._max_poll_records):
+                return fetched
+            if (remaining := deadline - time.monotonic()) <= 0:
+                return {}
+            await self._cluster.wait(remaining)
+
+    def _fetch(self, partitions: set[TopicPartition], max_records: int) -> dict[TopicPartition, list[ConsumerRecord]]:
+        """Get the messages following the positions and advance them, starting from a rotating partition."""
+        fetched: dict[TopicPartition, list[ConsumerRecord]] = {}
+        positions = sorted(self._positions.items())
+        start = next(self._rotation) % len(positions) if positions else 0
+        for partition, position in positions[start:] + positions[:start]:
+            if partition in self._paused or (partitions and partition not in partitions) or max_records <= 0:
+                continue
+            if position < (log_start := self._cluster.log_start(partition)):
+                position = log_start if self._auto_offset_reset == 'earliest' else self._cluster.highwater(partition)
+                self._positions[partition] = position
+            if records := self._cluster.fetch(partition, position, max_records):
+                self._positions[partition] = records[-1].offset + 1
+                if self._read_committed:
+                    records = [record for record in records if not self._cluster.is_aborted(record)]
+                if records:
+                    fetched[partition] = records
+                    max_records -= len(records)
+        return fetched
+
+
+class BrokerMemoryAdapter(BrokerKafkaAdapter):
+    """Broker adapter backed by the in-memory cluster of its bootstrap servers, for tests and benchmarks."""
+
+    producer_class = BrokerMemoryProducer  # type: ignore
+    consumer_class = BrokerMemoryConsumer  # type: ignore
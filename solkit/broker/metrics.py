@@ -0,0 +1,159 @@
+import bisect
+import time
+from collections.abc import Sequence
+from typing import Any
+
+from aiokafka import AIOKafkaConsumer
+from aiokafka.structs import TopicPartition
+
+from .constants import BROKER_METRICS_LATENCY_BUCKETS
+
+
+class BrokerHistogram:
+    """Cumulative latency histogram in seconds."""
+
+    def __init__(self, buckets: Sequence[float] = BROKER_METRICS_LATENCY_BUCKETS) -> None:
+        """Initialize the histogram with the upper bounds of its buckets."""
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """Record a value."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self) -> list[int]:
+        """Get the cumulative counts of each bucket, the last one being the ``+Inf`` bucket."""
+        cumulative, total = [], 0
+        for count in self.counts:
+            total += count
+            cumulative.append(total)
+        return cumulative
+
+    def snapshot(self) -> dict[str, Any]:
+        """Get the histogram as a dictionary."""
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'buckets': dict(zip([*self.buckets, float('inf')], self.cumulative_counts(), strict=True)),
+        }
+
+
+class BrokerMetrics:
+    """In-process consumer metrics with a pull API and a Prometheus text exposition.
+
+    Recording only updates counters and histograms in memory, rates and lag are computed when pulled.
+    The lag of a partition is its high watermark minus the last offset committed by the consumer.
+    """
+
+    def __init__(self, buckets: Sequence[float] = BROKER_METRICS_LATENCY_BUCKETS) -> None:
+        """Initialize the metrics."""
+        self._buckets = buckets
+        self._consumers: list[AIOKafkaConsumer] = []
+        self.consumed: dict[str, int] = {}
+        self.retried: dict[str, int] = {}
+        self.dead_lettered: dict[str, int] = {}
+        self.handler_latency: dict[str, BrokerHistogram] = {}
+        self.commit_latency = BrokerHistogram(buckets)
+        self.committed: dict[TopicPartition, int] = {}
+        self._last_pull = time.monotonic()
+        self._last_consumed: dict[str, int] = {}
+
+    def bind(self, consumer: AIOKafkaConsumer) -> None:
+        """Bind a consumer the partitions lag is read from, the consumers of every lane can be bound."""
+        if consumer not in self._consumers:
+            self._consumers.append(consumer)
+
+    def unbind(self, consumer: AIOKafkaConsumer) -> None:
+        """Stop reading the partitions lag from a consumer."""
+        if consumer in self._consumers:
+            self._consumers.remove(consumer)
+
+    def observe_handler(self, topic: str, duration: float, messages: int = 1) -> None:
+        """Record a handler run over messages of a topic."""
+        self.consumed[topic] = self.consumed.get(topic, 0) + messages
+        if topic not in self.handler_latency:
+            self.handler_latency[topic] = BrokerHistogram(self._buckets)
+        self.handler_latency[topic].observe(duration)
+
+    def observe_commit(self, offsets: dict[TopicPartition, int], duration: float) -> None:
+        """Record an offsets commit."""
+        self.commit_latency.observe(duration)
+        self.committed.update(offsets)
+
+    def observe_retry(self, topic: str) -> None:
+        """Record a message routed to a retry topic."""
+        self.retried[topic] = self.retried.get(topic, 0) + 1
+
+    def observe_dead_letter(self, topic: str) -> None:
+        """Record a message routed to a dead letter queue topic."""
+        self.dead_lettered[topic] = self.dead_lettered.get(topic, 0) + 1
+
+    def lag(self) -> dict[TopicPartition, int]:
+        """Get the lag of the assigned partitions with a known high watermark and committed offset."""
+        lag = {}
+        for consumer in self._consumers:
+            for partition in consumer.assignment():
+                highwater = consumer.highwater(partition)
+                if highwater is not None and partition in self.committed:
+                    lag[partition] = max(highwater - self.committed[partition], 0)
+        return lag
+
+    def rates(self) -> dict[str, float]:
+        """Get the messages per second of each topic since the previous call."""
+        now = time.monotonic()
+        elapsed = max(now - self._last_pull, 1e-9)
+        rates = {topic: (count - self._last_consumed.get(topic, 0)) / elapsed for topic, count in self.consumed.items()}
+        self._last_pull = now
+        self._last_consumed = dict(self.consumed)
+        return rates
+
+    def snapshot(self) -> dict[str, Any]:
+        """Pull the metrics as a dictionary, the rates cover the time since the previous pull."""
+        return {
+            'consumed': dict(self.consumed),
+            'messages_per_second': self.rates(),
+            'handler_latency': {topic: histogram.snapshot() for topic, histogram in self.handler_latency.items()},
+            'commit_latency': self.commit_latency.snapshot(),
+            'retried': dict(self.retried),
+            'dead_lettered': dict(self.dead_lettered),
+            'lag': {f'{partition.topic}:{partition.partition}': lag for partition, lag in self.lag().items()},
+        }
+
+    @staticmethod
+    def _render_histogram(name: str, histogram: BrokerHistogram, labels: str = '') -> list[str]:
+        """Render a histogram in the Prometheus text format."""
+        bucket_labels = f'{labels},' if labels else ''
+        series_labels = f'{{{labels}}}' if labels else ''
+        lines = [
+            f'{name}_bucket{{{bucket_labels}le="{bound}"}} {count}'
+            for bound, count in zip([*histogram.buckets, '+Inf'], histogram.cumulative_counts(), strict=True)
+        ]
+        lines.append(f'{name}_sum{series_labels} {histogram.sum}')
+        lines.append(f'{name}_count{series_labels} {histogram.count}')
+        return lines
+
+    @staticmethod
+    def _render_counter(name: str, counts: dict[str, int]) -> list[str]:
+        """Render a counter by topic in the Prometheus text format."""
+        return [f'# TYPE {name} counter'] + [f'{name}{{topic="{topic}"}} {count}' for topic, count in counts.items()]
+
+    def render(self) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        lines = self._render_counter('broker_consumed_messages_total', self.consumed)
+        lines += self._render_counter('broker_retried_messages_total', self.retried)
+        lines += self._render_counter('broker_dead_lettered_messages_total', self.dead_lettered)
+        lines.append('# TYPE broker_handler_duration_seconds histogram')
+        for topic, histogram in self.handler_latency.items():
+            lines += self._render_histogram('broker_handler_duration_seconds', histogram, f'topic="{topic}"')
+        lines.append('# TYPE broker_commit_duration_seconds histogram')
+        lines += self._render_histogram('broker_commit_duration_seconds', self.commit_latency)
+        lines.append('# TYPE broker_consumer_lag gauge')
+        lines += [
+            f'broker_consumer_lag{{topic="{partition.topic}",partition="{partition.partition}"}} {lag}'
+            for partition, lag in self.lag().items()
+        ]
+        return '\n'.join(lines) + '\n'
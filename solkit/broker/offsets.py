@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+from aiokafka import AIOKafkaConsumer
+from aiokafka.structs import TopicPartition
+
+from .constants import LOG_PREFIX
+from .metrics import BrokerMetrics
+
+logger = logging.getLogger(__name__)
+
+
+class BrokerOffsetTracker:
+    """Track in-flight offsets per partition and resolve the highest contiguous completed offset.
+
+    Discarding a partition bumps its generation, so the messages dispatched before are recognized as stale.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the offset tracker."""
+        self._pending: dict[TopicPartition, deque[int]] = {}
+        self._completed: dict[TopicPartition, set[int]] = {}
+        self._generations: dict[TopicPartition, int] = {}
+        self._changed = asyncio.Event()
+
+    def track(self, partition: TopicPartition, offset: int) -> None:
+        """Register an offset as in-flight, offsets must be tracked in increasing order per partition."""
+        self._pending.setdefault(partition, deque()).append(offset)
+        self._completed.setdefault(partition, set())
+
+    def complete(self, partition: TopicPartition, offset: int) -> int | None:
+        """Mark an offset as processed.
+
+        Returns:
+            int | None: the offset to commit when the contiguous completed range advanced, None otherwise
+        """
+        if partition not in self._pending:
+            return None
+        pending = self._pending[partition]
+        completed = self._completed[partition]
+        completed.add(offset)
+        last_contiguous = None
+        while pending and pending[0] in completed:
+            last_contiguous = pending.popleft()
+            completed.discard(last_contiguous)
+        self._changed.set()
+        return last_contiguous + 1 if last_contiguous is not None else None
+
+    def generation(self, partition: TopicPartition) -> int:
+        """Get the generation of a partition, bumped each time it is discarded."""
+        return self._generations.get(partition, 0)
+
+    def pending(self, partitions: set[TopicPartition]) -> int:
+        """Count the in-flight offsets of the partitions."""
+        return sum(len(self._pending.get(partition, ())) for partition in partitions)
+
+    async def wait_drained(self, partitions: set[TopicPartition], timeout: float) -> bool:
+        """Wait for the in-flight offsets of the partitions to complete.
+
+        Returns:
+            bool: True when the partitions were drained before the timeout, False otherwise
+        """
+        deadline = time.monotonic() + timeout
+        while self.pending(partitions):
+            if (remaining := deadline - time.monotonic()) <= 0:
+                return False
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), remaining)
+            except TimeoutError:
+                return False
+        return True
+
+    def discard(self, partitions: set[TopicPartition]) -> None:
+        """Forget the in-flight offsets of the partitions and bump their generation."""
+        for partition in partitions:
+            self._pending.pop(partition, None)
+            self._completed.pop(partition, None)
+            self._generations[partition] = self.generation(partition) + 1
+
+
+class BrokerOffsetCommitter:
+    """Accumulate processed offsets and commit them as explicit partition maps.
+
+    A commit is issued once ``max_messages`` offsets were marked or, when ``interval_ms`` is set,
+    once the interval elapsed since the last commit.
+    """
+
+    def __init__(
+        self,
+        consumer: AIOKafkaConsumer,
+        max_messages: int = 1,
+        interval_ms: int = 0,
+        metrics: BrokerMetrics | None = None,
+    ) -> None:
+        """Initialize the offset committer, recording the commits latency in the metrics when provided."""
+        self._consumer = consumer
+        self._metrics = metrics
+        self._max_messages = max_messages
+        self._interval = interval_ms / 1000
+        self._offsets: dict[TopicPartition, int] = {}
+        self._marked = 0
+        self._last_commit = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _is_due(self) -> bool:
+        """Check if the commit policy is reached."""
+        if self._marked >= self._max_messages:
+            return True
+        return bool(self._interval) and time.monotonic() - self._last_commit >= self._interval
+
+    async def mark(self, partition: TopicPartition, offset: int, messages: int = 1) -> None:
+        """Mark the next offset to consume on a partition as committable, counting the messages it covers."""
+        self._offsets[partition] = max(offset, self._offsets.get(partition, offset))
+        self._marked += messages
+        if self._is_due():
+            await self.flush()
+
+    async def flush(self, partitions: set[TopicPartition] | None = None) -> None:
+        """Commit the marked offsets, restricted to the given partitions when provided."""
+        async with self._lock:
+            offsets = {
+                partition: offset
+                for partition, offset in self._offsets.items()
+                if partitions is None or partition in partitions
+            }
+            if partitions is None:
+                self._marked = 0
+                self._last_commit = time.monotonic()
+            if not offsets:
+                return
+            for partition in offsets:
+                del self._offsets[partition]
+            started = time.perf_counter()
+            try:
+                await self._consumer.commit(offsets)
+            except Exception:
+                for partition, offset in offsets.items():
+                    self._offsets[partition] = max(offset, self._offsets.get(partition, offset))
+                raise
+            if self._metrics:
+                self._metrics.observe_commit(offsets, time.perf_counter() - started)
+            logger.info(f'{LOG_PREFIX}[COMMIT][OFFSETS: {offsets}]')
+
+    async def flush_periodically(self) -> None:
+        """Flush the marked offsets every interval, meant to run as a background task.
+
+        A failed commit is logged and its offsets are kept, so the next interval commits them again.
+        """
+        while True:
+            await asyncio.sleep(self._interval)
+            if time.monotonic() - self._last_commit < self._interval:
+                continue
+            try:
+                await self.flush()
+            except Exception as err:
+                logger.error(f'{LOG_PREFIX}[COMMIT][ERROR: {err}]')
@@ -1,9 +1,27 @@
-from collections.abc import Awaitable, Callable
+import datetime
+from collections.abc import Callable, Iterable
+from pathlib import Path
 from typing import Any, Protocol
 
-from aiokafka.structs import ConsumerRecord
+from aiokafka.structs import RecordMetadata, TopicPartition
+from pydantic import BaseModel
 
 from .abstracts import BrokerAdapterAbstract
+from .handlers import BrokerBatchHandler, BrokerHandler
+from .replay import BrokerReplayProgress
+from .table import BrokerTable
+
+
+class BrokerBlobStoreProtocol(Protocol):
+    """Protocol for the blob stores keeping the claim-checked message values."""
+
+    async def put(self, reference: str, value: bytes) -> None:
+        """Store a value under its reference."""
+        ...
+
+    async def get(self, reference: str) -> bytes:
+        """Get the value of a reference, raising ``BrokerBlobNotFoundException`` when missing."""
+        ...
 
 
 class BrokerRepositoryProtocol(Protocol):
@@ -17,16 +35,57 @@ class BrokerRepositoryProtocol(Protocol):
         self,
         topic: str,
         key: str | bytes,
-        value: dict[str, Any],
+        value: dict[str, Any] | BaseModel,
         metadata: dict[str, Any] | None = None,
+        headers: list[tuple[str, bytes]] | None = None,
     ) -> None:
         """Produce a message to the broker."""
         ...
 
-    async def consume(self, func: Callable[[ConsumerRecord], Awaitable[None]], wait_time: int = 3) -> None:
+    async def produce_many(
+        self,
+        topic: str,
+        items: Iterable[tuple[str | bytes, dict[str, Any] | BaseModel]],
+        metadata: dict[str, Any] | None = None,
+    ) -> list[RecordMetadata | BaseException]:
+        """Produce many messages to the broker, returning the delivery result of each."""
+        ...
+
+    def register_schema(self, topic: str, model: type[BaseModel]) -> None:
+        """Register the payload model of a topic."""
+        ...
+
+    async def consume(self, func: BrokerHandler, wait_time: int = 3) -> None:
         """Consume a message from the broker."""
         ...
 
+    async def consume_batch(
+        self,
+        func: BrokerBatchHandler,
+        max_records: int | None = None,
+        timeout_ms: int = 1000,
+        wait_time: int = 3,
+    ) -> None:
+        """Consume batches of messages of a partition from the broker."""
+        ...
+
+    async def replay(
+        self,
+        func: BrokerBatchHandler,
+        topics: list[str],
+        since: datetime.datetime | dict[TopicPartition, int],
+        until: datetime.datetime | dict[TopicPartition, int] | None = None,
+        progress_interval: float = 5.0,
+        on_progress: Callable[[BrokerReplayProgress], None] | None = None,
+        wait_time: int = 3,
+    ) -> BrokerReplayProgress:
+        """Reprocess the messages of topics between two timestamps or offsets."""
+        ...
+
+    def table(self, topic: str, path: str | Path | None = None, snapshot_interval: float = 60.0) -> BrokerTable:
+        """Create a local key to value view of a compacted topic."""
+        ...
+
     # async def healthcheck(self) -> tuple[bool, str | None]:
     #    """Check the health of the broker.
 
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING
+
+from aiokafka import AIOKafkaConsumer
+from aiokafka.structs import ConsumerRecord, TopicPartition
+
+from .constants import BROKER_RATE_LIMIT_KEY_PREFIX, LOG_PREFIX
+from .flow import BrokerPartitionPauser
+
+if TYPE_CHECKING:
+    from solkit.cache.protocol import CacheRepositoryProtocol
+
+logger = logging.getLogger(__name__)
+
+
+class BrokerTokenBucket:
+    """Token bucket refilled at ``rate`` tokens per second up to ``capacity``, one second of tokens by default.
+
+    Fetched messages are already in memory, so taking more tokens than available is allowed and puts
+    the bucket in debt, the caller waits for the debt to be refilled before fetching again.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        """Initialize a full token bucket."""
+        self._rate = rate
+        self._capacity = capacity or rate
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+
+    def take(self, amount: float) -> float:
+        """Take tokens, returning the seconds to wait until the bucket is out of debt."""
+        now = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate) - amount
+        self._updated = now
+        return max(-self._tokens / self._rate, 0.0)
+
+
+class BrokerCacheRateWindow:
+    """Rate shared by every replica of a consumer group, counted in one second windows of the cache.
+
+    Each replica adds its fetched amount to the counter of the current window, a replica pushing the counter
+    over the rate waits for the overdraft to be absorbed by the next windows. The rate is not enforced when
+    the cache is unavailable.
+    """
+
+    def __init__(self, cache: 'CacheRepositoryProtocol', key: str, rate: float) -> None:
+        """Initialize the shared rate window."""
+        self._cache = cache
+        self._key = key
+        self._rate = rate
+
+    async def take(self, amount: int) -> float:
+        """Count an amount in the current window, returning the seconds to wait when over the rate."""
+        now = time.time()
+        window = int(now)
+        try:
+            count = await self._cache.increment_key(f'{self._key}:{window}', amount, ttl=2)
+        except Exception as err:
+            logger.error(f'{LOG_PREFIX}[RATE][CACHE][ERROR: {err}]')
+            return 0.0
+        if count <= self._rate:
+            return 0.0
+        return window + 1 - now + (count - self._rate) / self._rate
+
+
+class BrokerRateLimiter:
+    """Limit the consumed messages and bytes per second by pausing the partitions instead of sleeping.
+
+    The fetched messages are taken from the buckets of the consumer, or of their topic when limited per topic.
+    An overdrawn bucket pauses its assigned partitions until it is refilled, the consumer keeps polling
+    meanwhile. With a cache, every replica of the group also takes from shared rate windows, one per lane.
+    """
+
+    reason = 'rate'
+
+    def __init__(
+        self,
+        consumer: AIOKafkaConsumer,
+        pauser: BrokerPartitionPauser | None = None,
+        messages_per_second: float | None = None,
+        bytes_per_second: float | None = None,
+        per_topic: bool = False,
+        cache: 'CacheRepositoryProtocol | None' = None,
+        group_id: str | None = None,
+        lane: str | None = None,
+    ) -> None:
+        """Initialize the rate limiter, the shared rate windows are keyed by group id and lane."""
+        self._consumer = consumer
+        self._pauser = pauser or BrokerPartitionPauser(consumer)
+        self._rates = {'messages': messages_per_second, 'bytes': bytes_per_second}
+        self._per_topic = per_topic
+        self._cache = cache
+        self._group_id = group_id
+        self._lane = lane
+        self._buckets: dict[tuple[str | None, str], BrokerTokenBucket] = {}
+        self._windows: dict[tuple[str | None, str], BrokerCacheRateWindow] = {}
+        self._paused: dict[str | None, set[TopicPartition]] = {}
+        self._resumes: dict[str | None, asyncio.TimerHandle] = {}
+
+    @staticmethod
+    def _size(message: ConsumerRecord) -> int:
+        """Get the serialized size of a message."""
+        return max(message.serialized_key_size, 0) + max(message.serialized_value_size, 0)
+
+    async def _take(self, scope: str | None, measure: str, amount: int) -> float:
+        """Take an amount from the bucket of a scope and from its shared window, returning the seconds to wait."""
+        rate = self._rates[measure]
+        if rate is None or amount <= 0:
+            return 0.0
+        if (scope, measure) not in self._buckets:
+            self._buckets[scope, measure] = BrokerTokenBucket(rate)
+            if self._cache is not None:
+                key = f'{BROKER_RATE_LIMIT_KEY_PREFIX}:{self._group_id}:{self._lane or "*"}:{scope or "*"}:{measure}'
+                self._windows[scope, measure] = BrokerCacheRateWindow(self._cache, key, rate)
+        delay = self._buckets[scope, measure].take(amount)
+        if (window := self._windows.get((scope, measure))) is not None:
+            delay = max(delay, await window.take(amount))
+        return delay
+
+    async def throttle(self, batches: dict[TopicPartition, list[ConsumerRecord]]) -> None:
+        """Take the fetched messages from the buckets, pausing the partitions of the overdrawn scopes."""
+        scopes: dict[str | None, list[ConsumerRecord]] = {}
+        for partition, messages in batches.items():
+            scopes.setdefault(partition.topic if self._per_topic else None, []).extend(messages)
+        for scope, messages in scopes.items():
+            delay = max(
+                await self._take(scope, 'messages', len(messages)),
+                await self._take(scope, 'bytes', sum(self._size(message) for message in messages)),
+            )
+            if delay > 0:
+                self._pause(scope, delay)
+
+    def _pause(self, scope: str | None, delay: float) -> None:
+        """Pause the assigned partitions of a scope for a delay."""
+        partitions = {partition for partition in self._consumer.assignment() if scope in (None, partition.topic)}
+        for partition in partitions - self._paused.get(scope, set()):
+            self._pauser.pause(partition, self.reason)
+        self._paused.setdefault(scope, set()).update(partitions)
+        if scope in self._resumes:
+            self._resumes[scope].cancel()
+        self._resumes[scope] = asyncio.get_running_loop().call_later(delay, self._resume, scope)
+        logger.debug(f'{LOG_PREFIX}[RATE][PAUSE][SCOPE: {scope or "*"} - DELAY: {delay:.3f}]')
+
+    def _resume(self, scope: str | None) -> None:
+        """Resume the partitions of a scope once its bucket is refilled."""
+        del self._resumes[scope]
+        for partition in self._paused.pop(scope, set()):
+            self._pauser.resume(partition, self.reason)
+
+    async def release(self, partitions: set[TopicPartition] | None = None) -> None:
+        """Forget the given revoked partitions, or cancel every pending resume when not provided."""
+        if partitions is not None:
+            for paused in self._paused.values():
+                paused.difference_update(partitions)
+            return
+        for resume in self._resumes.values():
+            resume.cancel()
+        self._resumes.clear()
+        self._paused.clear()
@@ -0,0 +1,51 @@
+import logging
+from collections.abc import Awaitable, Callable
+
+from aiokafka import ConsumerRebalanceListener
+from aiokafka.structs import TopicPartition
+
+from .constants import LOG_PREFIX
+
+logger = logging.getLogger(__name__)
+
+RevokedCallback = Callable[[set[TopicPartition]], Awaitable[None]]
+AssignedCallback = Callable[[set[TopicPartition]], Awaitable[None]]
+
+
+class BrokerRebalanceListener(ConsumerRebalanceListener):
+    """Rebalance listener running the registered callbacks before partitions are revoked and once assigned."""
+
+    def __init__(self) -> None:
+        """Initialize the rebalance listener."""
+        self._revoked_callbacks: list[RevokedCallback] = []
+        self._assigned_callbacks: list[AssignedCallback] = []
+
+    def add_revoked_callback(self, callback: RevokedCallback) -> None:
+        """Register a callback awaited with the revoked partitions."""
+        self._revoked_callbacks.append(callback)
+
+    def remove_revoked_callback(self, callback: RevokedCallback) -> None:
+        """Unregister a revoked partitions callback."""
+        if callback in self._revoked_callbacks:
+            self._revoked_callbacks.remove(callback)
+
+    def add_assigned_callback(self, callback: AssignedCallback) -> None:
+        """Register a callback awaited with the assigned partitions."""
+        self._assigned_callbacks.append(callback)
+
+    def remove_assigned_callback(self, callback: AssignedCallback) -> None:
+        """Unregister an assigned partitions callback."""
+        if callback in self._assigned_callbacks:
+            self._assigned_callbacks.remove(callback)
+
+    async def on_partitions_revoked(self, revoked: list[TopicPartition]) -> None:  # type: ignore
+        """Run the revoked callbacks before the partitions are reassigned."""
+        logger.info(f'{LOG_PREFIX}[REBALANCE][REVOKED: {revoked}]')
+        for callback in self._revoked_callbacks:
+            await callback(set(revoked))
+
+    async def on_partitions_assigned(self, assigned: list[TopicPartition]) -> None:  # type: ignore
+        """Run the assigned callbacks once the partitions are assigned."""
+        logger.info(f'{LOG_PREFIX}[REBALANCE][ASSIGNED: {assigned}]')
+        for callback in self._assigned_callbacks:
+            await callback(set(assigned))
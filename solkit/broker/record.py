@@ -0,0 +1,147 @@
+from collections.abc import Sequence
+from functools import cached_property
+from typing import Any
+
+from aiokafka.structs import ConsumerRecord
+from pydantic import BaseModel, TypeAdapter
+
+from .codecs import BrokerCodec
+from .constants import (
+    BROKER_CLAIM_CHECK_HEADER,
+    BROKER_ENVELOPE_VERSION_HEADER,
+    BROKER_ERROR_HEADER,
+    BROKER_METADATA_HEADER_PREFIX,
+    BROKER_RETRY_COUNT_HEADER,
+    BrokerContentType,
+    BrokerEnvelopeVersion,
+)
+
+
+class BrokerRecord:
+    """Consumed message exposing the consumer record attributes and decoding its value on first access."""
+
+    def __init__(
+        self,
+        consumer_record: ConsumerRecord,
+        codec: BrokerCodec,
+        schema: TypeAdapter[BaseModel] | None = None,
+        payload: bytes | None = None,
+    ) -> None:
+        """Initialize the broker record, the data is validated against the schema when provided.
+
+        The payload is the value of a claim-checked record loaded from the blob store, the consumer record
+        keeps the reference so retries forward the reference only.
+        """
+        self.consumer_record = consumer_record
+        self._codec = codec
+        self._schema = schema
+        self.payload = payload
+
+    def __getstate__(self) -> dict[str, Any]:
+        """Decode the data and metadata before pickling, so the record is handed to other processes without codec."""
+        _, _ = self.data, self.metadata
+        return {**self.__dict__, '_codec': None, '_schema': None}
+
+    @property
+    def topic(self) -> str:
+        """Get the topic."""
+        return self.consumer_record.topic
+
+    @property
+    def partition(self) -> int:
+        """Get the partition."""
+        return self.consumer_record.partition
+
+    @property
+    def offset(self) -> int:
+        """Get the offset."""
+        return self.consumer_record.offset
+
+    @property
+    def timestamp(self) -> int:
+        """Get the timestamp."""
+        return self.consumer_record.timestamp
+
+    @property
+    def key(self) -> bytes | None:
+        """Get the raw key."""
+        return self.consumer_record.key
+
+    @property
+    def value(self) -> bytes | None:
+        """Get the raw value, the rehydrated payload for a claim-checked record."""
+        if self.payload is not None:
+            return self.payload
+        if self.claim_check is not None:
+            raise ValueError(f'Claim-checked record not rehydrated: {self.claim_check}')
+        return self.consumer_record.value
+
+    @property
+    def headers(self) -> Sequence[tuple[str, bytes]]:
+        """Get the raw headers."""
+        return self.consumer_record.headers
+
+    @cached_property
+    def header_map(self) -> dict[str, bytes]:
+        """Get the headers as a dictionary, the last value wins for repeated headers."""
+        return dict(self.consumer_record.headers)
+
+    @cached_property
+    def claim_check(self) -> str | None:
+        """Get the blob store reference of a claim-checked record."""
+        reference = self.header_map.get(BROKER_CLAIM_CHECK_HEADER)
+        return reference.decode('utf-8') if reference else None
+
+    @cached_property
+    def envelope_version(self) -> BrokerEnvelopeVersion:
+        """Get the envelope version, messages without version header use the version 1."""
+        version = self.header_map.get(BROKER_ENVELOPE_VERSION_HEADER)
+        return BrokerEnvelopeVersion(version.decode('utf-8')) if version else BrokerEnvelopeVersion.V1
+
+    @cached_property
+    def _envelope(self) -> dict[str, Any]:
+        """Decode the version 1 envelope."""
+        return self._codec.decode(self.value)  # type: ignore
+
+    @cached_property
+    def data(self) -> dict[str, Any] | BaseModel:
+        """Decode the message data, validated against the topic schema when registered.
+
+        JSON version 2 envelopes are decoded and validated in a single pass over the raw value.
+        """
+        if self.envelope_version == BrokerEnvelopeVersion.V1:
+            data = self._envelope.get('data', {})
+        elif self._schema is not None and self._codec.content_type == BrokerContentType.JSON:
+            return self._schema.validate_json(self.value)  # type: ignore
+        else:
+            data = self._codec.decode(self.value)  # type: ignore
+        return self._schema.validate_python(data) if self._schema is not None else data
+
+    @cached_property
+    def metadata(self) -> dict[str, str]:
+        """Get the message metadata."""
+        if self.envelope_version == BrokerEnvelopeVersion.V2:
+            prefix_length = len(BROKER_METADATA_HEADER_PREFIX)
+            return {
+                name[prefix_length:]: value.decode('utf-8')
+                for name, value in self.header_map.items()
+                if name.startswith(BROKER_METADATA_HEADER_PREFIX)
+            }
+        return self._envelope.get('metadata', {})
+
+    @property
+    def error(self) -> str | None:
+        """Get the error of the previous attempt of a retried message.
+
+        Version 1 envelopes carry it in their metadata, unless claim-checked since their value is forwarded as is.
+        """
+        if self.envelope_version == BrokerEnvelopeVersion.V2 or self.claim_check is not None:
+            error = self.header_map.get(BROKER_ERROR_HEADER)
+            return error.decode('utf-8') if error else None
+        return self.metadata.get('error')
+
+    @property
+    def retry_count(self) -> int:
+        """Get the number of previous attempts of a retried message."""
+        retry_count = self.header_map.get(BROKER_RETRY_COUNT_HEADER)
+        return int(retry_count.decode('utf-8')) if retry_count else 0
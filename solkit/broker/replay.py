@@ -0,0 +1,51 @@
+import time
+
+from aiokafka.structs import TopicPartition
+
+
+class BrokerReplayProgress:
+    """Progress of a replay between the start and end offsets of its partitions."""
+
+    def __init__(self, start_offsets: dict[TopicPartition, int], end_offsets: dict[TopicPartition, int]) -> None:
+        """Initialize the progress at the start offsets."""
+        self.start_offsets = start_offsets
+        self.end_offsets = end_offsets
+        self.positions = dict(start_offsets)
+        self.messages = 0
+        self._started = time.monotonic()
+
+    def advance(self, partition: TopicPartition, position: int, messages: int) -> None:
+        """Move a partition to its next position after its replayed messages."""
+        self.positions[partition] = position
+        self.messages += messages
+
+    def is_done(self, partition: TopicPartition) -> bool:
+        """Check whether a partition reached its end offset."""
+        return self.positions[partition] >= self.end_offsets[partition]
+
+    @property
+    def total(self) -> int:
+        """Get the number of offsets to replay."""
+        return sum(max(self.end_offsets[partition] - offset, 0) for partition, offset in self.start_offsets.items())
+
+    @property
+    def remaining(self) -> int:
+        """Get the number of offsets left to replay."""
+        return sum(max(self.end_offsets[partition] - offset, 0) for partition, offset in self.positions.items())
+
+    @property
+    def elapsed(self) -> float:
+        """Get the seconds since the replay started."""
+        return time.monotonic() - self._started
+
+    @property
+    def rate(self) -> float:
+        """Get the replayed messages per second."""
+        return self.messages / elapsed if (elapsed := self.elapsed) > 0 else 0.0
+
+    def __repr__(self) -> str:
+        """Summarize the progress."""
+        return (
+            f'BrokerReplayProgress(messages={self.messages}, remaining={self.remaining}/{self.total}, '
+            f'rate={self.rate:.0f}/s)'
+        )
@@ -1,11 +1,20 @@
 import asyncio
+import copy
 import datetime
-import json
+import itertools
 import logging
-from collections.abc import Awaitable, Callable
-from typing import Any
+import time
+from collections.abc import AsyncIterator, Callable, Coroutine, Hashable, Iterable
+from concurrent.futures import Executor
+from contextlib import asynccontextmanager
+from functools import cached_property
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
-from aiokafka.structs import ConsumerRecord
+from aiokafka import AIOKafkaConsumer
+from aiokafka.errors import ConsumerStoppedError
+from aiokafka.structs import ConsumerRecord, RecordMetadata, TopicPartition
+from pydantic import BaseModel, TypeAdapter
 
 from solkit.common.trace_correlation_id import (
     CORRELATION_ID_HEADER,
@@ -14,7 +23,41 @@ from solkit.common.trace_correlation_id import (
 )
 
 from .adapter import BrokerKafkaAdapter
-from .constants import BROKER_DEAD_LETTER_QUEUE_SUFFIX, BROKER_RETRY_SUFFIX, LOG_PREFIX
+from .circuit import BrokerCircuitBreaker
+from .claim_check import BrokerClaimCheck
+from .codecs import BROKER_CODECS, BROKER_DEFAULT_CODEC, BrokerCodec
+from .constants import (
+    BROKER_CONTENT_TYPE_HEADER,
+    BROKER_DEAD_LETTER_QUEUE_SUFFIX,
+    BROKER_ENVELOPE_VERSION_HEADER,
+    BROKER_ERROR_HEADER,
+    BROKER_FETCH_TIMEOUT_MS,
+    BROKER_METADATA_HEADER_PREFIX,
+    BROKER_RETRY_COUNT_HEADER,
+    BROKER_RETRY_NOT_BEFORE_HEADER,
+    BROKER_RETRY_SUFFIX,
+    LOG_PREFIX,
+    BrokerCircuitState,
+    BrokerConsumeLane,
+    BrokerConsumeMode,
+    BrokerContentType,
+    BrokerEnvelopeVersion,
+)
+from .dedupe import BrokerDeduplicator
+from .exceptions import BrokerBatchException, BrokerCircuitOpenException
+from .flow import BrokerBackpressure, BrokerPartitionPauser
+from .handlers import BrokerBatchHandler, BrokerHandler, BrokerHandlerRunner
+from .metrics import BrokerMetrics
+from .offsets import BrokerOffsetCommitter, BrokerOffsetTracker
+from .rate import BrokerRateLimiter
+from .record import BrokerRecord
+from .replay import BrokerReplayProgress
+from .retry import BrokerRetryScheduler
+from .table import BrokerTable
+from .transaction import BrokerTransactionCommitter
+
+if TYPE_CHECKING:
+    from solkit.cache.protocol import CacheRepositoryProtocol
 
 logger = logging.getLogger(__name__)
 
@@ -22,10 +65,47 @@ logger = logging.getLogger(__name__)
 class BrokerRepository:
     """Broker repository."""
 
-    def __init__(self, adapter: BrokerKafkaAdapter, metadata: dict[str, str] | None = None) -> None:
-        """Initialize the broker repository."""
+    def __init__(
+        self,
+        adapter: BrokerKafkaAdapter,
+        metadata: dict[str, str] | None = None,
+        codec: BrokerCodec | None = None,
+        envelope_version: BrokerEnvelopeVersion = BrokerEnvelopeVersion.V1,
+        deduplicator: BrokerDeduplicator | None = None,
+        executor: Executor | None = None,
+        metrics: BrokerMetrics | None = None,
+        claim_check: BrokerClaimCheck | None = None,
+        rate_limit_cache: 'CacheRepositoryProtocol | None' = None,
+    ) -> None:
+        """Initialize the broker repository.
+
+        The codec encodes the produced messages, consumed messages are decoded by the codec matching
+        their content type header so producers and consumers can switch codecs independently.
+        The envelope version sets how produced messages carry their metadata, consumed messages
+        of both versions are supported.
+        The optional deduplicator skips the consumed messages already processed by the consumer group.
+        Sync handlers run on the executor, the default thread pool of the event loop when not provided.
+        The consume metrics are recorded in ``metrics``, a new instance when not provided.
+        The optional claim check offloads the oversized produced values to its blob store and rehydrates
+        the consumed references right before their handler runs.
+        The optional rate limit cache shares the consumed rate limits of the settings between every replica
+        of the consumer group, each replica only enforces them on its own when not provided.
+        """
         self._adapter = adapter
         self._common_metadata = metadata
+        self._codec = codec or BROKER_DEFAULT_CODEC
+        self._content_type_header = (BROKER_CONTENT_TYPE_HEADER, bytes(self._codec.content_type, 'utf-8'))
+        self._decoders: dict[str, BrokerCodec] = {self._codec.content_type: self._codec}
+        self._envelope_version = envelope_version
+        self._schemas: dict[str, TypeAdapter[BaseModel]] = {}
+        self._deduplicator = deduplicator
+        self._executor = executor
+        self.metrics = metrics or BrokerMetrics()
+        self._claim_check = claim_check
+        self._rate_limit_cache = rate_limit_cache
+        self._lane: BrokerConsumeLane | None = None
+        self._stopping = asyncio.Event()
+        self._consumption: asyncio.Task[Any] | None = None
 
     @staticmethod
     def _parse_message_key(key: str | bytes) -> bytes:
@@ -35,16 +115,94 @@ class BrokerRepository:
         return key
 
     @staticmethod
-    def _parse_message_value(data: dict[str, Any], metadata: dict[str, str]) -> bytes:
+    def _parse_message_value(
+        data: dict[str, Any], metadata: dict[str, str], codec: BrokerCodec = BROKER_DEFAULT_CODEC
+    ) -> bytes:
         """Concatenate the data and metadata into a bytes object."""
-        return bytes(json.dumps({'data': data, 'metadata': metadata}), 'utf-8')
+        return codec.encode({'data': data, 'metadata': metadata})
 
     @staticmethod
-    def _unparse_message_value(value: bytes) -> tuple[dict[str, Any], dict[str, str]]:
+    def _unparse_message_value(
+        value: bytes, codec: BrokerCodec = BROKER_DEFAULT_CODEC
+    ) -> tuple[dict[str, Any], dict[str, str]]:
         """Unparse the value into a tuple of data and metadata."""
-        value_dict: dict = json.loads(value.decode('utf-8'))
+        value_dict = codec.decode(value)
         return value_dict.get('data', {}), value_dict.get('metadata', {})
 
+    @staticmethod
+    def _metadata_headers(metadata: dict[str, Any]) -> list[tuple[str, bytes]]:
+        """Build one header per metadata entry for the version 2 envelope."""
+        return [
+            (f'{BROKER_METADATA_HEADER_PREFIX}{name}', bytes(str(value), 'utf-8')) for name, value in metadata.items()
+        ]
+
+    def _encode_message(self, value: dict[str, Any], metadata: dict[str, Any]) -> tuple[bytes, list[tuple[str, bytes]]]:
+        """Encode a message following the envelope version, returning its value and envelope headers."""
+        if self._envelope_version == BrokerEnvelopeVersion.V2:
+            envelope_headers = [(BROKER_ENVELOPE_VERSION_HEADER, bytes(BrokerEnvelopeVersion.V2, 'utf-8'))]
+            return self._codec.encode(value), envelope_headers + self._metadata_headers(metadata)
+        return self._parse_message_value(value, metadata, self._codec), []
+
+    def _get_codec(self, message: ConsumerRecord) -> BrokerCodec:
+        """Get the codec matching the media type of the content type header, messages without header are JSON.
+
+        The parameters of the content type, e.g. ``charset``, are ignored.
+        """
+        content_type = BrokerContentType.JSON.value
+        for header in message.headers:
+            if header[0] == BROKER_CONTENT_TYPE_HEADER:
+                content_type = header[1].decode('utf-8').split(';', 1)[0].strip().lower()
+                break
+        if content_type not in self._decoders:
+            if content_type not in BROKER_CODECS:
+                raise ValueError(f'Unsupported message content type: {content_type}')
+            self._decoders[content_type] = BROKER_CODECS[BrokerContentType(content_type)]()
+        return self._decoders[content_type]
+
+    def _to_record(self, message: ConsumerRecord) -> BrokerRecord:
+        """Wrap a consumer record to decode its value lazily."""
+        return BrokerRecord(message, self._get_codec(message), self._get_schema(message.topic))
+
+    async def _load_record(self, message: ConsumerRecord) -> BrokerRecord:
+        """Wrap a consumer record for its handler, loading its value from the blob store when claim-checked."""
+        record = self._to_record(message)
+        if self._claim_check:
+            return await self._claim_check.rehydrate(record)
+        return record
+
+    async def _offload(self, topic: str, value: bytes) -> tuple[bytes, list[tuple[str, bytes]]]:
+        """Offload an oversized value to the blob store of the claim check, returning the value and headers."""
+        if self._claim_check:
+            return await self._claim_check.offload(topic, value)
+        return value, []
+
+    @staticmethod
+    def _base_topic(topic: str) -> str:
+        """Get the topic a retry or dead letter queue topic derives from."""
+        return topic.split(BROKER_RETRY_SUFFIX)[0].removesuffix(BROKER_DEAD_LETTER_QUEUE_SUFFIX)
+
+    def register_schema(self, topic: str, model: type[BaseModel]) -> None:
+        """Register the payload model of a topic, also applied to its retry and dead letter queue topics.
+
+        Consumed data is validated into the model and produced values are validated against it,
+        the validator is built once here and reused for every message.
+        """
+        self._schemas[topic] = TypeAdapter(model)
+
+    def _get_schema(self, topic: str) -> TypeAdapter[BaseModel] | None:
+        """Get the registered payload schema of a topic."""
+        if not self._schemas:
+            return None
+        return self._schemas.get(self._base_topic(topic))
+
+    def _serialize_value(self, topic: str, value: dict[str, Any] | BaseModel) -> dict[str, Any]:
+        """Validate a value against the topic schema when registered and serialize it for the codec."""
+        if (schema := self._get_schema(topic)) is not None:
+            return schema.dump_python(schema.validate_python(value), mode='json')
+        if isinstance(value, BaseModel):
+            return value.model_dump(mode='json')
+        return value
+
     @staticmethod
     def _set_correlation_id() -> list[tuple[str, bytes]]:
         """Set the correlation id in the headers."""
@@ -94,50 +252,858 @@ class BrokerRepository:
         self,
         topic: str,
         key: str | bytes,
-        value: dict[str, Any],
+        value: dict[str, Any] | BaseModel,
         metadata: dict[str, Any] | None = None,
+        headers: list[tuple[str, bytes]] | None = None,
     ) -> None:
         """Produce a message to a Kafka topic."""
+        await self._send(topic, key, self._serialize_value(topic, value), metadata, headers)
+
+    async def _send(
+        self,
+        topic: str,
+        key: str | bytes,
+        value: dict[str, Any],
+        metadata: dict[str, Any] | None = None,
+        headers: list[tuple[str, bytes]] | None = None,
+    ) -> None:
+        """Encode and produce an already serialized value, skipping the validation against the topic schema."""
         producer_metadata = self._concat_metadata(topic, metadata)
+        message_value, envelope_headers = self._encode_message(value, producer_metadata)
+        message_value, claim_check_headers = await self._offload(topic, message_value)
+        envelope_headers.extend(claim_check_headers)
 
         await self._adapter.producer.send_and_wait(
             topic=topic,
             key=self._parse_message_key(key),
-            value=self._parse_message_value(value, producer_metadata),
-            headers=self._set_correlation_id(),
+            value=message_value,
+            headers=self._set_correlation_id() + [self._content_type_header] + envelope_headers + (headers or []),
         )
         logger.info(f'{LOG_PREFIX}[PRODUCE][TOPIC: {topic} - KEY: {key}]')
 
-    async def consume(self, func: Callable[[ConsumerRecord], Awaitable[None]], wait_time: int = 3) -> None:
-        """Consume messages from a Kafka topic."""
-        async for message in self._adapter.consumer:
-            self._get_correlation_id(message)
+    async def produce_many(
+        self,
+        topic: str,
+        items: Iterable[tuple[str | bytes, dict[str, Any] | BaseModel]],
+        metadata: dict[str, Any] | None = None,
+    ) -> list[RecordMetadata | BaseException]:
+        """Produce many messages to a Kafka topic without waiting for each acknowledgement.
+
+        Every message is queued on the producer so the client batches them, the deliveries are awaited together.
+
+        Returns:
+            list[RecordMetadata | BaseException]: the delivery metadata or the error of each item, in items order
+        """
+        producer_metadata = self._concat_metadata(topic, metadata)
+        headers = self._set_correlation_id() + [self._content_type_header]
+        sent: list[asyncio.Future[RecordMetadata] | BaseException] = []
+        for key, value in items:
+            try:
+                message_value, envelope_headers = self._encode_message(
+                    self._serialize_value(topic, value), producer_metadata
+                )
+                message_value, claim_check_headers = await self._offload(topic, message_value)
+                envelope_headers.extend(claim_check_headers)
+                delivery = await self._adapter.producer.send(
+                    topic=topic,
+                    key=self._parse_message_key(key),
+                    value=message_value,
+                    headers=headers + envelope_headers,
+                )
+            except Exception as err:
+                sent.append(err)
+            else:
+                sent.append(delivery)
+        deliveries = iter(
+            await asyncio.gather(
+                *(delivery for delivery in sent if isinstance(delivery, asyncio.Future)),
+                return_exceptions=True,
+            )
+        )
+        results = [next(deliveries) if isinstance(delivery, asyncio.Future) else delivery for delivery in sent]
+        failed = sum(isinstance(result, BaseException) for result in results)
+        logger.info(f'{LOG_PREFIX}[PRODUCE][BATCH][TOPIC: {topic} - SIZE: {len(results)} - FAILED: {failed}]')
+        return results
+
+    async def _retry_message(self, message: ConsumerRecord, err: Exception, wait_time: int) -> None:
+        """Route a failed message to the next retry topic or to the dead letter queue.
+
+        Retry messages carry a not before header so they are held back ``wait_time`` seconds by the consumer.
+        Version 1 envelopes are re-encoded with the error in their metadata, their data is not validated against
+        the topic schema again since it may be the very cause of the failure. The other messages are forwarded
+        with their original value and headers: version 2 envelopes, claim-checked messages, keeping the blob
+        store reference, and the messages which cannot be decoded.
+        """
+        if next_retry_topic := self._next_retry_topic(
+            message.topic,
+            self._adapter.consumer_settings.retry_max_times,
+        ):
+            logger.info(f'{LOG_PREFIX}[RETRY][TOPIC: {next_retry_topic} - KEY: {message.key} - WAIT: {wait_time}]')
+            headers = [(BROKER_RETRY_COUNT_HEADER, bytes(str(self._retry_count(message) + 1), 'utf-8'))]
+            if next_retry_topic.find(BROKER_RETRY_SUFFIX) > 0:
+                headers.append(BrokerRetryScheduler.not_before_header(wait_time))
+                self.metrics.observe_retry(message.topic)
+            else:
+                self.metrics.observe_dead_letter(message.topic)
+            if (envelope := self._unparse_retry_value(message)) is None:
+                await self._forward_message(next_retry_topic, message, err, headers)
+                return
+            value, metadata = envelope
+            metadata.update({'error': repr(err)})
+            await self._send(
+                topic=next_retry_topic,
+                key=message.key,  # type: ignore
+                value=value,
+                metadata=metadata,
+                headers=headers,
+            )
+
+    @staticmethod
+    def _retry_count(message: ConsumerRecord) -> int:
+        """Get the number of previous attempts of a failed message."""
+        retry_count = dict(message.headers).get(BROKER_RETRY_COUNT_HEADER)
+        return int(retry_count.decode('utf-8')) if retry_count else 0
+
+    def _unparse_retry_value(self, message: ConsumerRecord) -> tuple[dict[str, Any], dict[str, str]] | None:
+        """Unparse the version 1 envelope of a failed message into a tuple of data and metadata.
+
+        Returns:
+            tuple[dict[str, Any], dict[str, str]] | None: the data and metadata, None for the messages to forward
+        """
+        try:
+            record = self._to_record(message)
+            if record.envelope_version == BrokerEnvelopeVersion.V2 or record.claim_check is not None:
+                return None
+            return self._unparse_message_value(message.value, self._get_codec(message))  # type: ignore
+        except Exception as err:
+            logger.warning(
+                f'{LOG_PREFIX}[RETRY][UNDECODABLE][TOPIC: {message.topic} - OFFSET: {message.offset} - ERROR: {err}]'
+            )
+            return None
+
+    async def _forward_message(
+        self,
+        topic: str,
+        message: ConsumerRecord,
+        err: Exception,
+        headers: list[tuple[str, bytes]],
+    ) -> None:
+        """Forward a message with its original key and value, replacing its retry headers."""
+        replaced_headers = {BROKER_ERROR_HEADER, BROKER_RETRY_COUNT_HEADER, BROKER_RETRY_NOT_BEFORE_HEADER}
+        forwarded_headers = [header for header in message.headers if header[0] not in replaced_headers]
+        forwarded_headers.append((BROKER_ERROR_HEADER, bytes(repr(err), 'utf-8')))
+        forwarded_headers.extend(self._metadata_headers(self._concat_metadata(topic, None)))
+        await self._adapter.producer.send_and_wait(
+            topic=topic,
+            key=message.key,
+            value=message.value,
+            headers=forwarded_headers + headers,
+        )
+        logger.info(f'{LOG_PREFIX}[FORWARD][TOPIC: {topic} - KEY: {message.key}]')
+
+    @cached_property
+    def _handler_runner(self) -> BrokerHandlerRunner:
+        """Get the runner of the consume handlers."""
+        settings = self._adapter.consumer_settings
+        return BrokerHandlerRunner(
+            self._executor,
+            settings.handler_concurrency,
+            timeout=settings.handler_timeout_ms / 1000 if settings.handler_timeout_ms else None,
+            soft_timeout=settings.handler_soft_timeout_ms / 1000 if settings.handler_soft_timeout_ms else None,
+        )
+
+    async def _process_message(
+        self,
+        func: BrokerHandler,
+        message: ConsumerRecord,
+        wait_time: int,
+        circuit_breaker: BrokerCircuitBreaker | None = None,
+    ) -> None:
+        """Run the handler for a message and route it to the next retry topic on failure.
+
+        With a circuit breaker, a message failing while the circuit is not closed is held instead of routed,
+        and handled again once the circuit lets it through, unless its partition is revoked meanwhile.
+        The handler metrics are recorded once per message, with the duration of the attempt deciding its outcome.
+        """
+        self._get_correlation_id(message)
+        partition = TopicPartition(message.topic, message.partition)
+        revocations = circuit_breaker.revocations(partition) if circuit_breaker else 0
+        while True:
+            probe = await circuit_breaker.acquire(partition, revocations) if circuit_breaker else False
+            started = time.perf_counter()
             try:
                 logger.info(f'{LOG_PREFIX}[CONSUME][TOPIC: {message.topic} - KEY: {message.key}]')
-                await func(message)
+                await self._handler_runner.run(func, await self._load_record(message))
             # except DLQMessageException as err:
             except Exception as err:
                 logger.error(f'{LOG_PREFIX}[CONSUME][ERROR: {err}]')
+                if circuit_breaker and circuit_breaker.failure(probe):
+                    logger.warning(f'{LOG_PREFIX}[CIRCUIT][HOLD][TOPIC: {message.topic} - OFFSET: {message.offset}]')
+                    continue
+                duration = time.perf_counter() - started
+                await self._retry_message(message, err, wait_time)
+            else:
+                duration = time.perf_counter() - started
+                if circuit_breaker:
+                    circuit_breaker.success(probe)
+            break
+        self.metrics.observe_handler(message.topic, duration)
+        if self._deduplicator and not self._adapter.transactional:
+            self._deduplicator.mark(message)
+
+    async def _retry_failed_message(self, message: ConsumerRecord, err: Exception, wait_time: int) -> None:
+        """Restore the correlation id of a failed batch message and route it to the next retry topic."""
+        self._get_correlation_id(message)
+        logger.error(f'{LOG_PREFIX}[CONSUME][TOPIC: {message.topic} - OFFSET: {message.offset} - ERROR: {err}]')
+        await self._retry_message(message, err, wait_time)
+
+    async def _process_batch(
+        self,
+        func: BrokerBatchHandler,
+        messages: list[ConsumerRecord],
+        wait_time: int,
+    ) -> None:
+        """Run the handler for the batch of a partition and route only the failed messages on failure."""
+        started = time.perf_counter()
+        try:
+            logger.info(f'{LOG_PREFIX}[CONSUME][BATCH][TOPIC: {messages[0].topic} - SIZE: {len(messages)}]')
+            records = await asyncio.gather(*(self._load_record(message) for message in messages))
+            await self._handler_runner.run(func, list(records))
+        except BrokerBatchException as err:
+            failures = [(record.consumer_record, error) for record, error in err.failures]
+        except Exception as err:
+            failures = [(message, err) for message in messages]
+        else:
+            failures = []
+        self.metrics.observe_handler(messages[0].topic, time.perf_counter() - started, len(messages))
+        await asyncio.gather(*(self._retry_failed_message(message, err, wait_time) for message, err in failures))
+        if self._deduplicator:
+            for message in messages:
+                self._deduplicator.mark(message)
+
+    async def _fetch(
+        self,
+        retries: BrokerRetryScheduler,
+        rate_limiter: BrokerRateLimiter | None = None,
+        max_records: int | None = None,
+        timeout_ms: int = BROKER_FETCH_TIMEOUT_MS,
+    ) -> AsyncIterator[dict[TopicPartition, list[tuple[ConsumerRecord, bool]]]]:
+        """Fetch the due messages of every assigned partition until the consumer or the repository stops.
+
+        Each message is flagged as duplicated when the deduplicator has already seen it, the whole fetched
+        batch is checked with a single lookup. The due messages are taken from the rate limiter, which pauses
+        the partitions exceeding the rate limits.
+        """
+        while not self._stopping.is_set():
+            if self._deduplicator:
+                await self._deduplicator.flush()
+            try:
+                fetched = await self._adapter.consumer.getmany(timeout_ms=timeout_ms, max_records=max_records)
+            except ConsumerStoppedError:
+                return
+            batches = {
+                partition: [message for message in messages if not retries.hold(message)]
+                for partition, messages in fetched.items()
+            }
+            if rate_limiter:
+                await rate_limiter.throttle(batches)
+            due = list(itertools.chain.from_iterable(batches.values()))
+            duplicates = iter(await self._deduplicator.check(due) if self._deduplicator else [False] * len(due))
+            yield {
+                partition: [(message, next(duplicates)) for message in messages]
+                for partition, messages in batches.items()
+            }
+
+    async def _dispatch_worker(
+        self,
+        func: BrokerHandler,
+        queue: asyncio.Queue[tuple[ConsumerRecord, int] | None],
+        offsets: BrokerOffsetTracker,
+        committer: BrokerOffsetCommitter,
+        backpressure: BrokerBackpressure,
+        circuit_breaker: BrokerCircuitBreaker | None,
+        wait_time: int,
+    ) -> None:
+        """Process the queued messages in order until a ``None`` sentinel is received.
+
+        Messages queued before their partition was revoked and discarded are skipped, the new owner
+        consumes them again from the last committed offset, like the messages held by an open circuit
+        when the consumption stops.
+        """
+        while (item := await queue.get()) is not None:
+            message, generation = item
+            partition = TopicPartition(message.topic, message.partition)
+            if offsets.generation(partition) != generation:
+                continue
+            try:
+                await self._process_message(func, message, wait_time, circuit_breaker)
+            except BrokerCircuitOpenException:
+                logger.warning(f'{LOG_PREFIX}[CIRCUIT][SKIP][TOPIC: {message.topic} - OFFSET: {message.offset}]')
+                continue
+            backpressure.done(partition)
+            if (offset := offsets.complete(partition, message.offset)) is not None:
+                await committer.mark(partition, offset)
+
+    async def _consume_concurrently(
+        self,
+        func: BrokerHandler,
+        committer: BrokerOffsetCommitter,
+        retries: BrokerRetryScheduler,
+        rate_limiter: BrokerRateLimiter | None,
+        backpressure: BrokerBackpressure,
+        circuit_breaker: BrokerCircuitBreaker | None,
+        wait_time: int,
+        route: Callable[[ConsumerRecord], Hashable],
+    ) -> None:
+        """Consume messages with one worker per route, keeping the order of the messages sharing a route.
+
+        The fetch loop keeps polling while the workers process the queued messages, the backpressure pauses
+        the partitions with too many in-flight messages. Only the highest contiguous processed offset
+        of each partition is committed. Before partitions are revoked, their in-flight messages are drained
+        within the rebalance drain timeout and their processed offsets are committed. Once the consumer stops,
+        the messages held by an open circuit are skipped without being committed.
+        """
+        offsets = BrokerOffsetTracker()
+        queues: dict[Hashable, asyncio.Queue[tuple[ConsumerRecord, int] | None]] = {}
+        workers: dict[Hashable, asyncio.Task[None]] = {}
+
+        async def drain(partitions: set[TopicPartition]) -> None:
+            """Drain the in-flight messages of the revoked partitions and commit their processed offsets.
+
+            The messages held by a circuit that is not closed are dropped instead of waited for.
+            """
+            timeout = self._adapter.consumer_settings.rebalance_drain_timeout_ms / 1000
+            if circuit_breaker and circuit_breaker.state != BrokerCircuitState.CLOSED:
+                logger.warning(
+                    f'{LOG_PREFIX}[REBALANCE][CIRCUIT {circuit_breaker.state.upper()}][DROP HELD]'
+                    f'[PARTITIONS: {partitions}]'
+                )
+            elif not await offsets.wait_drained(partitions, timeout):
+                logger.warning(
+                    f'{LOG_PREFIX}[REBALANCE][DRAIN TIMEOUT][PENDING: {offsets.pending(partitions)}]'
+                    f'[PARTITIONS: {partitions}]'
+                )
+            offsets.discard(partitions)
+            await committer.flush(partitions)
+
+        self._adapter.rebalance_listener.add_revoked_callback(drain)
+        try:
+            async for batches in self._fetch(retries, rate_limiter):
+                for worker in workers.values():
+                    if worker.done():
+                        worker.result()
+                for message, duplicate in itertools.chain.from_iterable(batches.values()):
+                    partition = TopicPartition(message.topic, message.partition)
+                    offsets.track(partition, message.offset)
+                    if duplicate:
+                        if (offset := offsets.complete(partition, message.offset)) is not None:
+                            await committer.mark(partition, offset)
+                        continue
+                    worker_route = route(message)
+                    if worker_route not in queues:
+                        queues[worker_route] = asyncio.Queue()
+                        workers[worker_route] = asyncio.create_task(
+                            self._dispatch_worker(
+                                func,
+                                queues[worker_route],
+                                offsets,
+                                committer,
+                                backpressure,
+                                circuit_breaker,
+                                wait_time,
+                            )
+                        )
+                        logger.info(f'{LOG_PREFIX}[WORKER][START][ROUTE: {worker_route}]')
+                    backpressure.add(partition)
+                    await queues[worker_route].put((message, offsets.generation(partition)))
+            if circuit_breaker:
+                await circuit_breaker.release()
+            for queue in queues.values():
+                await queue.put(None)
+            await asyncio.gather(*workers.values())
+        finally:
+            self._adapter.rebalance_listener.remove_revoked_callback(drain)
+            for worker in workers.values():
+                worker.cancel()
+            await asyncio.gather(*workers.values(), return_exceptions=True)
+
+    async def _consume_transactionally(
+        self,
+        func: BrokerHandler,
+        transaction: BrokerTransactionCommitter,
+        retries: BrokerRetryScheduler,
+        rate_limiter: BrokerRateLimiter | None,
+        wait_time: int,
+        route: Callable[[ConsumerRecord], Hashable],
+    ) -> None:
+        """Consume messages inside producer transactions committing the produced messages with the consumed offsets.
+
+        Each fetch is processed entirely inside the open transaction, with one task per route keeping the order
+        of the messages sharing a route, so a transaction never holds the messages produced for a consumed
+        message it does not commit. A failure aborts the transaction and stops the consumption, the messages
+        of the aborted transaction are consumed again from the last committed offsets. The processed messages
+        are added to the deduplicator seen-set by the transaction committer, once their transaction is committed.
+        """
+
+        async def process(messages: list[ConsumerRecord]) -> None:
+            """Process the messages of a route in order."""
+            for message in messages:
+                await self._process_message(func, message, wait_time)
+
+        async for batches in self._fetch(retries, rate_limiter):
+            if not any(batches.values()):
+                await transaction.flush_if_due()
+                continue
+            routed: dict[Hashable, list[ConsumerRecord]] = {}
+            for message, duplicate in itertools.chain.from_iterable(batches.values()):
+                if not duplicate:
+                    routed.setdefault(route(message), []).append(message)
+            async with transaction.batch():
+                await asyncio.gather(*(process(messages) for messages in routed.values()))
+                for partition, messages in batches.items():
+                    if messages:
+                        transaction.mark(partition, [message for message, _ in messages])
+
+    @staticmethod
+    def _route_sequentially(message: ConsumerRecord) -> Hashable:
+        """Route every message to a single worker."""
+        return None
+
+    @staticmethod
+    def _route_by_partition(message: ConsumerRecord) -> Hashable:
+        """Route a message to the worker of its partition."""
+        return TopicPartition(message.topic, message.partition)
+
+    def _route_by_key(self, message: ConsumerRecord) -> Hashable:
+        """Route a message to a worker by key, messages without key are routed by partition."""
+        routing_key = message.key if message.key is not None else (message.topic, message.partition)
+        return hash(routing_key) % self._adapter.consumer_settings.key_concurrency
+
+    @asynccontextmanager
+    async def _offset_committer(self) -> AsyncIterator[BrokerOffsetCommitter]:
+        """Provide an offset committer flushed on partitions revocation and on exit."""
+        settings = self._adapter.consumer_settings
+        committer = BrokerOffsetCommitter(
+            self._adapter.consumer,
+            max_messages=settings.commit_max_messages,
+            interval_ms=settings.commit_interval_ms,
+            metrics=self.metrics,
+        )
+        self._adapter.rebalance_listener.add_revoked_callback(committer.flush)
+        periodic_flush = asyncio.create_task(committer.flush_periodically()) if settings.commit_interval_ms else None
+        try:
+            yield committer
+        finally:
+            if periodic_flush:
+                periodic_flush.cancel()
+            self._adapter.rebalance_listener.remove_revoked_callback(committer.flush)
+            await committer.flush()
+
+    @asynccontextmanager
+    async def _transaction_committer(self) -> AsyncIterator[BrokerTransactionCommitter]:
+        """Provide a transaction committer flushed on partitions revocation and on exit."""
+        settings = self._adapter.consumer_settings
+        transaction = BrokerTransactionCommitter(
+            self._adapter.producer,
+            self._adapter.consumer,
+            settings.group_id,
+            max_messages=settings.transaction_max_messages,
+            interval_ms=settings.transaction_interval_ms,
+            metrics=self.metrics,
+            deduplicator=self._deduplicator,
+        )
+        self._adapter.rebalance_listener.add_revoked_callback(transaction.flush)
+        try:
+            yield transaction
+        finally:
+            self._adapter.rebalance_listener.remove_revoked_callback(transaction.flush)
+            await transaction.flush()
+
+    @asynccontextmanager
+    async def _deduplication(self) -> AsyncIterator[None]:
+        """Flush the processed messages to the deduplicator seen-set on exit."""
+        try:
+            yield
+        finally:
+            if self._deduplicator:
+                await self._deduplicator.flush()
+
+    @asynccontextmanager
+    async def _partition_pauser(self) -> AsyncIterator[BrokerPartitionPauser]:
+        """Provide a partition pauser released on partitions revocation and on exit."""
+        pauser = BrokerPartitionPauser(self._adapter.consumer)
+        self._adapter.rebalance_listener.add_revoked_callback(pauser.release)
+        try:
+            yield pauser
+        finally:
+            self._adapter.rebalance_listener.remove_revoked_callback(pauser.release)
+            await pauser.release()
+
+    @asynccontextmanager
+    async def _backpressure(self, pauser: BrokerPartitionPauser) -> AsyncIterator[BrokerBackpressure]:
+        """Provide a backpressure released on partitions revocation and on exit."""
+        settings = self._adapter.consumer_settings
+        backpressure = BrokerBackpressure(
+            pauser,
+            high_watermark=settings.in_flight_high_watermark,
+            low_watermark=settings.in_flight_low_watermark,
+        )
+        self._adapter.rebalance_listener.add_revoked_callback(backpressure.release)
+        try:
+            yield backpressure
+        finally:
+            self._adapter.rebalance_listener.remove_revoked_callback(backpressure.release)
+            await backpressure.release()
+
+    @asynccontextmanager
+    async def _rate_limiter(self, pauser: BrokerPartitionPauser) -> AsyncIterator[BrokerRateLimiter | None]:
+        """Provide a rate limiter released on partitions revocation and on exit, ``None`` without rate limits.
+
+        With lanes, the rate limiter of each lane gets its share of the rate limits of the consumer.
+        """
+        settings = self._adapter.consumer_settings
+        messages_per_second, bytes_per_second = settings.rate_limits(self._lane)
+        if messages_per_second is None and bytes_per_second is None:
+            yield None
+            return
+        rate_limiter = BrokerRateLimiter(
+            self._adapter.consumer,
+            pauser,
+            messages_per_second=messages_per_second,
+            bytes_per_second=bytes_per_second,
+            per_topic=settings.rate_limit_per_topic,
+            cache=self._rate_limit_cache,
+            group_id=settings.group_id,
+            lane=self._lane,
+        )
+        self._adapter.rebalance_listener.add_revoked_callback(rate_limiter.release)
+        try:
+            yield rate_limiter
+        finally:
+            self._adapter.rebalance_listener.remove_revoked_callback(rate_limiter.release)
+            await rate_limiter.release()
+
+    @asynccontextmanager
+    async def _circuit_breaker(self, pauser: BrokerPartitionPauser) -> AsyncIterator[BrokerCircuitBreaker | None]:
+        """Provide a circuit breaker released on partitions revocation and on exit, ``None`` when disabled.
+
+        The partitions assigned while the circuit is not closed are paused.
+        """
+        settings = self._adapter.consumer_settings
+        if settings.circuit_breaker_failure_rate is None:
+            yield None
+            return
+        circuit_breaker = BrokerCircuitBreaker(
+            self._adapter.consumer,
+            pauser,
+            failure_rate=settings.circuit_breaker_failure_rate,
+            window=settings.circuit_breaker_window,
+            open_time=settings.circuit_breaker_open_ms / 1000,
+        )
+        self._adapter.rebalance_listener.add_revoked_callback(circuit_breaker.release)
+        self._adapter.rebalance_listener.add_assigned_callback(circuit_breaker.assign)
+        try:
+            yield circuit_breaker
+        finally:
+            self._adapter.rebalance_listener.remove_revoked_callback(circuit_breaker.release)
+            self._adapter.rebalance_listener.remove_assigned_callback(circuit_breaker.assign)
+            await circuit_breaker.release()
+
+    @asynccontextmanager
+    async def _retry_scheduler(self, pauser: BrokerPartitionPauser) -> AsyncIterator[BrokerRetryScheduler]:
+        """Provide a retry scheduler released on partitions revocation and on exit."""
+        retries = BrokerRetryScheduler(self._adapter.consumer, pauser)
+        self._adapter.rebalance_listener.add_revoked_callback(retries.release)
+        try:
+            yield retries
+        finally:
+            self._adapter.rebalance_listener.remove_revoked_callback(retries.release)
+            await retries.release()
+
+    def _lane_repository(self, lane: BrokerConsumeLane) -> 'BrokerRepository':
+        """Get a repository consuming a lane, sharing the codecs, schemas, metrics and collaborators of this one."""
+        repository = copy.copy(self)
+        repository._lane = lane
+        if lane != BrokerConsumeLane.MAIN:
+            repository._adapter = self._adapter.lane(lane)
+        repository.__dict__.pop('_handler_runner', None)
+        return repository
+
+    def _start_consumption(self) -> None:
+        """Record the task consuming with this repository, so ``stop`` waits for it to return."""
+        if self._lane is None:
+            self._stopping.clear()
+            self._consumption = asyncio.current_task()
+
+    async def stop(self) -> None:
+        """Stop consuming, then stop the consumer of the adapter.
+
+        The fetch loop ends after its current fetch, the fetched messages are processed and their offsets
+        committed before the consumer stops, like the offsets of every lane.
+        """
+        self._stopping.set()
+        if self._consumption and not self._consumption.done() and self._consumption is not asyncio.current_task():
+            await asyncio.wait([self._consumption])
+        await self._adapter.consumer.stop()
+        logger.info(f'{LOG_PREFIX}[CONSUME][STOP]')
+
+    async def _consume_lanes(self, consume: Callable[['BrokerRepository'], Coroutine[Any, Any, None]]) -> None:
+        """Consume every lane with its own consumer until one of them stops, then stop the other lanes.
+
+        The main lane runs on the consumer of this repository adapter, the retry and dead letter queue lanes
+        on consumers connected here, only when they have topics. The other lanes end their fetch loop instead of
+        having their consumer stopped, so their processed offsets are committed before they disconnect.
+        """
+        if self._adapter.transactional:
+            raise ValueError('Consume lanes are not supported with a transactional producer')
+        settings = self._adapter.consumer_settings
+        repositories = [self._lane_repository(lane) for lane in BrokerConsumeLane if settings.get_topics(lane)]
+        connected: list[BrokerRepository] = []
+        tasks: list[asyncio.Task[None]] = []
+        try:
+            for repository in repositories:
+                if repository._lane != BrokerConsumeLane.MAIN:
+                    await repository._adapter.connect()
+                    connected.append(repository)
+            tasks = [asyncio.create_task(consume(repository)) for repository in repositories]
+            logger.info(f'{LOG_PREFIX}[LANES][START][LANES: {[repository._lane for repository in repositories]}]')
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+            self._stopping.set()
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for repository in connected:
+                self.metrics.unbind(repository._adapter.consumer)
+                await repository._adapter.disconnect()
+
+    async def consume(self, func: BrokerHandler, wait_time: int = 3) -> None:
+        """Consume messages from a Kafka topic.
+
+        The dispatch mode is taken from the consumer settings:
+            - ``sequential``: one message at a time across every assigned partition
+            - ``partition``: one worker per assigned partition, ordered inside each partition
+            - ``key``: a pool of workers fed by message key, ordered for messages sharing a key
+
+        Processed offsets are committed following the commit policy of the consumer settings and flushed
+        when partitions are revoked and when consumption stops, ``stop`` flushes them before stopping the consumer.
+        A partition is paused while its in-flight messages are above the watermarks of the consumer settings,
+        or while the consumer or its topic exceeds the rate limits of the consumer settings. Sync handlers run
+        on the executor of the repository and keep the same retry and dead letter queue routing.
+
+        With a circuit breaker failure rate in the consumer settings, a failing handler pauses every assigned
+        partition and holds the failed messages, without committing them, until a probe message succeeds.
+
+        With ``consume_lanes`` enabled, the main, retry and dead letter queue topics are consumed
+        by separate consumers, so a retry backlog does not delay the main topics.
+
+        With a transactional producer, the messages produced by the handlers, including the retry routing,
+        are committed atomically with the consumed offsets, see ``_consume_transactionally``.
+        """
+        self._start_consumption()
+        if self._adapter.consumer_settings.consume_lanes and self._lane is None:
+            await self._consume_lanes(lambda repository: repository.consume(func, wait_time))
+            return
+        routes = {
+            BrokerConsumeMode.SEQUENTIAL: self._route_sequentially,
+            BrokerConsumeMode.PARTITION: self._route_by_partition,
+            BrokerConsumeMode.KEY: self._route_by_key,
+        }
+        route = routes[self._adapter.consumer_settings.consume_mode]
+        self.metrics.bind(self._adapter.consumer)
+        if self._adapter.transactional:
+            async with (
+                self._deduplication(),
+                self._transaction_committer() as transaction,
+                self._partition_pauser() as pauser,
+                self._retry_scheduler(pauser) as retries,
+                self._rate_limiter(pauser) as rate_limiter,
+            ):
+                await self._consume_transactionally(func, transaction, retries, rate_limiter, wait_time, route)
+            return
+        async with (
+            self._deduplication(),
+            self._offset_committer() as committer,
+            self._partition_pauser() as pauser,
+            self._retry_scheduler(pauser) as retries,
+            self._rate_limiter(pauser) as rate_limiter,
+            self._backpressure(pauser) as backpressure,
+            self._circuit_breaker(pauser) as circuit_breaker,
+        ):
+            await self._consume_concurrently(
+                func, committer, retries, rate_limiter, backpressure, circuit_breaker, wait_time, route
+            )
+
+    async def consume_batch(
+        self,
+        func: BrokerBatchHandler,
+        max_records: int | None = None,
+        timeout_ms: int = 1000,
+        wait_time: int = 3,
+    ) -> None:
+        """Consume messages from a Kafka topic in batches of one partition.
+
+        The handler receives the messages fetched for a partition in offset order, the batches of different
+        partitions are handled concurrently. A handler raising ``BrokerBatchException`` routes only the reported
+        messages to the retry topics, any other exception routes the whole batch. Sync handlers run on
+        the executor of the repository. Lanes are consumed separately like with ``consume``.
+
+        Raises:
+            ValueError: when the producer is transactional, batches are not consumed in transactions.
+        """
+        if self._adapter.transactional:
+            raise ValueError('Batch consumption is not supported with a transactional producer')
+        self._start_consumption()
+        if self._adapter.consumer_settings.consume_lanes and self._lane is None:
+            await self._consume_lanes(
+                lambda repository: repository.consume_batch(func, max_records, timeout_ms, wait_time)
+            )
+            return
+        self.metrics.bind(self._adapter.consumer)
+        async with (
+            self._deduplication(),
+            self._offset_committer() as committer,
+            self._partition_pauser() as pauser,
+            self._retry_scheduler(pauser) as retries,
+            self._rate_limiter(pauser) as rate_limiter,
+        ):
+            async for batches in self._fetch(retries, rate_limiter, max_records, timeout_ms):
+                due = {
+                    partition: [message for message, duplicate in messages if not duplicate]
+                    for partition, messages in batches.items()
+                }
+                await asyncio.gather(
+                    *(self._process_batch(func, messages, wait_time) for messages in due.values() if messages)
+                )
+                for partition, messages in batches.items():
+                    if messages:
+                        await committer.mark(partition, messages[-1][0].offset + 1, len(messages))
+
+    @staticmethod
+    async def _replay_offsets(
+        consumer: AIOKafkaConsumer,
+        partitions: list[TopicPartition],
+        bound: datetime.datetime | dict[TopicPartition, int],
+        end_offsets: dict[TopicPartition, int],
+    ) -> dict[TopicPartition, int]:
+        """Resolve a replay bound into the offset of each partition, capped by its end offset.
+
+        A datetime resolves to the first offset at or after it, partitions without such offset or missing
+        from the offsets resolve to their end offset.
+        """
+        if isinstance(bound, dict):
+            return {
+                partition: min(bound.get(partition, end_offsets[partition]), end_offsets[partition])
+                for partition in partitions
+            }
+        timestamp = int(bound.timestamp() * 1000)
+        found = await consumer.offsets_for_times(dict.fromkeys(partitions, timestamp))
+        return {
+            partition: offset.offset if (offset := found.get(partition)) is not None else end_offsets[partition]
+            for partition in partitions
+        }
+
+    @staticmethod
+    def _report_replay(
+        progress: BrokerReplayProgress, on_progress: Callable[[BrokerReplayProgress], None] | None
+    ) -> None:
+        """Log the progress of a replay and hand it to the progress callback."""
+        logger.info(
+            f'{LOG_PREFIX}[REPLAY][PROGRESS][MESSAGES: {progress.messages} - '
+            f'REMAINING: {progress.remaining}/{progress.total} - RATE: {progress.rate:.0f}/s]'
+        )
+        if on_progress:
+            on_progress(progress)
+
+    async def replay(
+        self,
+        func: BrokerBatchHandler,
+        topics: list[str],
+        since: datetime.datetime | dict[TopicPartition, int],
+        until: datetime.datetime | dict[TopicPartition, int] | None = None,
+        progress_interval: float = 5.0,
+        on_progress: Callable[[BrokerReplayProgress], None] | None = None,
+        wait_time: int = 3,
+    ) -> BrokerReplayProgress:
+        """Reprocess the messages of topics from a timestamp or offsets, up to a timestamp, offsets or their end.
+
+        The replay runs on its own consumer outside of the consumer group, with large fetches and no commits,
+        the group offsets are left untouched. Partitions are read from their ``since`` offset until their
+        ``until`` offset, the end offsets when the replay starts by default, and the replay returns once
+        every partition reached its end. With offsets, only the partitions listed in ``since`` are replayed.
+        The handler receives the batches of each partition like ``consume_batch`` and failures are routed
+        to the retry topics. The progress is logged and handed to ``on_progress`` every ``progress_interval``
+        seconds and once finished.
+
+        Returns:
+            BrokerReplayProgress: the final progress of the replay
+
+        Raises:
+            ValueError: when the producer is transactional, replayed batches are not processed in transactions.
+        """
+        if self._adapter.transactional:
+            raise ValueError('Replay is not supported with a transactional producer')
+        consumer = self._adapter.create_replay_consumer()
+        await consumer.start()
+        try:
+            await consumer.topics()
+            partitions = [
+                TopicPartition(topic, partition)
+                for topic in topics
+                for partition in sorted(consumer.partitions_for_topic(topic) or ())
+                if not isinstance(since, dict) or TopicPartition(topic, partition) in since
+            ]
+            end_offsets = await consumer.end_offsets(partitions)
+            start = await self._replay_offsets(consumer, partitions, since, end_offsets)
+            end = end_offsets if until is None else await self._replay_offsets(consumer, partitions, until, end_offsets)
+            progress = BrokerReplayProgress(start, end)
+            active = [partition for partition in partitions if not progress.is_done(partition)]
+            consumer.assign(active)
+            for partition in active:
+                consumer.seek(partition, start[partition])
+            logger.info(f'{LOG_PREFIX}[REPLAY][START][PARTITIONS: {len(active)} - OFFSETS: {progress.total}]')
+            reported = time.monotonic()
+            while active:
+                fetched = await consumer.getmany(
+                    *active,
+                    timeout_ms=BROKER_FETCH_TIMEOUT_MS,
+                    max_records=self._adapter.consumer_settings.replay_max_records,
+                )
+                batches = {
+                    partition: [message for message in messages if message.offset < end[partition]]
+                    for partition, messages in fetched.items()
+                }
+                await asyncio.gather(
+                    *(self._process_batch(func, messages, wait_time) for messages in batches.values() if messages)
+                )
+                if self._deduplicator:
+                    await self._deduplicator.flush()
+                for partition in active:
+                    progress.advance(partition, await consumer.position(partition), len(batches.get(partition, ())))
+                active = [partition for partition in active if not progress.is_done(partition)]
+                if time.monotonic() - reported >= progress_interval:
+                    self._report_replay(progress, on_progress)
+                    reported = time.monotonic()
+        finally:
+            await consumer.stop()
+        self._report_replay(progress, on_progress)
+        logger.info(f'{LOG_PREFIX}[REPLAY][DONE][MESSAGES: {progress.messages} - ELAPSED: {progress.elapsed:.1f}s]')
+        return progress
+
+    def table(self, topic: str, path: str | Path | None = None, snapshot_interval: float = 60.0) -> BrokerTable:
+        """Create a local key to value view of a compacted topic, started with ``async with`` or ``start``.
+
+        The table runs on its own consumer outside of the consumer group, like the replay, and its records are
+        decoded with the codecs and schemas of the repository, claim-checked values are loaded from the blob store.
+        With a ``path``, the table is snapshotted to that file and restarts from it.
 
-                if next_retry_topic := self._next_retry_topic(
-                    message.topic,
-                    self._adapter._consumer_settings.retry_max_times,  # type: ignore
-                ):
-                    logger.info(
-                        f'{LOG_PREFIX}[RETRY][TOPIC: {next_retry_topic} - KEY: {message.key} - WAIT: {wait_time}]'
-                    )
-                    await asyncio.sleep(wait_time)
-                    value, metadata = self._unparse_message_value(message.value)  # type: ignore
-                    metadata.update({'error': repr(err)})
-                    await self.produce(
-                        topic=next_retry_topic,
-                        key=message.key,  # type: ignore
-                        value=value,
-                        metadata=metadata,
-                    )
-            finally:
-                await self._adapter.consumer.commit()
-                logger.info(f'{LOG_PREFIX}[COMMIT][TOPIC: {message.topic} - KEY: {message.key}]')
+        Returns:
+            BrokerTable: the table of the topic
+        """
+        return BrokerTable(self._adapter.create_replay_consumer(), topic, self._load_record, path, snapshot_interval)
 
     # async def healthcheck(self) -> None:
     #     producer = await self._adapter._producer.send_and_wait("healthcheck", "healthcheck")
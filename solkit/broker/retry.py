@@ -0,0 +1,76 @@
+import asyncio
+import logging
+import time
+
+from aiokafka import AIOKafkaConsumer
+from aiokafka.structs import ConsumerRecord, TopicPartition
+
+from .constants import BROKER_RETRY_NOT_BEFORE_HEADER, LOG_PREFIX
+from .flow import BrokerPartitionPauser
+
+logger = logging.getLogger(__name__)
+
+
+class BrokerRetryScheduler:
+    """Hold back retry messages until their not before timestamp without blocking the consumer.
+
+    A message that is not due yet pauses its partition and rewinds it to the message offset,
+    the partition is resumed once the message is due so it is fetched again.
+    """
+
+    reason = 'retry'
+
+    def __init__(self, consumer: AIOKafkaConsumer, pauser: BrokerPartitionPauser | None = None) -> None:
+        """Initialize the retry scheduler."""
+        self._consumer = consumer
+        self._pauser = pauser or BrokerPartitionPauser(consumer)
+        self._resumes: dict[TopicPartition, asyncio.TimerHandle] = {}
+
+    @staticmethod
+    def not_before_header(wait_time: float) -> tuple[str, bytes]:
+        """Build the header delaying a message by the wait time in seconds."""
+        not_before_ms = int((time.time() + wait_time) * 1000)
+        return BROKER_RETRY_NOT_BEFORE_HEADER, bytes(str(not_before_ms), 'utf-8')
+
+    @staticmethod
+    def _get_not_before(message: ConsumerRecord) -> float | None:
+        """Get the not before timestamp in seconds from the headers, ``None`` when missing or invalid."""
+        for header in message.headers:
+            if header[0] == BROKER_RETRY_NOT_BEFORE_HEADER:
+                try:
+                    return int(header[1].decode('utf-8')) / 1000
+                except (ValueError, OverflowError) as err:
+                    logger.warning(
+                        f'{LOG_PREFIX}[RETRY][INVALID NOT BEFORE][TOPIC: {message.topic} - '
+                        f'OFFSET: {message.offset}][ERROR: {err}]'
+                    )
+                    return None
+        return None
+
+    def hold(self, message: ConsumerRecord) -> bool:
+        """Check if a message must be held back, pausing its partition until it is due.
+
+        Messages of a partition already held back are held as well, they are fetched again on resume.
+        """
+        partition = TopicPartition(message.topic, message.partition)
+        if partition in self._resumes:
+            return True
+        not_before = self._get_not_before(message)
+        if not_before is None or (delay := not_before - time.time()) <= 0:
+            return False
+        self._pauser.pause(partition, self.reason)
+        self._consumer.seek(partition, message.offset)
+        self._resumes[partition] = asyncio.get_running_loop().call_later(delay, self._resume, partition)
+        logger.info(f'{LOG_PREFIX}[RETRY][HOLD][TOPIC: {message.topic} - OFFSET: {message.offset} - DELAY: {delay}]')
+        return True
+
+    def _resume(self, partition: TopicPartition) -> None:
+        """Lift the hold of a partition, it is resumed if still assigned and not paused for another reason."""
+        del self._resumes[partition]
+        self._pauser.resume(partition, self.reason)
+
+    async def release(self, partitions: set[TopicPartition] | None = None) -> None:
+        """Cancel the pending resumes of the given partitions, or of every partition when not provided."""
+        for partition in list(self._resumes):
+            if partitions is None or partition in partitions:
+                self._resumes.pop(partition).cancel()
@@ -1,5 +1,5 @@
 import re
-from typing import Self
+from typing import Any, Self
 
 from pydantic import Field, field_validator, model_validator
 from pydantic_settings import BaseSettings
@@ -7,9 +7,15 @@ from pydantic_settings import BaseSettings
 from .constants import (
     BROKER_DEAD_LETTER_QUEUE_SUFFIX,
     BROKER_HEARTBEAT_PER_SESSION,
+    BROKER_PRODUCER_PROFILES,
     BROKER_RETRY_SUFFIX,
     BROKER_TOPIC_PATTERN,
+    BrokerConsumeLane,
+    BrokerConsumeMode,
     BrokerKafkaAcks,
+    BrokerKafkaCompressionType,
+    BrokerKafkaIsolationLevel,
+    BrokerKafkaProducerProfile,
 )
 
 
@@ -29,6 +35,11 @@ class BrokerKafkaConsumerSettings(BrokerKafkaSettings):
 
     topics: str = Field(default=..., description='Kafka topics', validation_alias='BROKER_TOPICS')
     group_id: str = Field(default=..., description='Kafka group id', validation_alias='BROKER_GROUP_ID')
+    group_instance_id: str | None = Field(
+        default=None,
+        description='Kafka static membership group instance id',
+        validation_alias='BROKER_GROUP_INSTANCE_ID',
+    )
     enable_auto_commit: bool = Field(
         default=False, description='Kafka enable auto commit', validation_alias='BROKER_ENABLE_AUTO_COMMIT'
     )
@@ -51,14 +62,168 @@ class BrokerKafkaConsumerSettings(BrokerKafkaSettings):
     #     description="Kafka rebalance timeout ms",
     #     validation_alias="BROKER_REBALANCE_TIMEOUT_MS"
     # )
-    # isolation_level: str = Field(
-    #     default=...,
-    #     description="Kafka isolation level",
-    #     validation_alias="BROKER_ISOLATION_LEVEL"
-    # )
+    isolation_level: BrokerKafkaIsolationLevel = Field(
+        default=BrokerKafkaIsolationLevel.READ_COMMITTED,
+        description='Kafka isolation level, read committed skips the messages of aborted transactions',
+        validation_alias='BROKER_ISOLATION_LEVEL',
+    )
     retry_max_times: int = Field(
         default=0, ge=0, le=3, description='Kafka retry max times', validation_alias='BROKER_RETRY_MAX_TIMES'
     )
+    consume_mode: BrokerConsumeMode = Field(
+        default=BrokerConsumeMode.SEQUENTIAL,
+        description='Kafka consume dispatch mode',
+        validation_alias='BROKER_CONSUME_MODE',
+    )
+    key_concurrency: int = Field(
+        default=10,
+        ge=1,
+        description='Kafka concurrent workers for the key consume mode',
+        validation_alias='BROKER_KEY_CONCURRENCY',
+    )
+    commit_max_messages: int = Field(
+        default=1,
+        ge=1,
+        description='Kafka processed messages before committing offsets',
+        validation_alias='BROKER_COMMIT_MAX_MESSAGES',
+    )
+    commit_interval_ms: int = Field(
+        default=0,
+        ge=0,
+        description='Kafka interval ms between offsets commits, 0 disables the interval',
+        validation_alias='BROKER_COMMIT_INTERVAL_MS',
+    )
+    rebalance_drain_timeout_ms: int = Field(
+        default=10 * 1000,
+        ge=0,
+        description='Kafka time ms to drain the in-flight messages of revoked partitions',
+        validation_alias='BROKER_REBALANCE_DRAIN_TIMEOUT_MS',
+    )
+    handler_concurrency: int = Field(
+        default=10,
+        ge=1,
+        description='Kafka concurrent sync handlers run on the executor',
+        validation_alias='BROKER_HANDLER_CONCURRENCY',
+    )
+    handler_timeout_ms: int | None = Field(
+        default=None,
+        ge=1,
+        description='Kafka time ms before a handler is cancelled and its message routed to the retry topics',
+        validation_alias='BROKER_HANDLER_TIMEOUT_MS',
+    )
+    handler_soft_timeout_ms: int | None = Field(
+        default=None,
+        ge=1,
+        description='Kafka time ms before the stack of a still running handler is logged',
+        validation_alias='BROKER_HANDLER_SOFT_TIMEOUT_MS',
+    )
+    in_flight_high_watermark: int = Field(
+        default=1000,
+        ge=1,
+        description='Kafka in-flight messages of a partition pausing it',
+        validation_alias='BROKER_IN_FLIGHT_HIGH_WATERMARK',
+    )
+    in_flight_low_watermark: int = Field(
+        default=250,
+        ge=0,
+        description='Kafka in-flight messages of a paused partition resuming it',
+        validation_alias='BROKER_IN_FLIGHT_LOW_WATERMARK',
+    )
+    consume_dead_letter_queue: bool = Field(
+        default=False,
+        description='Kafka consume the dead letter queue topics',
+        validation_alias='BROKER_CONSUME_DEAD_LETTER_QUEUE',
+    )
+    consume_lanes: bool = Field(
+        default=False,
+        description='Kafka consume the main, retry and dead letter queue topics with separate consumers',
+        validation_alias='BROKER_CONSUME_LANES',
+    )
+    retry_lane_max_poll_records: int | None = Field(
+        default=None,
+        ge=1,
+        le=500,
+        description='Kafka max poll records of the retry and dead letter queue lanes',
+        validation_alias='BROKER_RETRY_LANE_MAX_POLL_RECORDS',
+    )
+    retry_lane_concurrency: int | None = Field(
+        default=None,
+        ge=1,
+        description='Kafka key and sync handlers concurrency of the retry and dead letter queue lanes',
+        validation_alias='BROKER_RETRY_LANE_CONCURRENCY',
+    )
+    rate_limit_messages_per_second: float | None = Field(
+        default=None,
+        gt=0,
+        description='Kafka max consumed messages per second',
+        validation_alias='BROKER_RATE_LIMIT_MESSAGES_PER_SECOND',
+    )
+    rate_limit_bytes_per_second: float | None = Field(
+        default=None,
+        gt=0,
+        description='Kafka max consumed key and value bytes per second',
+        validation_alias='BROKER_RATE_LIMIT_BYTES_PER_SECOND',
+    )
+    rate_limit_per_topic: bool = Field(
+        default=False,
+        description='Kafka apply the consumed rate limits to each topic instead of the whole consumer',
+        validation_alias='BROKER_RATE_LIMIT_PER_TOPIC',
+    )
+    retry_lane_rate_limit_messages_per_second: float | None = Field(
+        default=None,
+        gt=0,
+        description='Kafka max consumed messages per second of each retry and dead letter queue lane',
+        validation_alias='BROKER_RETRY_LANE_RATE_LIMIT_MESSAGES_PER_SECOND',
+    )
+    retry_lane_rate_limit_bytes_per_second: float | None = Field(
+        default=None,
+        gt=0,
+        description='Kafka max consumed key and value bytes per second of each retry and dead letter queue lane',
+        validation_alias='BROKER_RETRY_LANE_RATE_LIMIT_BYTES_PER_SECOND',
+    )
+    circuit_breaker_failure_rate: float | None = Field(
+        default=None,
+        gt=0,
+        le=1,
+        description='Kafka handler failure rate opening the circuit breaker, disabled when not set',
+        validation_alias='BROKER_CIRCUIT_BREAKER_FAILURE_RATE',
+    )
+    circuit_breaker_window: int = Field(
+        default=20,
+        ge=1,
+        description='Kafka last handler calls of the circuit breaker failure rate',
+        validation_alias='BROKER_CIRCUIT_BREAKER_WINDOW',
+    )
+    circuit_breaker_open_ms: int = Field(
+        default=30 * 1000,
+        ge=0,
+        description='Kafka time ms the circuit breaker stays open before probing the handler',
+        validation_alias='BROKER_CIRCUIT_BREAKER_OPEN_MS',
+    )
+    transaction_max_messages: int = Field(
+        default=500,
+        ge=1,
+        description='Kafka processed messages before committing a transaction',
+        validation_alias='BROKER_TRANSACTION_MAX_MESSAGES',
+    )
+    transaction_interval_ms: int = Field(
+        default=1000,
+        ge=1,
+        description='Kafka max time ms a transaction stays open before being committed',
+        validation_alias='BROKER_TRANSACTION_INTERVAL_MS',
+    )
+    replay_max_records: int = Field(
+        default=5000,
+        ge=1,
+        description='Kafka max records per fetch of a replay',
+        validation_alias='BROKER_REPLAY_MAX_RECORDS',
+    )
+    replay_max_partition_fetch_bytes: int = Field(
+        default=8 * 1024 * 1024,
+        ge=1,
+        description='Kafka max bytes per partition fetched by a replay',
+        validation_alias='BROKER_REPLAY_MAX_PARTITION_FETCH_BYTES',
+    )
 
     @staticmethod
     def _parse_topics(topics: str) -> list[str]:
@@ -77,13 +242,66 @@ class BrokerKafkaConsumerSettings(BrokerKafkaSettings):
         """Generate dead letter queue topics."""
         return [f'{topic}{BROKER_DEAD_LETTER_QUEUE_SUFFIX}' for topic in self._parse_topics(self.topics)]
 
-    def get_topics(self) -> list[str]:
-        """Create a list of topics with retry and dead letter queue topics."""
-        topics = self._parse_topics(self.topics)
-        topics.extend(self._generate_dead_letter_queue_topics())
-        if self.retry_max_times > 0:
-            topics.extend(self._generate_retry_topics())
-        return topics
+    def get_topics(self, lane: BrokerConsumeLane | None = None) -> list[str]:
+        """Create the list of topics of a lane, or of every lane with retry and dead letter queue topics.
+
+        Dead letter queue topics are only consumed when enabled.
+        """
+        dead_letter_queue_topics = self._generate_dead_letter_queue_topics() if self.consume_dead_letter_queue else []
+        if lane == BrokerConsumeLane.MAIN:
+            return self._parse_topics(self.topics)
+        if lane == BrokerConsumeLane.RETRY:
+            return self._generate_retry_topics()
+        if lane == BrokerConsumeLane.DLQ:
+            return dead_letter_queue_topics
+        return self._parse_topics(self.topics) + dead_letter_queue_topics + self._generate_retry_topics()
+
+    def lane_settings(self, lane: BrokerConsumeLane) -> Self:
+        """Get the settings of the consumer of a lane.
+
+        The retry and dead letter queue lanes use the retry lane budget when set, and every lane but the main one
+        suffixes the static membership instance id with its name.
+        """
+        update: dict[str, object] = {}
+        if lane != BrokerConsumeLane.MAIN:
+            if self.retry_lane_max_poll_records is not None:
+                update['max_poll_records'] = self.retry_lane_max_poll_records
+            if self.retry_lane_concurrency is not None:
+                update['key_concurrency'] = self.retry_lane_concurrency
+                update['handler_concurrency'] = self.retry_lane_concurrency
+            if self.group_instance_id is not None:
+                update['group_instance_id'] = f'{self.group_instance_id}-{lane}'
+        return self.model_copy(update=update)
+
+    def rate_limits(self, lane: BrokerConsumeLane | None = None) -> tuple[float | None, float | None]:
+        """Get the messages and bytes per second limits of the consumer of a lane, or of the whole consumer.
+
+        The rate limits are the budget of the whole consumer, split between its lanes: the retry and dead letter
+        queue lanes each get the retry lane rate limits when set and the main lane the rest, otherwise every lane
+        gets an even share.
+        """
+        if lane is None:
+            return self.rate_limit_messages_per_second, self.rate_limit_bytes_per_second
+        lanes = sum(1 for consume_lane in BrokerConsumeLane if self.get_topics(consume_lane))
+        return (
+            self._lane_rate_limit(
+                lane, lanes, self.rate_limit_messages_per_second, self.retry_lane_rate_limit_messages_per_second
+            ),
+            self._lane_rate_limit(
+                lane, lanes, self.rate_limit_bytes_per_second, self.retry_lane_rate_limit_bytes_per_second
+            ),
+        )
+
+    @staticmethod
+    def _lane_rate_limit(
+        lane: BrokerConsumeLane, lanes: int, rate: float | None, retry_lane_rate: float | None
+    ) -> float | None:
+        """Get the share of a lane of a consumer rate limit."""
+        if retry_lane_rate is None:
+            return rate / lanes if rate is not None else None
+        if lane != BrokerConsumeLane.MAIN:
+            return retry_lane_rate
+        return rate - retry_lane_rate * (lanes - 1) if rate is not None else None
 
     @field_validator('topics', mode='after')
     @classmethod
@@ -105,6 +323,33 @@ class BrokerKafkaConsumerSettings(BrokerKafkaSettings):
             )
         return self
 
+    @model_validator(mode='after')
+    def validate_in_flight_watermarks(self) -> Self:
+        """Validate Kafka in-flight watermarks."""
+        if self.in_flight_low_watermark >= self.in_flight_high_watermark:
+            raise ValueError(
+                f'\n    Kafka in-flight low watermark must be lower than high watermark.\n'
+                f'      in_flight_low_watermark: {self.in_flight_low_watermark}\n'
+                f'      in_flight_high_watermark: {self.in_flight_high_watermark}\n'
+            )
+        return self
+
+    @model_validator(mode='after')
+    def validate_retry_lane_rate_limits(self) -> Self:
+        """Validate Kafka retry lane rate limits leave a budget to the main lane."""
+        if not self.consume_lanes:
+            return self
+        main_lane_limits = self.rate_limits(BrokerConsumeLane.MAIN)
+        for measure, limit in zip(('messages', 'bytes'), main_lane_limits, strict=True):
+            if limit is not None and limit <= 0:
+                raise ValueError(
+                    f'\n    Kafka retry lane rate limits must leave a budget to the main lane.\n'
+                    f'      rate_limit_{measure}_per_second: {getattr(self, f"rate_limit_{measure}_per_second")}\n'
+                    f'      retry_lane_rate_limit_{measure}_per_second: '
+                    f'{getattr(self, f"retry_lane_rate_limit_{measure}_per_second")}\n'
+                )
+        return self
+
     @model_validator(mode='after')
     def validate_session_heartbeat(self) -> Self:
         """Validate Kafka session heartbeat.
@@ -128,7 +373,66 @@ class BrokerKafkaProducerSettings(BrokerKafkaSettings):
     connections_max_idle_ms: int = Field(
         default=10000, description='Kafka connections max idle ms', validation_alias='BROKER_CONNECTIONS_MAX_IDLE_MS'
     )
+    profile: BrokerKafkaProducerProfile = Field(
+        default=BrokerKafkaProducerProfile.LATENCY,
+        description='Kafka producer throughput profile',
+        validation_alias='BROKER_PRODUCER_PROFILE',
+    )
+    compression_type: BrokerKafkaCompressionType | None = Field(
+        default=None,
+        description='Kafka compression type, overrides the profile',
+        validation_alias='BROKER_COMPRESSION_TYPE',
+    )
+    linger_ms: int | None = Field(
+        default=None, ge=0, description='Kafka linger ms, overrides the profile', validation_alias='BROKER_LINGER_MS'
+    )
+    max_batch_size: int | None = Field(
+        default=None,
+        ge=1,
+        description='Kafka max batch size in bytes, overrides the profile',
+        validation_alias='BROKER_MAX_BATCH_SIZE',
+    )
+    max_request_size: int | None = Field(
+        default=None,
+        ge=1,
+        description='Kafka max request size in bytes, overrides the profile',
+        validation_alias='BROKER_MAX_REQUEST_SIZE',
+    )
+    transactional_id: str | None = Field(
+        default=None,
+        description='Kafka transactional id, enables the idempotent transactional producer',
+        validation_alias='BROKER_TRANSACTIONAL_ID',
+    )
 
     def parsed_acks(self) -> int | str:
         """Parse ACKS value to return 0 or 1 as int and 'all' as string."""
         return str(self.acks.value) if self.acks == BrokerKafkaAcks.ALL else int(self.acks.value)
+
+    def parsed_profile(self) -> dict[str, Any]:
+        """Resolve the profile batching and compression options, overridden by the explicitly set ones."""
+        profile: dict[str, Any] = dict(BROKER_PRODUCER_PROFILES[self.profile])
+        for option in profile:
+            if (value := getattr(self, option)) is not None:
+                profile[option] = value
+        compression_type = profile['compression_type']
+        profile['compression_type'] = (
+            None if compression_type == BrokerKafkaCompressionType.NONE else str(compression_type.value)
+        )
+        return profile
+
+    def parsed_transaction(self) -> dict[str, Any]:
+        """Resolve the transactional producer options, empty when no transactional id is set."""
+        if self.transactional_id is None:
+            return {}
+        return {'transactional_id': self.transactional_id, 'enable_idempotence': True}
+
+    @model_validator(mode='after')
+    def validate_transactional_acks(self) -> Self:
+        """Validate Kafka transactional producer acks."""
+        if self.transactional_id is not None and self.acks != BrokerKafkaAcks.ALL:
+            raise ValueError(
+                f'\n    Kafka transactional producer requires acks to be all.\n'
+                f'      transactional_id: {self.transactional_id}\n'
+                f'      acks: {self.acks}\n'
+            )
+        return self
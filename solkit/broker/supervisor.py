@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from collections.abc import Callable
+from multiprocessing.process import BaseProcess
+
+from .adapter import BrokerKafkaAdapter
+from .constants import LOG_PREFIX
+from .handlers import BrokerHandler
+from .repository import BrokerRepository
+
+logger = logging.getLogger(__name__)
+
+BrokerRepositoryFactory = Callable[[BrokerKafkaAdapter], BrokerRepository]
+
+
+async def _consume_worker(handler: BrokerHandler, repository_factory: BrokerRepositoryFactory, wait_time: int) -> None:
+    """Consume with a dedicated adapter until the worker process is asked to stop."""
+    adapter = BrokerKafkaAdapter.config()
+    await adapter.connect()
+    consumption = asyncio.create_task(repository_factory(adapter).consume(handler, wait_time))
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, consumption.cancel)
+    try:
+        await consumption
+    except asyncio.CancelledError:
+        logger.info(f'{LOG_PREFIX}[WORKER][STOP][PID: {os.getpid()}]')
+    finally:
+        await adapter.disconnect()
+
+
+def _set_group_instance_id(index: int) -> None:
+    """Suffix the static membership group instance id with the worker index, each member needs its own id."""
+    if group_instance_id := os.environ.get('BROKER_GROUP_INSTANCE_ID'):
+        os.environ['BROKER_GROUP_INSTANCE_ID'] = f'{group_instance_id}-{index}'
+
+
+def _set_transactional_id(index: int) -> None:
+    """Suffix the transactional id with the worker index, concurrent transactional producers need their own id."""
+    if transactional_id := os.environ.get('BROKER_TRANSACTIONAL_ID'):
+        os.environ['BROKER_TRANSACTIONAL_ID'] = f'{transactional_id}-{index}'
+
+
+def _run_worker(
+    handler: BrokerHandler, repository_factory: BrokerRepositoryFactory, wait_time: int, index: int
+) -> None:
+    """Run a worker process event loop."""
+    _set_group_instance_id(index)
+    _set_transactional_id(index)
+    asyncio.run(_consume_worker(handler, repository_factory, wait_time))
+
+
+class BrokerSupervisor:
+    """Run a consumer per worker process in the same consumer group, so a pod can use all of its cores.
+
+    Each worker builds its own adapter from the environment, crashed workers are restarted and a SIGTERM
+    or SIGINT stops every worker, letting them flush their offsets before they are killed.
+    A worker crashing again is restarted after an exponential backoff, from ``restart_backoff`` up to
+    ``restart_backoff_max`` seconds, reset once a worker ran for ``restart_backoff_max`` seconds.
+    With static membership, each worker keeps the ``BROKER_GROUP_INSTANCE_ID-<index>`` instance id across restarts,
+    and with a transactional producer the ``BROKER_TRANSACTIONAL_ID-<index>`` transactional id, so a restarted
+    worker fences the transactions left open by its crashed predecessor.
+    The handler and the repository factory must be picklable, module level functions and classes are.
+    """
+
+    def __init__(
+        self,
+        handler: BrokerHandler,
+        workers: int | None = None,
+        repository_factory: BrokerRepositoryFactory = BrokerRepository,
+        wait_time: int = 3,
+        supervise_interval: float = 1.0,
+        shutdown_timeout: float = 30.0,
+        start_method: str = 'spawn',
+        restart_backoff: float = 1.0,
+        restart_backoff_max: float = 60.0,
+    ) -> None:
+        """Initialize the supervisor, with a worker per CPU by default."""
+        self._handler = handler
+        self._workers = workers or os.cpu_count() or 1
+        self._repository_factory = repository_factory
+        self._wait_time = wait_time
+        self._supervise_interval = supervise_interval
+        self._shutdown_timeout = shutdown_timeout
+        self._restart_backoff = restart_backoff
+        self._restart_backoff_max = restart_backoff_max
+        self._context = multiprocessing.get_context(start_method)
+        self._processes: dict[int, BaseProcess] = {}
+        self._started_at: dict[int, float] = {}
+        self._crashes: dict[int, int] = {}
+        self._restart_at: dict[int, float] = {}
+        self._stopping = threading.Event()
+
+    def _start_worker(self, index: int) -> None:
+        """Start the worker process of an index."""
+        process = self._context.Process(  # type: ignore
+            target=_run_worker,
+            args=(self._handler, self._repository_factory, self._wait_time, index),
+            name=f'broker-worker-{index}',
+        )
+        process.start()
+        self._processes[index] = process
+        self._started_at[index] = time.monotonic()
+        logger.info(f'{LOG_PREFIX}[SUPERVISOR][START][WORKER: {index} - PID: {process.pid}]')
+
+    def _restart_delay(self, index: int) -> float:
+        """Count the crash of a worker and get the seconds to wait before restarting it.
+
+        The first crash after a stable run restarts the worker right away, the next ones double the delay.
+        """
+        if time.monotonic() - self._started_at.get(index, 0.0) >= self._restart_backoff_max:
+            self._crashes[index] = 0
+        self._crashes[index] = crashes = self._crashes.get(index, 0) + 1
+        if crashes == 1:
+            return 0.0
+        return min(self._restart_backoff * 2 ** (crashes - 2), self._restart_backoff_max)
+
+    def _supervise(self) -> None:
+        """Restart the workers that exited while the supervisor is running, once their backoff elapsed."""
+        for index, process in list(self._processes.items()):
+            if process.is_alive() or self._stopping.is_set():
+                continue
+            if index not in self._restart_at:
+                logger.error(f'{LOG_PREFIX}[SUPERVISOR][EXIT][WORKER: {index} - EXIT CODE: {process.exitcode}]')
+                delay = self._restart_delay(index)
+                if delay:
+                    logger.warning(f'{LOG_PREFIX}[SUPERVISOR][BACKOFF][WORKER: {index} - DELAY: {delay:.1f}s]')
+                self._restart_at[index] = time.monotonic() + delay
+            if time.monotonic() < self._restart_at[index]:
+                continue
+            del self._restart_at[index]
+            process.close()
+            self._start_worker(index)
+
+    def stop(self, *_: object) -> None:
+        """Ask the supervisor to stop its workers, usable as a signal handler."""
+        self._stopping.set()
+
+    def _shutdown(self) -> None:
+        """Terminate the workers, killing the ones still running after the shutdown timeout."""
+        for process in self._processes.values():
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + self._shutdown_timeout
+        for index, process in self._processes.items():
+            process.join(max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                logger.error(f'{LOG_PREFIX}[SUPERVISOR][KILL][WORKER: {index} - PID: {process.pid}]')
+                process.kill()
+                process.join()
+        logger.info(f'{LOG_PREFIX}[SUPERVISOR][STOP][WORKERS: {len(self._processes)}]')
+
+    def run(self) -> None:
+        """Start the workers and supervise them until SIGTERM or SIGINT."""
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for index in range(self._workers):
+            self._start_worker(index)
+        try:
+            while not self._stopping.wait(self._supervise_interval):
+                self._supervise()
+        finally:
+            self._shutdown()
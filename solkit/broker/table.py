@@ -0,0 +1,284 @@
+import asyncio
+import contextlib
+import logging
+import mmap
+import struct
+import time
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Self
+
+from aiokafka import AIOKafkaConsumer
+from aiokafka.errors import ConsumerStoppedError
+from aiokafka.structs import ConsumerRecord, TopicPartition
+from pydantic import BaseModel
+
+from .constants import BROKER_FETCH_TIMEOUT_MS, BROKER_TABLE_SNAPSHOT_MAGIC, LOG_PREFIX
+from .record import BrokerRecord
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct('>4sII')
+_OFFSET = struct.Struct('>iq')
+_RECORD = struct.Struct('>iqqiiI')
+_LENGTH = struct.Struct('>i')
+
+
+def _pack_bytes(value: bytes | None) -> bytes:
+    """Frame optional bytes with their length, ``-1`` for ``None``."""
+    if value is None:
+        return _LENGTH.pack(-1)
+    return _LENGTH.pack(len(value)) + value
+
+
+def _unpack_bytes(buffer: mmap.mmap, position: int) -> tuple[bytes | None, int]:
+    """Read optional bytes framed with their length, returning them with the following position."""
+    (length,) = _LENGTH.unpack_from(buffer, position)
+    position += _LENGTH.size
+    if length < 0:
+        return None, position
+    return buffer[position : position + length], position + length
+
+
+def _write_snapshot(path: Path, offsets: dict[int, int], messages: list[ConsumerRecord]) -> None:
+    """Write the partition offsets and the current records of a table atomically."""
+    chunks = [_HEADER.pack(BROKER_TABLE_SNAPSHOT_MAGIC, len(offsets), len(messages))]
+    chunks.extend(_OFFSET.pack(partition, offset) for partition, offset in offsets.items())
+    for message in messages:
+        key, value = message.key or b'', message.value or b''
+        chunks.append(
+            _RECORD.pack(
+                message.partition, message.offset, message.timestamp, len(key), len(value), len(message.headers)
+            )
+        )
+        chunks.extend((key, value))
+        for header, value in message.headers:
+            chunks.extend((_pack_bytes(bytes(header, 'utf-8')), _pack_bytes(value)))
+    temporary_path = path.with_suffix('.tmp')
+    temporary_path.write_bytes(b''.join(chunks))
+    temporary_path.replace(path)
+
+
+def _read_snapshot(path: Path, topic: str) -> tuple[dict[int, int], list[ConsumerRecord]]:
+    """Read the partition offsets and records of a table snapshot through a memory map."""
+    with path.open('rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        magic, partitions, records = _HEADER.unpack_from(buffer, 0)
+        if magic != BROKER_TABLE_SNAPSHOT_MAGIC:
+            raise ValueError(f'Invalid table snapshot: {path}')
+        position = _HEADER.size
+        offsets: dict[int, int] = {}
+        for _ in range(partitions):
+            partition, offset = _OFFSET.unpack_from(buffer, position)
+            offsets[partition] = offset
+            position += _OFFSET.size
+        messages: list[ConsumerRecord] = []
+        for _ in range(records):
+            partition, offset, timestamp, key_size, value_size, headers_count = _RECORD.unpack_from(buffer, position)
+            position += _RECORD.size
+            key = buffer[position : position + key_size]
+            position += key_size
+            value = buffer[position : position + value_size]
+            position += value_size
+            headers: list[tuple[str, bytes]] = []
+            for _ in range(headers_count):
+                header, position = _unpack_bytes(buffer, position)
+                header_value, position = _unpack_bytes(buffer, position)
+                headers.append(((header or b'').decode('utf-8'), header_value or b''))
+            messages.append(
+                ConsumerRecord(
+                    topic=topic,
+                    partition=partition,
+                    offset=offset,
+                    timestamp=timestamp,
+                    timestamp_type=0,
+                    key=key,
+                    value=value,
+                    checksum=None,
+                    serialized_key_size=key_size,
+                    serialized_value_size=value_size,
+                    headers=headers,
+                )
+            )
+    return offsets, messages
+
+
+class BrokerTable:
+    """Local key to value view of a compacted topic, bootstrapped from the topic and kept up to date from it.
+
+    The table reads every partition of the topic on its own consumer outside of the consumer group and keeps
+    the last record of each key, tombstones remove their key. It is ready once every partition caught up with
+    the end offsets of the topic when the table started. With a ``path``, the records and offsets are
+    snapshotted to a file every ``snapshot_interval`` seconds and on stop, a restart loads the snapshot
+    through a memory map and reads the topic from the snapshot offsets only.
+    """
+
+    def __init__(
+        self,
+        consumer: AIOKafkaConsumer,
+        topic: str,
+        load: Callable[[ConsumerRecord], Awaitable[BrokerRecord]],
+        path: str | Path | None = None,
+        snapshot_interval: float = 60.0,
+    ) -> None:
+        """Initialize the table, ``load`` wraps the consumer records into broker records."""
+        self.topic = topic
+        self._consumer = consumer
+        self._load = load
+        self._path = Path(path) if path is not None else None
+        self._snapshot_interval = snapshot_interval
+        self._records: dict[bytes, BrokerRecord] = {}
+        self._positions: dict[TopicPartition, int] = {}
+        self._end_offsets: dict[TopicPartition, int] = {}
+        self._ready = asyncio.Event()
+        self._changed = False
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def ready(self) -> bool:
+        """Check whether the table caught up with the topic."""
+        return self._ready.is_set()
+
+    async def wait_ready(self, timeout: float | None = None) -> bool:
+        """Wait until the table caught up with the topic, returning whether it did within the timeout."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    def record(self, key: str | bytes) -> BrokerRecord | None:
+        """Get the last record of a key."""
+        return self._records.get(bytes(key, 'utf-8') if isinstance(key, str) else key)
+
+    def get(self, key: str | bytes) -> dict[str, Any] | BaseModel | None:
+        """Get the data of the last record of a key, decoded on first access."""
+        record = self.record(key)
+        return record.data if record is not None else None
+
+    def __contains__(self, key: str | bytes) -> bool:
+        """Check whether a key is in the table."""
+        return self.record(key) is not None
+
+    def __len__(self) -> int:
+        """Get the number of keys."""
+        return len(self._records)
+
+    async def start(self) -> None:
+        """Bootstrap the table from its snapshot and the topic, then follow the topic in the background."""
+        await self._consumer.start()
+        await self._consumer.topics()
+        partitions = [
+            TopicPartition(self.topic, partition)
+            for partition in sorted(self._consumer.partitions_for_topic(self.topic) or ())
+        ]
+        beginning_offsets = await self._consumer.beginning_offsets(partitions)
+        self._end_offsets = await self._consumer.end_offsets(partitions)
+        snapshot_offsets = await self._load_snapshot()
+        self._consumer.assign(partitions)
+        for partition in partitions:
+            offset = snapshot_offsets.get(partition.partition, 0)
+            if offset > self._end_offsets[partition]:
+                logger.warning(f'{LOG_PREFIX}[TABLE][SNAPSHOT][AHEAD][TOPIC: {self.topic} - PARTITION: {partition}]')
+                self._drop(partition.partition)
+                offset = 0
+            self._positions[partition] = max(offset, beginning_offsets[partition])
+            self._consumer.seek(partition, self._positions[partition])
+        logger.info(f'{LOG_PREFIX}[TABLE][START][TOPIC: {self.topic} - PARTITIONS: {len(partitions)}]')
+        self._check_ready()
+        self._task = asyncio.create_task(self._follow())
+
+    async def stop(self) -> None:
+        """Stop following the topic, writing a last snapshot."""
+        try:
+            if self._task:
+                self._task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await self._task
+                self._task = None
+            await self.snapshot()
+        finally:
+            await self._consumer.stop()
+        logger.info(f'{LOG_PREFIX}[TABLE][STOP][TOPIC: {self.topic} - KEYS: {len(self._records)}]')
+
+    async def __aenter__(self) -> Self:
+        """Start the table."""
+        await self.start()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Stop the table."""
+        await self.stop()
+
+    async def snapshot(self) -> None:
+        """Write the records and offsets to the snapshot file when changed since the last snapshot."""
+        if self._path is None or not self._changed:
+            return
+        offsets = {partition.partition: offset for partition, offset in self._positions.items()}
+        messages = [record.consumer_record for record in self._records.values()]
+        self._changed = False
+        await asyncio.to_thread(_write_snapshot, self._path, offsets, messages)
+        logger.info(f'{LOG_PREFIX}[TABLE][SNAPSHOT][TOPIC: {self.topic} - KEYS: {len(messages)}]')
+
+    async def _load_snapshot(self) -> dict[int, int]:
+        """Load the records of the snapshot file, returning the offsets to resume the partitions from."""
+        if self._path is None or not self._path.exists():
+            return {}
+        offsets, messages = await asyncio.to_thread(_read_snapshot, self._path, self.topic)
+        for message in messages:
+            self._records[message.key or b''] = await self._load(message)
+        logger.info(f'{LOG_PREFIX}[TABLE][SNAPSHOT][LOAD][TOPIC: {self.topic} - KEYS: {len(messages)}]')
+        return offsets
+
+    def _drop(self, partition: int) -> None:
+        """Remove the records of a partition."""
+        self._records = {
+            key: record for key, record in self._records.items() if record.consumer_record.partition != partition
+        }
+        self._changed = True
+
+    async def _apply(self, message: ConsumerRecord) -> None:
+        """Keep the last record of a key, removing the key on tombstones."""
+        if message.key is None:
+            return
+        if message.value is None:
+            self._records.pop(message.key, None)
+        else:
+            self._records[message.key] = await self._load(message)
+        self._changed = True
+
+    def _check_ready(self) -> None:
+        """Mark the table as ready once every partition reached its end offset of the start."""
+        if not self.ready and all(self._positions[partition] >= end for partition, end in self._end_offsets.items()):
+            self._ready.set()
+            logger.info(f'{LOG_PREFIX}[TABLE][READY][TOPIC: {self.topic} - KEYS: {len(self._records)}]')
+
+    async def _follow(self) -> None:
+        """Apply the messages of the topic as they come, skipping the ones failing, snapshotting every interval."""
+        partitions = list(self._positions)
+        snapshotted = time.monotonic()
+        while True:
+            try:
+                fetched = await self._consumer.getmany(*partitions, timeout_ms=BROKER_FETCH_TIMEOUT_MS)
+            except ConsumerStoppedError:
+                return
+            for messages in fetched.values():
+                for message in messages:
+                    try:
+                        await self._apply(message)
+                    except Exception as err:
+                        logger.error(
+                            f'{LOG_PREFIX}[TABLE][SKIP][TOPIC: {self.topic} - PARTITION: {message.partition} - '
+                            f'OFFSET: {message.offset}][ERROR: {err}]'
+                        )
+            for partition in fetched if self.ready else partitions:
+                self._positions[partition] = await self._consumer.position(partition)
+            self._check_ready()
+            if time.monotonic() - snapshotted >= self._snapshot_interval:
+                await self.snapshot()
+                snapshotted = time.monotonic()
@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from aiokafka import AIOKafkaConsumer, AIOKafkaProducer
+from aiokafka.structs import ConsumerRecord, TopicPartition
+
+from .constants import LOG_PREFIX
+from .dedupe import BrokerDeduplicator
+from .metrics import BrokerMetrics
+
+logger = logging.getLogger(__name__)
+
+
+class BrokerTransactionCommitter:
+    """Commit the produced messages and the consumed offsets of the processed messages in one transaction.
+
+    A transaction is begun by the first processed batch and committed once ``max_messages`` messages were
+    marked or once it has been open for ``interval_ms``, so its cost is amortized over many consumed messages.
+    A failed batch aborts the transaction and rewinds each partition to its first offset in the transaction.
+    With a deduplicator, the marked messages are added to its seen-set only once their transaction is committed,
+    so the messages of an aborted transaction are processed again instead of skipped as duplicates.
+    """
+
+    def __init__(
+        self,
+        producer: AIOKafkaProducer,
+        consumer: AIOKafkaConsumer,
+        group_id: str,
+        max_messages: int = 500,
+        interval_ms: int = 1000,
+        metrics: BrokerMetrics | None = None,
+        deduplicator: BrokerDeduplicator | None = None,
+    ) -> None:
+        """Initialize the transaction committer, recording the commits latency in the metrics when provided."""
+        self._producer = producer
+        self._consumer = consumer
+        self._group_id = group_id
+        self._max_messages = max_messages
+        self._interval = interval_ms / 1000
+        self._metrics = metrics
+        self._deduplicator = deduplicator
+        self._open = False
+        self._begun = time.monotonic()
+        self._starts: dict[TopicPartition, int] = {}
+        self._offsets: dict[TopicPartition, int] = {}
+        self._messages: list[ConsumerRecord] = []
+        self._marked = 0
+        self._lock = asyncio.Lock()
+
+    def _is_due(self) -> bool:
+        """Check if the open transaction has to be committed."""
+        return self._open and (self._marked >= self._max_messages or time.monotonic() - self._begun >= self._interval)
+
+    @asynccontextmanager
+    async def batch(self) -> AsyncIterator[None]:
+        """Process and mark a batch inside the transaction, committing it when due and aborting it on failure."""
+        async with self._lock:
+            if not self._open:
+                await self._producer.begin_transaction()
+                self._open = True
+                self._begun = time.monotonic()
+            try:
+                yield
+            except Exception:
+                await self._abort()
+                raise
+            if self._is_due():
+                await self._commit()
+
+    def mark(self, partition: TopicPartition, messages: list[ConsumerRecord]) -> None:
+        """Mark the consumed messages of a partition as committed with the transaction."""
+        self._starts.setdefault(partition, messages[0].offset)
+        self._offsets[partition] = messages[-1].offset + 1
+        self._marked += len(messages)
+        if self._deduplicator:
+            self._messages.extend(messages)
+
+    async def flush_if_due(self) -> None:
+        """Commit the open transaction when due, meant to be called when a fetch returns no message."""
+        async with self._lock:
+            if self._is_due():
+                await self._commit()
+
+    async def flush(self, partitions: set[TopicPartition] | None = None) -> None:
+        """Commit the open transaction, with the offsets of every partition since a transaction is atomic."""
+        async with self._lock:
+            if self._open:
+                await self._commit()
+
+    async def _commit(self) -> None:
+        """Send the marked offsets to the transaction and commit it, aborting it on failure."""
+        offsets = dict(self._offsets)
+        messages = list(self._messages)
+        started = time.perf_counter()
+        try:
+            if offsets:
+                await self._producer.send_offsets_to_transaction(offsets, self._group_id)
+            await self._producer.commit_transaction()
+        except Exception:
+            await self._abort()
+            raise
+        self._reset()
+        if self._deduplicator and messages:
+            for message in messages:
+                self._deduplicator.mark(message)
+            await self._deduplicator.flush()
+        if self._metrics and offsets:
+            self._metrics.observe_commit(offsets, time.perf_counter() - started)
+        logger.info(f'{LOG_PREFIX}[TRANSACTION][COMMIT][OFFSETS: {offsets}]')
+
+    async def _abort(self) -> None:
+        """Abort the transaction and rewind the assigned partitions to their first offset in the transaction."""
+        starts = dict(self._starts)
+        self._reset()
+        await self._producer.abort_transaction()
+        assignment = self._consumer.assignment()
+        for partition, offset in starts.items():
+            if partition in assignment:
+                self._consumer.seek(partition, offset)
+        logger.warning(f'{LOG_PREFIX}[TRANSACTION][ABORT][OFFSETS: {starts}]')
+
+    def _reset(self) -> None:
+        """Forget the open transaction."""
+        self._open = False
+        self._starts.clear()
+        self._offsets.clear()
+        self._messages.clear()
+        self._marked = 0
@@ -20,10 +20,30 @@ class CacheRepositoryProtocol(Protocol):
         """Get a value from the cache."""
         ...
 
+    async def set_bytes(self, key: str, value: bytes, ttl: int | None = None) -> bool:
+        """Set a raw bytes value in the cache."""
+        ...
+
+    async def get_bytes(self, key: str) -> bytes | None:
+        """Get a raw bytes value from the cache."""
+        ...
+
     async def exists_key(self, *keys: str) -> bool:
         """Check if a value exists in the cache."""
         ...
 
+    async def set_keys(self, mapping: dict[str, str], ttl: int | None = None) -> bool:
+        """Set many values in the cache in a single pipeline."""
+        ...
+
+    async def increment_key(self, key: str, amount: int = 1, ttl: int | None = None) -> int:
+        """Increment a counter in the cache and set its ttl in a single pipeline."""
+        ...
+
+    async def exists_keys(self, *keys: str) -> list[bool]:
+        """Check which values exist in the cache in a single pipeline."""
+        ...
+
     async def delete_key(self, *keys: str) -> bool:
         """Delete a value from the cache."""
         ...
@@ -39,11 +39,44 @@ class CacheRepository:
         result = await self._cache_session.get(key)
         return self._decode(result) if result else None
 
+    async def set_bytes(self, key: str, value: bytes, ttl: int | None = None) -> bool:
+        """Set a raw bytes value in the cache."""
+        return await self._cache_session.set(key, value, ex=ttl)  # type: ignore
+
+    async def get_bytes(self, key: str) -> bytes | None:
+        """Get a raw bytes value from the cache."""
+        return await self._cache_session.get(key)  # type: ignore
+
     async def exists_key(self, *keys: str) -> bool:
         """Check if a value exists in the cache."""
         result = await self._cache_session.exists(*keys)
         return result > 0
 
+    async def set_keys(self, mapping: dict[str, str], ttl: int | None = None) -> bool:
+        """Set many values in the cache in a single pipeline."""
+        pipeline = self._cache_session.pipeline(transaction=False)
+        for key, value in mapping.items():
+            pipeline.set(key, self._encode(value), ex=ttl)
+        results = await pipeline.execute()
+        return all(results)
+
+    async def increment_key(self, key: str, amount: int = 1, ttl: int | None = None) -> int:
+        """Increment a counter in the cache and set its ttl in a single pipeline, returning the new value."""
+        pipeline = self._cache_session.pipeline(transaction=False)
+        pipeline.incrby(key, amount)
+        if ttl:
+            pipeline.expire(key, ttl)
+        results = await pipeline.execute()
+        return results[0]
+
+    async def exists_keys(self, *keys: str) -> list[bool]:
+        """Check which values exist in the cache in a single pipeline."""
+        pipeline = self._cache_session.pipeline(transaction=False)
+        for key in keys:
+            pipeline.exists(key)
+        results = await pipeline.execute()
+        return [result > 0 for result in results]
+
     async def delete_key(self, *keys: str) -> bool:
         """Delete a value from the cache."""
         result = await self._cache_session.delete(*keys)
@@ -0,0 +1,72 @@
+from collections.abc import Callable
+from unittest.mock import Mock
+
+import pytest
+from aiokafka import AIOKafkaConsumer
+from aiokafka.structs import ConsumerRecord, TopicPartition
+
+PARTITION = TopicPartition('topic', 0)
+
+
+@pytest.fixture
+def build_consumer_record() -> Callable[..., ConsumerRecord]:
+    """Provide a consumer record factory, with an empty version 1 envelope by default."""
+
+    def build(
+        topic: str = PARTITION.topic,
+        partition: int = PARTITION.partition,
+        offset: int = 0,
+        key: bytes | None = b'key',
+        headers: list[tuple[str, bytes]] | None = None,
+        value: bytes | None = b'{"data": {}, "metadata": {}}',
+    ) -> ConsumerRecord:
+        return ConsumerRecord(
+            topic=topic,
+            partition=partition,
+            offset=offset,
+            timestamp=0,
+            timestamp_type=0,
+            key=key,
+            value=value,
+            checksum=None,
+            serialized_key_size=len(key) if key is not None else -1,
+            serialized_value_size=len(value) if value is not None else -1,
+            headers=headers or [],
+        )
+
+    return build
+
+
+@pytest.fixture
+def build_consumer_record_mock() -> Callable[..., Mock]:
+    """Provide a consumer record mock factory, sized by its value."""
+
+    def build(
+        partition: TopicPartition = PARTITION,
+        offset: int = 0,
+        headers: list[tuple[str, bytes]] | None = None,
+        value: bytes = b'',
+    ) -> Mock:
+        message = Mock(spec=ConsumerRecord)
+        message.topic = partition.topic
+        message.partition = partition.partition
+        message.offset = offset
+        message.headers = headers or []
+        message.value = value
+        message.serialized_key_size = -1
+        message.serialized_value_size = len(value)
+        return message
+
+    return build
+
+
+@pytest.fixture
+def build_consumer_mock() -> Callable[..., Mock]:
+    """Provide a consumer mock factory, assigned to the given partitions."""
+
+    def build(*partitions: TopicPartition) -> Mock:
+        consumer = Mock(spec=AIOKafkaConsumer)
+        consumer.assignment.return_value = set(partitions or (PARTITION,))
+        return consumer
+
+    return build
@@ -0,0 +1,175 @@
+import asyncio
+from collections.abc import Callable
+from unittest.mock import Mock
+
+import pytest
+from aiokafka.structs import TopicPartition
+
+from solkit.broker.circuit import BrokerCircuitBreaker
+from solkit.broker.constants import BrokerCircuitState
+from solkit.broker.exceptions import BrokerCircuitOpenException
+
+PARTITIONS = {TopicPartition('topic', 0), TopicPartition('topic', 1)}
+
+
+@pytest.mark.asyncio
+async def test_broker_circuit_breaker_failure_below_rate_then_stay_closed(
+    build_consumer_mock: Callable[..., Mock],
+) -> None:
+    """Test failures below the failure rate are routed and keep the circuit closed."""
+    # arrange
+    consumer = build_consumer_mock(*PARTITIONS)
+    circuit_breaker = BrokerCircuitBreaker(consumer, failure_rate=0.5, window=4)
+    # act
+    circuit_breaker.success(False)
+    circuit_breaker.success(False)
+    circuit_breaker.success(False)
+    held = circuit_breaker.failure(False)
+    # assert
+    assert held is False
+    assert circuit_breaker.state == BrokerCircuitState.CLOSED
+    consumer.pause.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_broker_circuit_breaker_failure_rate_reached_then_open_and_pause(
+    build_consumer_mock: Callable[..., Mock],
+) -> None:
+    """Test reaching the failure rate over a full window opens the circuit and pauses the partitions."""
+    # arrange
+    consumer = build_consumer_mock(*PARTITIONS)
+    circuit_breaker = BrokerCircuitBreaker(consumer, failure_rate=0.5, window=4)
+    # act
+    results = [circuit_breaker.failure(False), circuit_breaker.failure(False), circuit_breaker.failure(False)]
+    circuit_breaker.success(False)
+    results.append(circuit_breaker.failure(False))
+    # assert
+    assert results == [False, False, False, True]
+    assert circuit_breaker.state == BrokerCircuitState.OPEN
+    assert {call.args[0] for call in consumer.pause.call_args_list} == PARTITIONS
+    assert circuit_breaker.failure(False) is True
+    await circuit_breaker.release()
+
+
+@pytest.mark.asyncio
+async def test_broker_circuit_breaker_half_open_then_let_single_probe_through(
+    build_consumer_mock: Callable[..., Mock],
+) -> None:
+    """Test a half-open circuit lets a single probe through and holds the other messages."""
+    # arrange
+    consumer = build_consumer_mock(*PARTITIONS)
+    circuit_breaker = BrokerCircuitBreaker(consumer, window=1, open_time=0.01)
+    circuit_breaker.failure(False)
+    # act
+    probe = await asyncio.wait_for(circuit_breaker.acquire(), 1)
+    held = asyncio.create_task(circuit_breaker.acquire())
+    await asyncio.sleep(0.01)
+    # assert
+    assert probe is True
+    assert circuit_breaker.state == BrokerCircuitState.HALF_OPEN
+    assert not held.done()
+    held.cancel()
+    await circuit_breaker.release()
+
+
+@pytest.mark.asyncio
+async def test_broker_circuit_breaker_probe_success_then_close_and_resume(
+    build_consumer_mock: Callable[..., Mock],
+) -> None:
+    """Test a successful probe closes the circuit, resumes the partitions and lets the held messages through."""
+    # arrange
+    consumer = build_consumer_mock(*PARTITIONS)
+    circuit_breaker = BrokerCircuitBreaker(consumer, window=1, open_time=0.01)
+    circuit_breaker.failure(False)
+    probe = await circuit_breaker.acquire()
+    held = asyncio.create_task(circuit_breaker.acquire())
+    await asyncio.sleep(0)
+    # act
+    circuit_breaker.success(probe)
+    # assert
+    assert await asyncio.wait_for(held, 1) is False
+    assert circuit_breaker.state == BrokerCircuitState.CLOSED
+    assert {call.args[0] for call in consumer.resume.call_args_list} == PARTITIONS
+
+
+@pytest.mark.asyncio
+async def test_broker_circuit_breaker_probe_failure_then_open_again(build_consumer_mock: Callable[..., Mock]) -> None:
+    """Test a failed probe opens the circuit again and holds the probe message."""
+    # arrange
+    consumer = build_consumer_mock(*PARTITIONS)
+    circuit_breaker = BrokerCircuitBreaker(consumer, window=1, open_time=0.01)
+    circuit_breaker.failure(False)
+    probe = await circuit_breaker.acquire()
+    # act
+    held = circuit_breaker.failure(probe)
+    # assert
+    assert held is True
+    assert circuit_breaker.state == BrokerCircuitState.OPEN
+    consumer.resume.assert_not_called()
+    await circuit_breaker.release()
+
+
+@pytest.mark.asyncio
+async def test_broker_circuit_breaker_release_while_open_then_raise_to_held_messages(
+    build_consumer_mock: Callable[..., Mock],
+) -> None:
+    """Test releasing an open circuit stops holding the messages."""
+    # arrange
+    consumer = build_consumer_mock(*PARTITIONS)
+    circuit_breaker = BrokerCircuitBreaker(consumer, window=1)
+    circuit_breaker.failure(False)
+    held = asyncio.create_task(circuit_breaker.acquire())
+    await asyncio.sleep(0)
+    # act
+    await circuit_breaker.release()
+    # assert
+    with pytest.raises(BrokerCircuitOpenException):
+        await asyncio.wait_for(held, 1)
+
+
+@pytest.mark.asyncio
+async def test_broker_circuit_breaker_assign_while_open_then_pause_until_closed(
+    build_consumer_mock: Callable[..., Mock],
+) -> None:
+    """Test partitions assigned while the circuit is open are paused, and resumed once it closes."""
+    # arrange
+    consumer = build_consumer_mock(*PARTITIONS)
+    circuit_breaker = BrokerCircuitBreaker(consumer, window=1, open_time=0)
+    assigned = TopicPartition('topic', 2)
+    await circuit_breaker.assign({assigned})
+    consumer.pause.assert_not_called()
+    circuit_breaker.failure(False)
+    consumer.assignment.return_value = PARTITIONS | {assigned}
+    # act
+    await circuit_breaker.assign({assigned})
+    await asyncio.sleep(0)
+    circuit_breaker.success(await circuit_breaker.acquire())
+    # assert
+    consumer.pause.assert_any_call(assigned)
+    consumer.resume.assert_any_call(assigned)
+    assert circuit_breaker.state == BrokerCircuitState.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_broker_circuit_breaker_release_revoked_partitions_then_drop_their_held_messages(
+    build_consumer_mock: Callable[..., Mock],
+) -> None:
+    """Test the held messages of revoked partitions are dropped, even once the circuit closes."""
+    # arrange
+    consumer = build_consumer_mock(*PARTITIONS)
+    circuit_breaker = BrokerCircuitBreaker(consumer, window=1)
+    revoked, kept = sorted(PARTITIONS)
+    circuit_breaker.failure(False)
+    held_revoked = asyncio.create_task(circuit_breaker.acquire(revoked, circuit_breaker.revocations(revoked)))
+    held_kept = asyncio.create_task(circuit_breaker.acquire(kept, circuit_breaker.revocations(kept)))
+    closed_revoked = circuit_breaker.revocations(revoked)
+    await asyncio.sleep(0)
+    # act
+    await circuit_breaker.release({revoked})
+    circuit_breaker._close()
+    # assert
+    with pytest.raises(BrokerCircuitOpenException):
+        await asyncio.wait_for(held_revoked, 1)
+    with pytest.raises(BrokerCircuitOpenException):
+        await circuit_breaker.acquire(revoked, closed_revoked)
+    assert await asyncio.wait_for(held_kept, 1) is False
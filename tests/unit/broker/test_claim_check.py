@@ -0,0 +1,108 @@
+from collections.abc import Callable
+from pathlib import Path
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from solkit.broker.claim_check import BrokerCacheBlobStore, BrokerClaimCheck, BrokerFileBlobStore
+from solkit.broker.codecs import BrokerJsonCodec
+from solkit.broker.constants import BROKER_CLAIM_CHECK_HEADER
+from solkit.broker.exceptions import BrokerBlobNotFoundException
+from solkit.broker.record import BrokerRecord
+
+
+@pytest.mark.asyncio
+async def test_broker_cache_blob_store_put_and_get_then_use_prefixed_key_and_ttl() -> None:
+    """Test the cache blob store keeps the raw value under a prefixed key expiring after the ttl."""
+    # arrange
+    cache = Mock()
+    cache.set_bytes = AsyncMock(return_value=True)
+    cache.get_bytes = AsyncMock(return_value=b'value')
+    store = BrokerCacheBlobStore(cache, ttl=60)
+    # act
+    await store.put('reference', b'value')
+    result = await store.get('reference')
+    # assert
+    assert result == b'value'
+    cache.set_bytes.assert_awaited_once_with('broker:claim-check:reference', b'value', 60)
+    cache.get_bytes.assert_awaited_once_with('broker:claim-check:reference')
+
+
+@pytest.mark.asyncio
+async def test_broker_cache_blob_store_get_when_missing_then_raise() -> None:
+    """Test the cache blob store raises when the reference expired."""
+    # arrange
+    cache = Mock()
+    cache.get_bytes = AsyncMock(return_value=None)
+    store = BrokerCacheBlobStore(cache)
+    # act
+    with pytest.raises(BrokerBlobNotFoundException):
+        await store.get('reference')
+
+
+@pytest.mark.asyncio
+async def test_broker_file_blob_store_put_and_get_then_round_trip(tmp_path: Path) -> None:
+    """Test the file blob store reads back the written value and raises for unknown references."""
+    # arrange
+    store = BrokerFileBlobStore(tmp_path / 'blobs')
+    # act
+    await store.put('reference', b'\x00value')
+    result = await store.get('reference')
+    # assert
+    assert result == b'\x00value'
+    assert [path.name for path in (tmp_path / 'blobs').iterdir()] == ['reference']
+    with pytest.raises(BrokerBlobNotFoundException):
+        await store.get('missing')
+
+
+@pytest.mark.asyncio
+async def test_broker_claim_check_offload_below_threshold_then_keep_value() -> None:
+    """Test a value within the threshold goes on the topic as is."""
+    # arrange
+    store = Mock()
+    store.put = AsyncMock()
+    claim_check = BrokerClaimCheck(store, threshold=5)
+    # act
+    value, headers = await claim_check.offload('topic', b'value')
+    # assert
+    assert value == b'value'
+    assert headers == []
+    store.put.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_broker_claim_check_offload_above_threshold_then_store_and_return_reference() -> None:
+    """Test an oversized value is stored and replaced by its reference."""
+    # arrange
+    store = Mock()
+    store.put = AsyncMock()
+    claim_check = BrokerClaimCheck(store, threshold=4)
+    # act
+    value, headers = await claim_check.offload('topic', b'value')
+    # assert
+    assert value == b''
+    [(name, reference)] = headers
+    assert name == BROKER_CLAIM_CHECK_HEADER
+    store.put.assert_awaited_once_with(reference.decode('utf-8'), b'value')
+
+
+@pytest.mark.asyncio
+async def test_broker_claim_check_rehydrate_then_load_only_claim_checked_records(
+    build_consumer_record_mock: Callable[..., Mock],
+) -> None:
+    """Test only the claim-checked records are loaded from the blob store."""
+    # arrange
+    store = Mock()
+    store.get = AsyncMock(return_value=b'{"data": {"some": "data"}}')
+    claim_check = BrokerClaimCheck(store)
+    claim_checked = BrokerRecord(
+        build_consumer_record_mock(headers=[(BROKER_CLAIM_CHECK_HEADER, b'reference')]), BrokerJsonCodec()
+    )
+    inline = BrokerRecord(build_consumer_record_mock(headers=[]), BrokerJsonCodec())
+    # act
+    await claim_check.rehydrate(claim_checked)
+    await claim_check.rehydrate(inline)
+    # assert
+    assert claim_checked.data == {'some': 'data'}
+    assert inline.payload is None
+    store.get.assert_awaited_once_with('reference')
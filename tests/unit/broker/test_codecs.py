@@ -0,0 +1,48 @@
+import pytest
+
+from solkit.broker.codecs import BrokerCodec, BrokerJsonCodec, BrokerMsgpackCodec, BrokerOrjsonCodec
+from solkit.broker.constants import BrokerContentType
+
+
+@pytest.mark.parametrize(
+    'codec',
+    [
+        pytest.param(BrokerJsonCodec(), id='json'),
+        pytest.param(BrokerOrjsonCodec(), id='orjson'),
+        pytest.param(BrokerMsgpackCodec(), id='msgpack'),
+    ],
+)
+def test_broker_codec_encode_then_decode_return_same_value(codec: BrokerCodec) -> None:
+    """Test encoding then decoding a value returns the same value."""
+    # arrange
+    value = {'data': {'id': 1, 'name': 'ação', 'items': [1.5, None, True]}, 'metadata': {'some': 'metadata'}}
+    # act
+    result = codec.decode(codec.encode(value))
+    # assert
+    assert result == value
+
+
+@pytest.mark.parametrize(
+    'codec, expected',
+    [
+        pytest.param(BrokerJsonCodec(), BrokerContentType.JSON, id='json'),
+        pytest.param(BrokerOrjsonCodec(), BrokerContentType.JSON, id='orjson'),
+        pytest.param(BrokerMsgpackCodec(), BrokerContentType.MSGPACK, id='msgpack'),
+    ],
+)
+def test_broker_codec_content_type(codec: BrokerCodec, expected: BrokerContentType) -> None:
+    """Test each codec announces its content type."""
+    # arrange
+    # act
+    # assert
+    assert codec.content_type == expected
+
+
+def test_broker_orjson_codec_decode_json_codec_value() -> None:
+    """Test the orjson codec decodes values encoded by the standard library codec."""
+    # arrange
+    value = {'data': {'some': 'data'}}
+    # act
+    result = BrokerOrjsonCodec().decode(BrokerJsonCodec().encode(value))
+    # assert
+    assert result == value
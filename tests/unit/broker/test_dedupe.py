@@ -0,0 +1,97 @@
+from collections.abc import Callable
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from aiokafka.structs import TopicPartition
+
+from solkit.broker.constants import BROKER_MESSAGE_ID_HEADER
+from solkit.broker.dedupe import BrokerDeduplicator
+
+
+@pytest.mark.asyncio
+async def test_broker_deduplicator_check_then_key_by_message_id_header(
+    build_consumer_record_mock: Callable[..., Mock],
+) -> None:
+    """Test the check keys a message by its message id header."""
+    # arrange
+    cache = AsyncMock()
+    cache.exists_keys = AsyncMock(return_value=[False])
+    deduplicator = BrokerDeduplicator(cache, group_id='group')
+    message = build_consumer_record_mock(
+        TopicPartition('topic', 0), 7, headers=[(BROKER_MESSAGE_ID_HEADER, b'message-id')]
+    )
+    # act
+    result = await deduplicator.check([message])
+    # assert
+    assert result == [False]
+    cache.exists_keys.assert_awaited_once_with('broker:dedupe:group:topic:message-id')
+
+
+@pytest.mark.asyncio
+async def test_broker_deduplicator_check_then_count_duplicates(build_consumer_record_mock: Callable[..., Mock]) -> None:
+    """Test the check counts the duplicated messages of a single pipelined lookup."""
+    # arrange
+    cache = AsyncMock()
+    cache.exists_keys = AsyncMock(return_value=[True, False, True])
+    deduplicator = BrokerDeduplicator(cache, group_id='group')
+    messages = [build_consumer_record_mock(TopicPartition('topic', 0), offset) for offset in range(3)]
+    # act
+    result = await deduplicator.check(messages)
+    # assert
+    assert result == [True, False, True]
+    assert deduplicator.duplicates == 2
+    cache.exists_keys.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_broker_deduplicator_check_with_unavailable_cache_then_flag_no_duplicates(
+    build_consumer_record_mock: Callable[..., Mock],
+) -> None:
+    """Test the check lets every message through when the cache is unavailable."""
+    # arrange
+    cache = AsyncMock()
+    cache.exists_keys = AsyncMock(side_effect=ConnectionError('unavailable'))
+    deduplicator = BrokerDeduplicator(cache, group_id='group')
+    messages = [build_consumer_record_mock(TopicPartition('topic', 0), offset) for offset in range(2)]
+    # act
+    result = await deduplicator.check(messages)
+    # assert
+    assert result == [False, False]
+    assert deduplicator.duplicates == 0
+
+
+@pytest.mark.asyncio
+async def test_broker_deduplicator_check_with_mismatched_cache_response_then_flag_no_duplicates(
+    build_consumer_record_mock: Callable[..., Mock],
+) -> None:
+    """Test the check lets every message through when the cache answers with fewer flags than messages."""
+    # arrange
+    cache = AsyncMock()
+    cache.exists_keys = AsyncMock(return_value=[True])
+    deduplicator = BrokerDeduplicator(cache, group_id='group')
+    messages = [build_consumer_record_mock(TopicPartition('topic', 0), offset) for offset in range(2)]
+    # act
+    result = await deduplicator.check(messages)
+    # assert
+    assert result == [False, False]
+    assert deduplicator.duplicates == 0
+
+
+@pytest.mark.asyncio
+async def test_broker_deduplicator_flush_then_write_pending_entries_once(
+    build_consumer_record_mock: Callable[..., Mock],
+) -> None:
+    """Test the flush writes the marked messages with a single pipeline and clears them."""
+    # arrange
+    cache = AsyncMock()
+    deduplicator = BrokerDeduplicator(cache, group_id='group', ttl=60)
+    deduplicator.mark(build_consumer_record_mock(TopicPartition('topic', 0), 0))
+    deduplicator.mark(build_consumer_record_mock(TopicPartition('topic', 1), 0))
+    # act
+    await deduplicator.flush()
+    await deduplicator.flush()
+    # assert
+    cache.set_keys.assert_awaited_once_with(
+        {'broker:dedupe:group:topic:0:0': '1', 'broker:dedupe:group:topic:1:0': '1'},
+        ttl=60,
+    )
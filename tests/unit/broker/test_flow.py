@@ -0,0 +1,88 @@
+from collections.abc import Callable
+from unittest.mock import Mock
+
+import pytest
+from aiokafka.structs import TopicPartition
+
+from solkit.broker.flow import BrokerBackpressure, BrokerPartitionPauser
+
+PARTITION = TopicPartition('topic', 0)
+
+
+def test_broker_partition_pauser_resume_then_wait_for_every_reason(build_consumer_mock: Callable[..., Mock]) -> None:
+    """Test the pauser resumes a partition only once every pause reason is lifted."""
+    # arrange
+    consumer = build_consumer_mock()
+    pauser = BrokerPartitionPauser(consumer)
+    pauser.pause(PARTITION, 'retry')
+    pauser.pause(PARTITION, 'backpressure')
+    # act
+    pauser.resume(PARTITION, 'retry')
+    # assert
+    consumer.resume.assert_not_called()
+    assert pauser.is_paused(PARTITION)
+    assert not pauser.is_paused(PARTITION, 'retry')
+    pauser.resume(PARTITION, 'backpressure')
+    consumer.resume.assert_called_once_with(PARTITION)
+    assert not pauser.is_paused(PARTITION)
+
+
+def test_broker_partition_pauser_resume_revoked_partition_then_do_not_resume(
+    build_consumer_mock: Callable[..., Mock],
+) -> None:
+    """Test the pauser does not resume a partition no longer assigned."""
+    # arrange
+    consumer = build_consumer_mock()
+    consumer.assignment.return_value = set()
+    pauser = BrokerPartitionPauser(consumer)
+    pauser.pause(PARTITION, 'retry')
+    # act
+    pauser.resume(PARTITION, 'retry')
+    # assert
+    consumer.resume.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_broker_partition_pauser_release_then_forget_reasons(build_consumer_mock: Callable[..., Mock]) -> None:
+    """Test the release forgets the pause reasons of the revoked partitions."""
+    # arrange
+    pauser = BrokerPartitionPauser(build_consumer_mock())
+    pauser.pause(PARTITION, 'retry')
+    # act
+    await pauser.release({PARTITION})
+    # assert
+    assert not pauser.is_paused(PARTITION)
+
+
+def test_broker_backpressure_then_pause_at_high_and_resume_at_low_watermark(
+    build_consumer_mock: Callable[..., Mock],
+) -> None:
+    """Test the backpressure pauses a partition at the high watermark and resumes it at the low watermark."""
+    # arrange
+    consumer = build_consumer_mock()
+    backpressure = BrokerBackpressure(BrokerPartitionPauser(consumer), high_watermark=3, low_watermark=1)
+    # act
+    for _ in range(3):
+        backpressure.add(PARTITION)
+    # assert
+    consumer.pause.assert_called_once_with(PARTITION)
+    backpressure.done(PARTITION)
+    consumer.resume.assert_not_called()
+    backpressure.done(PARTITION)
+    consumer.resume.assert_called_once_with(PARTITION)
+    assert backpressure.in_flight(PARTITION) == 1
+
+
+@pytest.mark.asyncio
+async def test_broker_backpressure_release_then_ignore_late_completions(
+    build_consumer_mock: Callable[..., Mock],
+) -> None:
+    """Test the backpressure forgets the revoked partitions and ignores their late completions."""
+    # arrange
+    backpressure = BrokerBackpressure(BrokerPartitionPauser(build_consumer_mock()), high_watermark=3, low_watermark=1)
+    backpressure.add(PARTITION)
+    # act
+    await backpressure.release({PARTITION})
+    backpressure.done(PARTITION)
+    # assert
+    assert backpressure.in_flight(PARTITION) == 0
@@ -0,0 +1,205 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from unittest.mock import AsyncMock
+
+import pytest
+
+from solkit.broker.exceptions import BrokerHandlerTimeoutException
+from solkit.broker.handlers import BrokerHandlerRunner
+from solkit.common.trace_correlation_id import get_trace_correlation_id, set_trace_correlation_id
+
+
+def raise_correlation_id(records: list) -> None:
+    """Raise the correlation id seen by a sync handler."""
+    raise ValueError(get_trace_correlation_id())
+
+
+async def handle(records: list) -> None:
+    """Handle records asynchronously."""
+
+
+def return_coroutine(records: list) -> object:
+    """Return the coroutine of an async handler from a sync handler."""
+    return handle(records)
+
+
+@pytest.mark.asyncio
+async def test_broker_handler_runner_run_async_handler_then_await_on_loop() -> None:
+    """Test an async handler is awaited on the event loop."""
+    # arrange
+    handler = AsyncMock()
+    runner = BrokerHandlerRunner()
+    # act
+    await runner.run(handler, [])
+    # assert
+    handler.assert_awaited_once_with([])
+
+
+@pytest.mark.asyncio
+async def test_broker_handler_runner_run_sync_handler_then_run_in_thread_with_context() -> None:
+    """Test a sync handler runs off the event loop thread with the caller correlation id."""
+    # arrange
+    seen: list[tuple[str | None, bool]] = []
+
+    def handler(records: list) -> None:
+        seen.append((get_trace_correlation_id(), threading.current_thread() is threading.main_thread()))
+
+    set_trace_correlation_id('correlation-id')
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        # act
+        await BrokerHandlerRunner(executor).run(handler, [])
+    # assert
+    assert seen == [('correlation-id', False)]
+
+
+@pytest.mark.asyncio
+async def test_broker_handler_runner_run_sync_handlers_then_bound_concurrency() -> None:
+    """Test the sync handlers running at the same time never exceed the concurrency."""
+    # arrange
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def handler(records: list) -> None:
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.01)
+        with lock:
+            running -= 1
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        runner = BrokerHandlerRunner(executor, concurrency=2)
+        # act
+        await asyncio.gather(*(runner.run(handler, []) for _ in range(6)))
+    # assert
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_broker_handler_runner_run_in_process_pool_then_propagate_correlation_id_and_errors() -> None:
+    """Test a process pool handler gets the correlation id and its exception is raised back."""
+    # arrange
+    set_trace_correlation_id('correlation-id')
+    with ProcessPoolExecutor(max_workers=1) as executor, pytest.raises(ValueError, match='correlation-id'):
+        # act
+        await BrokerHandlerRunner(executor).run(raise_correlation_id, [])
+
+
+async def hang(records: list) -> None:
+    """Wait until cancelled."""
+    await asyncio.Event().wait()
+
+
+@pytest.mark.asyncio
+async def test_broker_handler_runner_run_async_handler_past_timeout_then_cancel_and_raise_timeout() -> None:
+    """Test an async handler running past the timeout is cancelled and a timeout exception is raised."""
+    # arrange
+    cancelled = asyncio.Event()
+
+    async def handler(records: list) -> None:
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    runner = BrokerHandlerRunner(timeout=0.01)
+    # act
+    with pytest.raises(BrokerHandlerTimeoutException, match='0.01s'):
+        await runner.run(handler, [])
+    # assert
+    assert cancelled.is_set()
+
+
+@pytest.mark.asyncio
+async def test_broker_handler_runner_run_handler_raising_timeout_error_then_raise_it_unchanged() -> None:
+    """Test a timeout error raised by the handler itself is not reported as a handler timeout."""
+    # arrange
+    handler = AsyncMock(side_effect=TimeoutError('downstream'))
+    runner = BrokerHandlerRunner(timeout=10)
+    # act
+    with pytest.raises(TimeoutError, match='downstream'):
+        await runner.run(handler, [])
+    # assert
+    handler.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_broker_handler_runner_run_sync_handler_past_timeout_then_keep_slot_until_it_returns() -> None:
+    """Test a sync handler past the timeout raises a timeout exception and keeps its slot until it returns."""
+    # arrange
+    release = threading.Event()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        runner = BrokerHandlerRunner(executor, concurrency=1, timeout=0.01)
+        # act
+        with pytest.raises(BrokerHandlerTimeoutException):
+            await runner.run(lambda records: release.wait(), [])
+        queued = asyncio.create_task(runner.run(lambda records: None, []))
+        await asyncio.sleep(0.05)
+        blocked = not queued.done()
+        release.set()
+        await queued
+    # assert
+    assert blocked is True
+
+
+@pytest.mark.asyncio
+async def test_broker_handler_runner_run_past_soft_timeout_then_log_async_handler_stack(
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    """Test the watchdog logs the stack of an async handler running past the soft timeout."""
+    # arrange
+    runner = BrokerHandlerRunner(timeout=0.1, soft_timeout=0.01)
+    # act
+    with pytest.raises(BrokerHandlerTimeoutException):
+        await runner.run(hang, [])
+    # assert
+    assert '[WATCHDOG][HANDLER: hang' in caplog.text
+    assert 'await asyncio.Event().wait()' in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_broker_handler_runner_run_past_soft_timeout_then_log_sync_handler_stack(
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    """Test the watchdog logs the stack of the thread of a sync handler running past the soft timeout."""
+
+    # arrange
+    def handler(records: list) -> None:
+        time.sleep(0.1)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        runner = BrokerHandlerRunner(executor, soft_timeout=0.01)
+        # act
+        await runner.run(handler, [])
+    # assert
+    assert '[WATCHDOG][HANDLER: ' in caplog.text
+    assert 'time.sleep(0.1)' in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_broker_handler_runner_run_sync_callable_returning_coroutine_then_await_it() -> None:
+    """Test the coroutine returned by a sync callable wrapping an async handler is awaited."""
+    # arrange
+    handler = AsyncMock()
+    runner = BrokerHandlerRunner()
+    # act
+    await runner.run(lambda records: handler(records, 'db'), [])
+    # assert
+    handler.assert_awaited_once_with([], 'db')
+
+
+@pytest.mark.asyncio
+async def test_broker_handler_runner_run_sync_callable_returning_coroutine_in_process_pool_then_raise() -> None:
+    """Test a sync callable returning a coroutine on a process pool raises instead of dropping the coroutine."""
+    # arrange
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        runner = BrokerHandlerRunner(executor)
+        # act
+        # assert
+        with pytest.raises(TypeError, match='returned an awaitable'):
+            await runner.run(return_coroutine, [])
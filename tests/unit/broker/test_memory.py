@@ -0,0 +1,777 @@
+import asyncio
+import datetime
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+import pytest
+from aiokafka.errors import ConsumerStoppedError, IllegalOperation
+from aiokafka.structs import TopicPartition
+from pydantic import BaseModel
+
+from solkit.broker.claim_check import BrokerClaimCheck, BrokerFileBlobStore
+from solkit.broker.codecs import BrokerJsonCodec
+from solkit.broker.memory import BrokerMemoryAdapter, BrokerMemoryCluster, BrokerMemoryConsumer, BrokerMemoryProducer
+from solkit.broker.record import BrokerRecord
+from solkit.broker.replay import BrokerReplayProgress
+from solkit.broker.repository import BrokerRepository
+from solkit.broker.settings import BrokerKafkaConsumerSettings, BrokerKafkaProducerSettings
+
+
+class PayloadModel(BaseModel):
+    """Payload model for the schema tests."""
+
+    id: int
+    name: str
+
+
+@pytest.fixture
+def cluster() -> Iterator[BrokerMemoryCluster]:
+    """Provide a two partitions cluster shared under the ``memory`` bootstrap servers."""
+    BrokerMemoryCluster.reset()
+    cluster = BrokerMemoryCluster.get('memory')
+    cluster.partitions = 2
+    yield cluster
+    BrokerMemoryCluster.reset()
+
+
+@pytest.mark.asyncio
+async def test_broker_memory_consumer_getmany_then_return_produced_messages(cluster: BrokerMemoryCluster) -> None:
+    """Test a consumer fetches the produced messages grouped by partition."""
+    # arrange
+    producer = BrokerMemoryProducer()
+    for index in range(4):
+        await producer.send_and_wait('topic', value=b'value', key=bytes(str(index), 'utf-8'))
+    consumer = BrokerMemoryConsumer('topic', group_id='group')
+    await consumer.start()
+    # act
+    fetched = await consumer.getmany(timeout_ms=0)
+    # assert
+    assert sum(len(records) for records in fetched.values()) == 4
+    assert consumer.assignment() == {TopicPartition('topic', 0), TopicPartition('topic', 1)}
+    assert await consumer.getmany(timeout_ms=0) == {}
+
+
+@pytest.mark.asyncio
+async def test_broker_memory_consumer_paused_partition_then_skip_until_resumed(cluster: BrokerMemoryCluster) -> None:
+    """Test a paused partition is not fetched until resumed."""
+    # arrange
+    partition = TopicPartition('topic', 0)
+    producer = BrokerMemoryProducer()
+    await producer.send_and_wait('topic', value=b'value', partition=0)
+    consumer = BrokerMemoryConsumer('topic', group_id='group')
+    await consumer.start()
+    # act
+    consumer.pause(partition)
+    paused = await consumer.getmany(timeout_ms=0)
+    consumer.resume(partition)
+    resumed = await consumer.getmany(timeout_ms=0)
+    # assert
+    assert paused == {}
+    assert [record.offset for record in resumed[partition]] == [0]
+
+
+@pytest.mark.asyncio
+async def test_broker_memory_consumer_restart_then_resume_from_committed_offset(cluster: BrokerMemoryCluster) -> None:
+    """Test a consumer joining the group starts from the committed offsets."""
+    # arrange
+    partition = TopicPartition('topic', 0)
+    producer = BrokerMemoryProducer()
+    for _ in range(3):
+        await producer.send_and_wait('topic', value=b'value', partition=0)
+    first = BrokerMemoryConsumer('topic', group_id='group')
+    await first.start()
+    await first.commit({partition: 2})
+    await first.stop()
+    second = BrokerMemoryConsumer('topic', group_id='group')
+    await second.start()
+    # act
+    fetched = await second.getmany(partition, timeout_ms=0)
+    # assert
+    assert [record.offset for record in fetched[partition]] == [2]
+    with pytest.raises(ConsumerStoppedError):
+        await first.getmany(timeout_ms=0)
+
+
+@pytest.mark.asyncio
+async def test_broker_memory_consumer_group_then_spread_partitions(cluster: BrokerMemoryCluster) -> None:
+    """Test the partitions are spread over the group members and moved back when a member leaves."""
+    # arrange
+    first = BrokerMemoryConsumer('topic', group_id='group')
+    second = BrokerMemoryConsumer('topic', group_id='group')
+    await first.start()
+    # act
+    await second.start()
+    # assert
+    assert len(first.assignment()) == len(second.assignment()) == 1
+    await second.stop()
+    assert len(first.assignment()) == 2
+
+
+@pytest.mark.asyncio
+async def test_broker_memory_adapter_repository_then_consume_and_retry(cluster: BrokerMemoryCluster) -> None:
+    """Test the repository produces, consumes, retries and commits through the in-memory adapter."""
+    # arrange
+    adapter = BrokerMemoryAdapter(
+        producer_settings=BrokerKafkaProducerSettings(BROKER_BOOTSTRAP_SERVERS='memory'),
+        consumer_settings=BrokerKafkaConsumerSettings(
+            BROKER_BOOTSTRAP_SERVERS='memory', BROKER_TOPICS='topic', BROKER_GROUP_ID='group', BROKER_RETRY_MAX_TIMES=1
+        ),
+    )
+    await adapter.connect()
+    repository = BrokerRepository(adapter=adapter)
+    handled: list[tuple[str, int]] = []
+
+    async def handler(message: BrokerRecord) -> None:
+        handled.append((message.topic, message.retry_count))
+        if message.retry_count == 0:
+            raise ValueError('invalid')
+
+    await repository.produce(topic='topic', key='key', value={'some': 'data'})
+    consumption = asyncio.create_task(repository.consume(handler, wait_time=0))
+    # act
+    while len(handled) < 2:
+        await asyncio.sleep(0.01)
+    await repository.stop()
+    await consumption
+    # assert
+    assert handled == [('topic', 0), ('topic-RETRY-1', 1)]
+    for topic in ('topic', 'topic-RETRY-1'):
+        committed = [
+            cluster.committed('group', partition)
+            for partition in cluster.partitions_for(topic)
+            if cluster.highwater(partition)
+        ]
+        assert committed == [1]
+
+
+@pytest.mark.asyncio
+async def test_broker_memory_adapter_repository_unknown_content_type_then_forward_to_dead_letter_queue(
+    cluster: BrokerMemoryCluster,
+) -> None:
+    """Test a message with an unsupported content type fails like its handler and is forwarded as is to the DLQ."""
+    # arrange
+    cluster.partitions = 1
+    adapter = BrokerMemoryAdapter(
+        producer_settings=BrokerKafkaProducerSettings(BROKER_BOOTSTRAP_SERVERS='memory'),
+        consumer_settings=BrokerKafkaConsumerSettings(
+            BROKER_BOOTSTRAP_SERVERS='memory', BROKER_TOPICS='topic', BROKER_GROUP_ID='group', BROKER_RETRY_MAX_TIMES=1
+        ),
+    )
+    await adapter.connect()
+    repository = BrokerRepository(adapter=adapter)
+    handled: list[BrokerRecord] = []
+    await BrokerMemoryProducer().send_and_wait(
+        'topic', b'<some>data</some>', b'key', headers=[('Content-Type', b'application/xml')]
+    )
+    consumption = asyncio.create_task(repository.consume(handled.append, wait_time=0))  # type: ignore
+    # act
+    while cluster.committed('group', TopicPartition('topic-RETRY-1', 0)) != 1:
+        await asyncio.sleep(0.01)
+    await repository.stop()
+    await consumption
+    dead_letter_reader = BrokerMemoryConsumer('topic-DLQ')
+    await dead_letter_reader.start()
+    dead_letters = (await dead_letter_reader.getmany(timeout_ms=0))[TopicPartition('topic-DLQ', 0)]
+    # assert
+    assert handled == []
+    assert cluster.committed('group', TopicPartition('topic', 0)) == 1
+    assert [(message.key, message.value) for message in dead_letters] == [(b'key', b'<some>data</some>')]
+    assert ('Content-Type', b'application/xml') in dead_letters[0].headers
+    assert ('X-Retry-Count', b'2') in dead_letters[0].headers
+
+
+@pytest.mark.asyncio
+async def test_broker_memory_adapter_repository_invalid_payload_then_forward_to_dead_letter_queue(
+    cluster: BrokerMemoryCluster,
+) -> None:
+    """Test a payload failing the topic schema reaches the DLQ without being validated again on the way."""
+    # arrange
+    cluster.partitions = 1
+    adapter = BrokerMemoryAdapter(
+        producer_settings=BrokerKafkaProducerSettings(BROKER_BOOTSTRAP_SERVERS='memory'),
+        consumer_settings=BrokerKafkaConsumerSettings(
+            BROKER_BOOTSTRAP_SERVERS='memory', BROKER_TOPICS='topic', BROKER_GROUP_ID='group', BROKER_RETRY_MAX_TIMES=1
+        ),
+    )
+    await adapter.connect()
+    repository = BrokerRepository(adapter=adapter)
+    repository.register_schema('topic', PayloadModel)
+    attempts: list[str] = []
+
+    async def handler(message: BrokerRecord) -> None:
+        attempts.append(message.topic)
+        _ = message.data
+
+    await BrokerMemoryProducer().send_and_wait('topic', b'{"data": {"id": "not-an-int"}}', b'key')
+    consumption = asyncio.create_task(repository.consume(handler, wait_time=0))
+    # act
+    while cluster.committed('group', TopicPartition('topic-RETRY-1', 0)) != 1:
+        await asyncio.sleep(0.01)
+    await repository.stop()
+    await consumption
+    dead_letter_reader = BrokerMemoryConsumer('topic-DLQ')
+    await dead_letter_reader.start()
+    dead_letters = (await dead_letter_reader.getmany(timeout_ms=0))[TopicPartition('topic-DLQ', 0)]
+    dead_letter = BrokerRecord(dead_letters[0], BrokerJsonCodec())
+    # assert
+    assert attempts == ['topic', 'topic-RETRY-1']
+    assert cluster.committed('group', TopicPartition('topic', 0)) == 1
+    assert dead_letter.data == {'id': 'not-an-int'}
+    assert 'validation errors for PayloadModel' in dead_letter.metadata['error']
+    assert dead_letter.retry_count == 2
+
+
+@pytest.mark.asyncio
+async def test_broker_memory_adapter_repository_rebalance_then_drain_and_commit_revoked(
+    cluster: BrokerMemoryCluster,
+) -> None:
+    """Test the in-flight messages of revoked partitions are processed and committed before the revocation."""
+    # arrange
+    adapter = BrokerMemoryAdapter(
+        producer_settings=BrokerKafkaProducerSettings(BROKER_BOOTSTRAP_SERVERS='memory'),
+        consumer_settings=BrokerKafkaConsumerSettings(
+            BROKER_BOOTSTRAP_SERVERS='memory', BROKER_TOPICS='topic', BROKER_GROUP_ID='group'
+        ),
+    )
+    await adapter.connect()
+    repository = BrokerRepository(adapter=adapter)
+    released = asyncio.Event()
+    handled: list[int] = []
+
+    async def handler(message: BrokerRecord) -> None:
+        await released.wait()
+        handled.append(message.partition)
+
+    for index in range(8):
+        await repository.produce(topic='topic', key=str(index), value={'index': index})
+    revoked = TopicPartition('topic', 1)
+    consumption = asyncio.create_task(repository.consume(handler, wait_time=0))
+    while await adapter.consumer.position(revoked) < cluster.highwater(revoked):
+        await asyncio.sleep(0.01)
+    other = BrokerMemoryConsumer('topic', bootstrap_servers='memory', group_id='group')
+    asyncio.get_running_loop().call_later(0.05, released.set)
+    # act
+    await other.start()
+    # assert
+    assert handled.count(1) == cluster.highwater(revoked)
+    assert cluster.committed('group', revoked) == cluster.highwater(revoked)
+    assert revoked in other.assignment()
+    await repository.stop()
+    await consumption
+    await other.stop()
+
+
+@pytest.mark.asyncio
+async def test_broker_memory_adapter_repository_claim_check_then_rehydrate_and_retry_reference(
+    cluster: BrokerMemoryCluster, tmp_path: Path
+) -> None:
+    """Test an oversized value is offloaded, rehydrated for its handler and retried with its reference only."""
+    # arrange
+    adapter = BrokerMemoryAdapter(
+        producer_settings=BrokerKafkaProducerSettings(BROKER_BOOTSTRAP_SERVERS='memory'),
+        consumer_settings=BrokerKafkaConsumerSettings(
+            BROKER_BOOTSTRAP_SERVERS='memory', BROKER_TOPICS='topic', BROKER_GROUP_ID='group', BROKER_RETRY_MAX_TIMES=1
+        ),
+    )
+    await adapter.connect()
+    store = BrokerFileBlobStore(tmp_path)
+    repository = BrokerRepository(adapter=adapter, claim_check=BrokerClaimCheck(store, threshold=64))
+    handled: list[tuple[int, int]] = []
+
+    async def handler(message: BrokerRecord) -> None:
+        handled.append((message.retry_count, len(message.data['document'])))  # type: ignore
+        if message.retry_count == 0:
+            raise ValueError('invalid')
+
+    await repository.produce(topic='topic', key='key', value={'document': 'x' * 1024})
+    consumption = asyncio.create_task(repository.consume(handler, wait_time=0))
+    # act
+    while len(handled) < 2:
+        await asyncio.sleep(0.01)
+    await repository.stop()
+    await consumption
+    # assert
+    assert handled == [(0, 1024), (1, 1024)]
+    assert len(list(tmp_path.iterdir())) == 1
+    retried = [
+        message for partition in cluster.partitions_for('topic-RETRY-1') for message in cluster.fetch(partition, 0, 10)
+    ]
+    assert [message.value for message in retried] == [b'']
+
+
+@pytest.mark.asyncio
+async def test_broker_memory_adapter_repository_replay_since_until_datetime_then_replay_window(
+    cluster: BrokerMemoryCluster,
+) -> None:
+    """Test a replay between two datetimes hands only the messages produced in between, without committing."""
+    # arrange
+    adapter = BrokerMemoryAdapter(
+        producer_settings=BrokerKafkaProducerSettings(BROKER_BOOTSTRAP_SERVERS='memory'),
+        consumer_settings=BrokerKafkaConsumerSettings(
+            BROKER_BOOTSTRAP_SERVERS='memory', BROKER_TOPICS='topic', BROKER_GROUP_ID='group'
+        ),
+    )
+    await adapter.connect()
+    repository = BrokerRepository(adapter=adapter)
+    replayed: list[int] = []
+    reports: list[BrokerReplayProgress] = []
+
+    async def handler(messages: list[BrokerRecord]) -> None:
+        replayed.extend(message.data['index'] for message in messages)  # type: ignore
+
+    await repository.produce_many('topic', [(str(index), {'index': index}) for index in range(4)])
+    await asyncio.sleep(0.01)
+    since = datetime.datetime.now(datetime.UTC)
+    await repository.produce_many('topic', [(str(index), {'index': index}) for index in range(4, 10)])
+    await asyncio.sleep(0.01)
+    until = datetime.datetime.now(datetime.UTC)
+    await repository.produce_many('topic', [(str(index), {'index': index}) for index in range(10, 12)])
+    # act
+    progress = await repository.replay(handler, ['topic'], since=since, until=until, on_progress=reports.append)
+    # assert
+    assert sorted(replayed) == list(range(4, 10))
+    assert progress.messages == 6
+    assert progress.remaining == 0
+    assert reports == [progress]
+    assert [cluster.committed('group', partition) for partition in cluster.partitions_for('topic')] == [None, None]
+    await adapter.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_broker_memory_adapter_repository_replay_since_offsets_then_replay_listed_partitions_to_end(
+    cluster: BrokerMemoryCluster,
+) -> None:
+    """Test a replay from offsets only reads the listed partitions, up to their end offset at start."""
+    # arrange
+    adapter = BrokerMemoryAdapter(
+        producer_settings=BrokerKafkaProducerSettings(BROKER_BOOTSTRAP_SERVERS='memory'),
+        consumer_settings=BrokerKafkaConsumerSettings(
+            BROKER_BOOTSTRAP_SERVERS='memory', BROKER_TOPICS='topic', BROKER_GROUP_ID='group'
+        ),
+    )
+    await adapter.connect()
+    repository = BrokerRepository(adapter=adapter)
+    partition = TopicPartition('topic', 0)
+    for _ in range(5):
+        await adapter.producer.send_and_wait('topic', b'{"data": {}}', partition=0)
+        await adapter.producer.send_and_wait('topic', b'{"data": {}}', partition=1)
+    replayed: list[tuple[int, int]] = []
+
+    async def handler(messages: list[BrokerRecord]) -> None:
+        replayed.extend((message.partition, message.offset) for message in messages)
+
+    # act
+    progress = await repository.replay(handler, ['topic'], since={partition: 2})
+    # assert
+    assert replayed == [(0, 2), (0, 3), (0, 4)]
+    assert progress.positions == {partition: 5}
+    await adapter.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_broker_memory_adapter_repository_replay_since_offset_below_log_start_then_replay_from_log_start(
+    cluster: BrokerMemoryCluster,
+) -> None:
+    """Test a replay from an offset already deleted by the retention starts from the first message left."""
+    # arrange
+    cluster.partitions = 1
+    adapter = BrokerMemoryAdapter(
+        producer_settings=BrokerKafkaProducerSettings(BROKER_BOOTSTRAP_SERVERS='memory'),
+        consumer_settings=BrokerKafkaConsumerSettings(
+            BROKER_BOOTSTRAP_SERVERS='memory', BROKER_TOPICS='topic', BROKER_GROUP_ID='group'
+        ),
+    )
+    await adapter.connect()
+    repository = BrokerRepository(adapter=adapter)
+    partition = TopicPartition('topic', 0)
+    for _ in range(5):
+        await adapter.producer.send_and_wait('topic', b'{"data": {}}', partition=0)
+    cluster.delete_records(partition, 3)
+    replayed: list[int] = []
+
+    async def handler(messages: list[BrokerRecord]) -> None:
+        replayed.extend(message.offset for message in messages)
+
+    # act
+    progress = await repository.replay(handler, ['topic'], since={partition: 1})
+    # assert
+    assert replayed == [3, 4]
+    assert progress.positions == {partition: 5}
+    await adapter.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_broker_memory_adapter_repository_consume_lanes_then_main_not_delayed_by_retry_backlog(
+    cluster: BrokerMemoryCluster,
+) -> None:
+    """Test the main topic is consumed by its own consumer while the retry lane drains its backlog."""
+    # arrange
+    adapter = BrokerMemoryAdapter(
+        producer_settings=BrokerKafkaProducerSettings(BROKER_BOOTSTRAP_SERVERS='memory'),
+        consumer_settings=BrokerKafkaConsumerSettings(
+            BROKER_BOOTSTRAP_SERVERS='memory',
+            BROKER_TOPICS='topic',
+            BROKER_GROUP_ID='group',
+            BROKER_RETRY_MAX_TIMES=1,
+            BROKER_CONSUME_LANES=True,
+        ),
+    )
+    await adapter.connect()
+    repository = BrokerRepository(adapter=adapter)
+    handled: list[str] = []
+
+    async def handler(message: BrokerRecord) -> None:
+        if message.topic != 'topic':
+            await asyncio.sleep(0.01)
+        handled.append(message.topic)
+
+    for _ in range(20):
+        await adapter.producer.send_and_wait('topic-RETRY-1', b'{"data": {}}')
+    consumption = asyncio.create_task(repository.consume(handler, wait_time=0))
+    while not handled:
+        await asyncio.sleep(0.001)
+    # act
+    await repository.produce(topic='topic', key='key', value={'some': 'data'})
+    while len(handled) < 21:
+        await asyncio.sleep(0.01)
+    await repository.stop()
+    await consumption
+    # assert
+    assert handled.index('topic') < 10
+    assert adapter.consumer.subscription() == {'topic'}
+    for topic, messages in (('topic', 1), ('topic-RETRY-1', 20)):
+        committed = [cluster.committed('group', partition) or 0 for partition in cluster.partitions_for(topic)]
+        assert sum(committed) == messages
+
+
+@pytest.mark.asyncio
+async def test_broker_memory_adapter_repository_stop_then_commit_pending_offsets_of_every_lane(
+    cluster: BrokerMemoryCluster,
+) -> None:
+    """Test stopping the repository commits the offsets pending below the commit policy before the consumers stop."""
+    # arrange
+    adapter = BrokerMemoryAdapter(
+        producer_settings=BrokerKafkaProducerSettings(BROKER_BOOTSTRAP_SERVERS='memory'),
+        consumer_settings=BrokerKafkaConsumerSettings(
+            BROKER_BOOTSTRAP_SERVERS='memory',
+            BROKER_TOPICS='topic',
+            BROKER_GROUP_ID='group',
+            BROKER_RETRY_MAX_TIMES=1,
+            BROKER_CONSUME_LANES=True,
+            BROKER_COMMIT_MAX_MESSAGES=100,
+        ),
+    )
+    await adapter.connect()
+    repository = BrokerRepository(adapter=adapter)
+    handled: list[str] = []
+
+    async def handler(message: BrokerRecord) -> None:
+        handled.append(message.topic)
+        if message.topic == 'topic':
+            raise ValueError('retry')
+
+    for index in range(5):
+        await repository.produce(topic='topic', key=str(index), value={'index': index})
+    consumption = asyncio.create_task(repository.consume(handler, wait_time=0))
+    while len(handled) < 10:
+        await asyncio.sleep(0.01)
+    # act
+    await repository.stop()
+    await consumption
+    # assert
+    for topic in ('topic', 'topic-RETRY-1'):
+        committed = [cluster.committed('group', partition) or 0 for partition in cluster.partitions_for(topic)]
+        assert sum(committed) == 5
+    with pytest.raises(ConsumerStoppedError):
+        await adapter.consumer.commit()
+
+
+@pytest.mark.asyncio
+async def test_broker_memory_adapter_repository_rate_limit_then_consume_at_rate(cluster: BrokerMemoryCluster) -> None:
+    """Test the rate limit spreads the consumption past the first second of tokens by pausing the partitions."""
+    # arrange
+    adapter = BrokerMemoryAdapter(
+        producer_settings=BrokerKafkaProducerSettings(BROKER_BOOTSTRAP_SERVERS='memory'),
+        consumer_settings=BrokerKafkaConsumerSettings(
+            BROKER_BOOTSTRAP_SERVERS='memory',
+            BROKER_TOPICS='topic',
+            BROKER_GROUP_ID='group',
+            BROKER_MAX_POLL_RECORDS=50,
+            BROKER_RATE_LIMIT_MESSAGES_PER_SECOND=200,
+        ),
+    )
+    await adapter.connect()
+    repository = BrokerRepository(adapter=adapter)
+    await repository.produce_many('topic', [(str(index), {'index': index}) for index in range(300)])
+    handled: list[float] = []
+
+    async def handler(message: BrokerRecord) -> None:
+        handled.append(time.monotonic())
+
+    started = time.monotonic()
+    consumption = asyncio.create_task(repository.consume(handler, wait_time=0))
+    # act
+    while len(handled) < 300:
+        await asyncio.sleep(0.01)
+    await repository.stop()
+    await consumption
+    # assert
+    assert handled[199] - started < 0.2
+    assert handled[-1] - started >= 0.4
+
+
+@pytest.mark.asyncio
+async def test_broker_memory_adapter_repository_circuit_breaker_then_hold_until_probe_succeeds(
+    cluster: BrokerMemoryCluster,
+) -> None:
+    """Test an open circuit holds the failed messages without routing, committing or counting them as consumed."""
+    # arrange
+    cluster.partitions = 1
+    adapter = BrokerMemoryAdapter(
+        producer_settings=BrokerKafkaProducerSettings(BROKER_BOOTSTRAP_SERVERS='memory'),
+        consumer_settings=BrokerKafkaConsumerSettings(
+            BROKER_BOOTSTRAP_SERVERS='memory',
+            BROKER_TOPICS='topic',
+            BROKER_GROUP_ID='group',
+            BROKER_RETRY_MAX_TIMES=1,
+            BROKER_CIRCUIT_BREAKER_FAILURE_RATE=1,
+            BROKER_CIRCUIT_BREAKER_WINDOW=2,
+            BROKER_CIRCUIT_BREAKER_OPEN_MS=50,
+        ),
+    )
+    await adapter.connect()
+    repository = BrokerRepository(adapter=adapter)
+    await repository.produce_many('topic', [(str(index), {'index': index}) for index in range(5)])
+    partition = TopicPartition('topic', 0)
+    available = False
+    handled: list[int] = []
+
+    async def handler(message: BrokerRecord) -> None:
+        if not available:
+            raise ConnectionError('downstream unavailable')
+        handled.append(message.data['index'])
+
+    consumption = asyncio.create_task(repository.consume(handler, wait_time=0))
+    while not adapter.consumer.paused():
+        await asyncio.sleep(0.001)
+    await asyncio.sleep(0.1)
+    committed_while_open = cluster.committed('group', partition)
+    # act
+    available = True
+    while len(handled) < 5:
+        await asyncio.sleep(0.01)
+    await repository.stop()
+    await consumption
+    # assert
+    assert committed_while_open == 1
+    assert sorted(handled) == [0, 1, 2, 3, 4]
+    assert cluster.committed('group', partition) == 5
+    assert repository.metrics.consumed['topic'] == 5
+    assert repository.metrics.handler_latency['topic'].count == 5
+    assert sum(cluster.highwater(retry) for retry in cluster.partitions_for('topic-RETRY-1')) == 1
+
+
+@pytest.mark.asyncio
+async def test_broker_memory_producer_abort_transaction_then_skip_messages_when_read_committed(
+    cluster: BrokerMemoryCluster,
+) -> None:
+    """Test the messages of an aborted transaction are only skipped by read committed consumers."""
+    # arrange
+    cluster.partitions = 1
+    producer = BrokerMemoryProducer(transactional_id='pipeline')
+    await producer.begin_transaction()
+    await producer.send_and_wait('topic', b'aborted')
+    await producer.abort_transaction()
+    await producer.begin_transaction()
+    await producer.send_and_wait('topic', b'committed')
+    await producer.commit_transaction()
+    committed_reader = BrokerMemoryConsumer('topic', isolation_level='read_committed')
+    uncommitted_reader = BrokerMemoryConsumer('topic')
+    await committed_reader.start()
+    await uncommitted_reader.start()
+    # act
+    committed = await committed_reader.getmany(timeout_ms=0)
+    uncommitted = await uncommitted_reader.getmany(timeout_ms=0)
+    # assert
+    assert [message.value for message in committed[TopicPartition('topic', 0)]] == [b'committed']
+    assert [message.value for message in uncommitted[TopicPartition('topic', 0)]] == [b'aborted', b'committed']
+
+
+@pytest.mark.asyncio
+async def test_broker_memory_adapter_repository_transactional_then_commit_outputs_with_offsets(
+    cluster: BrokerMemoryCluster,
+) -> None:
+    """Test the produced and retried messages are committed in transactions with the consumed offsets."""
+    # arrange
+    cluster.partitions = 1
+    adapter = BrokerMemoryAdapter(
+        producer_settings=BrokerKafkaProducerSettings(
+            BROKER_BOOTSTRAP_SERVERS='memory', BROKER_TRANSACTIONAL_ID='pipeline'
+        ),
+        consumer_settings=BrokerKafkaConsumerSettings(
+            BROKER_BOOTSTRAP_SERVERS='memory',
+            BROKER_TOPICS='input',
+            BROKER_GROUP_ID='group',
+            BROKER_RETRY_MAX_TIMES=1,
+            BROKER_TRANSACTION_MAX_MESSAGES=10,
+        ),
+    )
+    await adapter.connect()
+    producer = BrokerMemoryProducer()
+    for index in range(4):
+        await producer.send_and_wait('input', bytes(f'{{"data": {{"index": {index}}}}}', 'utf-8'))
+    repository = BrokerRepository(adapter=adapter)
+
+    async def handler(message: BrokerRecord) -> None:
+        if message.topic != 'input':
+            return
+        if message.data['index'] == 3:
+            raise ValueError('failed')
+        await repository.produce(topic='output', key='key', value=message.data)
+
+    consumption = asyncio.create_task(repository.consume(handler, wait_time=0))
+    # act
+    while cluster.committed('group', TopicPartition('input', 0)) != 4:
+        await asyncio.sleep(0.01)
+    await repository.stop()
+    await consumption
+    # assert
+    assert cluster.highwater(TopicPartition('output', 0)) == 3
+    assert cluster.highwater(TopicPartition('input-RETRY-1', 0)) == 1
+    assert cluster.committed('group', TopicPartition('input-RETRY-1', 0)) == 1
+    with pytest.raises(IllegalOperation):
+        await repository.produce(topic='output', key='key', value={'outside': 'transaction'})
+
+
+@pytest.mark.asyncio
+async def test_broker_memory_adapter_repository_transactional_batch_then_raise_before_consuming(
+    cluster: BrokerMemoryCluster,
+) -> None:
+    """Test the batch consumption and the replay refuse a transactional producer before consuming a message."""
+    # arrange
+    cluster.partitions = 1
+    adapter = BrokerMemoryAdapter(
+        producer_settings=BrokerKafkaProducerSettings(
+            BROKER_BOOTSTRAP_SERVERS='memory', BROKER_TRANSACTIONAL_ID='pipeline'
+        ),
+        consumer_settings=BrokerKafkaConsumerSettings(
+            BROKER_BOOTSTRAP_SERVERS='memory', BROKER_TOPICS='input', BROKER_GROUP_ID='group'
+        ),
+    )
+    await adapter.connect()
+    await BrokerMemoryProducer().send_and_wait('input', b'{"data": {"index": 0}}')
+    repository = BrokerRepository(adapter=adapter)
+    handler = AsyncMock(side_effect=ValueError('failed'))
+    # act
+    # assert
+    with pytest.raises(ValueError, match='Batch consumption is not supported'):
+        await repository.consume_batch(handler, wait_time=0)
+    with pytest.raises(ValueError, match='Replay is not supported'):
+        await repository.replay(handler, ['input'], {TopicPartition('input', 0): 0})
+    handler.assert_not_called()
+    assert cluster.committed('group', TopicPartition('input', 0)) is None
+    await adapter.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_broker_memory_adapter_repository_table_then_bootstrap_follow_and_restart_from_snapshot(
+    cluster: BrokerMemoryCluster, tmp_path: Path
+) -> None:
+    """Test a table catches up with a compacted topic, follows its updates and tombstones, then restarts warm."""
+    # arrange
+    adapter = BrokerMemoryAdapter(
+        producer_settings=BrokerKafkaProducerSettings(BROKER_BOOTSTRAP_SERVERS='memory'),
+        consumer_settings=BrokerKafkaConsumerSettings(
+            BROKER_BOOTSTRAP_SERVERS='memory', BROKER_TOPICS='topic', BROKER_GROUP_ID='group'
+        ),
+    )
+    await adapter.connect()
+    repository = BrokerRepository(adapter=adapter)
+    path = tmp_path / 'table.snapshot'
+    await repository.produce_many('table', [(str(index), {'index': index}) for index in range(4)])
+    await repository.produce('table', key='0', value={'index': 10})
+    # act
+    async with repository.table('table', path=path) as table:
+        ready = await table.wait_ready(timeout=1)
+        bootstrapped = {key: table.get(key) for key in ('0', '1', '2', '3')}
+        await repository.produce('table', key='1', value={'index': 11})
+        await adapter.producer.send_and_wait('table', key=b'2', value=None)
+        while '2' in table:
+            await asyncio.sleep(0.01)
+        followed = (table.get('1'), len(table))
+    await repository.produce('table', key='4', value={'index': 4})
+    restarted = repository.table('table', path=path)
+    await restarted.start()
+    await restarted.wait_ready(timeout=1)
+    # assert
+    assert ready
+    assert bootstrapped == {'0': {'index': 10}, '1': {'index': 1}, '2': {'index': 2}, '3': {'index': 3}}
+    assert followed == ({'index': 11}, 3)
+    assert path.exists()
+    assert restarted.ready
+    assert {key: restarted.get(key) for key in ('0', '1', '2', '3', '4')} == {
+        '0': {'index': 10},
+        '1': {'index': 11},
+        '2': None,
+        '3': {'index': 3},
+        '4': {'index': 4},
+    }
+    await restarted.stop()
+    await adapter.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_broker_memory_adapter_repository_table_empty_topic_then_ready_on_start(
+    cluster: BrokerMemoryCluster,
+) -> None:
+    """Test a table of an empty topic is ready as soon as it starts."""
+    # arrange
+    adapter = BrokerMemoryAdapter(
+        producer_settings=BrokerKafkaProducerSettings(BROKER_BOOTSTRAP_SERVERS='memory'),
+        consumer_settings=BrokerKafkaConsumerSettings(
+            BROKER_BOOTSTRAP_SERVERS='memory', BROKER_TOPICS='topic', BROKER_GROUP_ID='group'
+        ),
+    )
+    await adapter.connect()
+    repository = BrokerRepository(adapter=adapter)
+    # act
+    async with repository.table('table') as table:
+        # assert
+        assert table.ready
+        assert table.get('missing') is None
+    await adapter.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_broker_memory_adapter_repository_table_poisoned_record_then_skip_and_keep_following(
+    cluster: BrokerMemoryCluster, tmp_path: Path
+) -> None:
+    """Test a record failing to load is skipped, the table keeps following the topic and stops with a snapshot."""
+    # arrange
+    adapter = BrokerMemoryAdapter(
+        producer_settings=BrokerKafkaProducerSettings(BROKER_BOOTSTRAP_SERVERS='memory'),
+        consumer_settings=BrokerKafkaConsumerSettings(
+            BROKER_BOOTSTRAP_SERVERS='memory', BROKER_TOPICS='topic', BROKER_GROUP_ID='group'
+        ),
+    )
+    await adapter.connect()
+    repository = BrokerRepository(adapter=adapter)
+    path = tmp_path / 'table.snapshot'
+    # act
+    async with repository.table('table', path=path) as table:
+        await adapter.producer.send_and_wait(
+            'table', key=b'0', value=b'<index>0</index>', headers=[('Content-Type', b'application/xml')]
+        )
+        await repository.produce('table', key='1', value={'index': 1})
+        while '1' not in table:
+            await asyncio.sleep(0.01)
+        following = not table._task.done()  # type: ignore
+    # assert
+    assert following
+    assert table.get('0') is None
+    assert table.get('1') == {'index': 1}
+    assert path.exists()
+    assert table._task is None
+    await adapter.disconnect()
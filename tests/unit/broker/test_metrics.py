@@ -0,0 +1,94 @@
+from unittest.mock import Mock
+
+from aiokafka import AIOKafkaConsumer
+from aiokafka.structs import TopicPartition
+from freezegun import freeze_time
+
+from solkit.broker.metrics import BrokerHistogram, BrokerMetrics
+
+PARTITION = TopicPartition('topic', 0)
+
+
+def test_broker_histogram_observe_then_count_cumulative_buckets() -> None:
+    """Test the histogram counts each value in the first bucket bounding it."""
+    # arrange
+    histogram = BrokerHistogram(buckets=(0.1, 1.0))
+    # act
+    for value in (0.05, 0.1, 0.5, 5.0):
+        histogram.observe(value)
+    # assert
+    assert histogram.cumulative_counts() == [2, 3, 4]
+    assert histogram.count == 4
+    assert histogram.sum == 5.65
+
+
+def test_broker_metrics_lag_then_subtract_committed_offset_from_highwater() -> None:
+    """Test the lag of the assigned partitions with a committed offset."""
+    # arrange
+    consumer = Mock(spec=AIOKafkaConsumer)
+    consumer.assignment.return_value = {PARTITION, TopicPartition('topic', 1)}
+    consumer.highwater.return_value = 120
+    metrics = BrokerMetrics()
+    metrics.bind(consumer)
+    # act
+    metrics.observe_commit({PARTITION: 100}, 0.002)
+    # assert
+    assert metrics.lag() == {PARTITION: 20}
+    assert metrics.commit_latency.count == 1
+
+
+def test_broker_metrics_lag_with_lane_consumers_then_cover_every_bound_consumer() -> None:
+    """Test the lag covers the partitions of every bound consumer until it is unbound."""
+    # arrange
+    retry_partition = TopicPartition('topic-RETRY-1', 0)
+    consumer, retry_consumer = Mock(spec=AIOKafkaConsumer), Mock(spec=AIOKafkaConsumer)
+    consumer.assignment.return_value = {PARTITION}
+    consumer.highwater.return_value = 10
+    retry_consumer.assignment.return_value = {retry_partition}
+    retry_consumer.highwater.return_value = 50
+    metrics = BrokerMetrics()
+    metrics.bind(consumer)
+    metrics.bind(retry_consumer)
+    metrics.observe_commit({PARTITION: 10, retry_partition: 20}, 0.002)
+    # act
+    lag = metrics.lag()
+    metrics.unbind(retry_consumer)
+    # assert
+    assert lag == {PARTITION: 0, retry_partition: 30}
+    assert metrics.lag() == {PARTITION: 0}
+
+
+def test_broker_metrics_rates_then_cover_time_since_previous_pull() -> None:
+    """Test the messages per second cover the messages consumed since the previous pull."""
+    # arrange
+    with freeze_time('2025-08-13T12:00:00Z') as frozen_time:
+        metrics = BrokerMetrics()
+        for _ in range(10):
+            metrics.observe_handler('topic', 0.01)
+        frozen_time.tick(2)
+        # act
+        first = metrics.rates()
+        metrics.observe_handler('topic', 0.01, messages=4)
+        frozen_time.tick(2)
+        second = metrics.rates()
+    # assert
+    assert first == {'topic': 5.0}
+    assert second == {'topic': 2.0}
+
+
+def test_broker_metrics_render_then_return_prometheus_text() -> None:
+    """Test the Prometheus text exposition of the metrics."""
+    # arrange
+    metrics = BrokerMetrics(buckets=(0.1,))
+    metrics.observe_handler('topic', 0.05)
+    metrics.observe_retry('topic')
+    metrics.observe_dead_letter('topic-RETRY-1')
+    # act
+    result = metrics.render()
+    # assert
+    assert 'broker_consumed_messages_total{topic="topic"} 1\n' in result
+    assert 'broker_retried_messages_total{topic="topic"} 1\n' in result
+    assert 'broker_dead_lettered_messages_total{topic="topic-RETRY-1"} 1\n' in result
+    assert 'broker_handler_duration_seconds_bucket{topic="topic",le="0.1"} 1\n' in result
+    assert 'broker_handler_duration_seconds_bucket{topic="topic",le="+Inf"} 1\n' in result
+    assert 'broker_commit_duration_seconds_count 0\n' in result
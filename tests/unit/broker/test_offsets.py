@@ -0,0 +1,155 @@
+import asyncio
+from unittest.mock import AsyncMock, call
+
+import pytest
+from aiokafka import AIOKafkaConsumer
+from aiokafka.structs import TopicPartition
+
+from solkit.broker.offsets import BrokerOffsetCommitter, BrokerOffsetTracker
+
+PARTITION = TopicPartition('topic', 0)
+
+
+def test_broker_offset_tracker_complete_in_order_then_return_next_offset() -> None:
+    """Test completing offsets in order advances the committable offset each time."""
+    # arrange
+    tracker = BrokerOffsetTracker()
+    tracker.track(PARTITION, 10)
+    tracker.track(PARTITION, 11)
+    # act
+    first = tracker.complete(PARTITION, 10)
+    second = tracker.complete(PARTITION, 11)
+    # assert
+    assert first == 11
+    assert second == 12
+
+
+def test_broker_offset_tracker_complete_out_of_order_then_return_highest_contiguous_offset() -> None:
+    """Test completing offsets out of order only advances once the gap is filled."""
+    # arrange
+    tracker = BrokerOffsetTracker()
+    for offset in (0, 1, 2):
+        tracker.track(PARTITION, offset)
+    # act
+    after_last = tracker.complete(PARTITION, 2)
+    after_middle = tracker.complete(PARTITION, 1)
+    after_first = tracker.complete(PARTITION, 0)
+    # assert
+    assert after_last is None
+    assert after_middle is None
+    assert after_first == 3
+
+
+def test_broker_offset_tracker_complete_then_partitions_are_independent() -> None:
+    """Test a gap in one partition does not hold back another partition."""
+    # arrange
+    other_partition = TopicPartition('topic', 1)
+    tracker = BrokerOffsetTracker()
+    tracker.track(PARTITION, 0)
+    tracker.track(other_partition, 5)
+    # act
+    result = tracker.complete(other_partition, 5)
+    # assert
+    assert result == 6
+
+
+@pytest.mark.asyncio
+async def test_broker_offset_tracker_wait_drained_when_completed_then_return_true() -> None:
+    """Test waiting for the partitions returns once their in-flight offsets complete."""
+    # arrange
+    tracker = BrokerOffsetTracker()
+    tracker.track(PARTITION, 0)
+    asyncio.get_running_loop().call_soon(tracker.complete, PARTITION, 0)
+    # act
+    result = await tracker.wait_drained({PARTITION}, timeout=1)
+    # assert
+    assert result is True
+
+
+@pytest.mark.asyncio
+async def test_broker_offset_tracker_wait_drained_when_timeout_then_return_false() -> None:
+    """Test waiting for the partitions gives up after the timeout."""
+    # arrange
+    tracker = BrokerOffsetTracker()
+    tracker.track(PARTITION, 0)
+    # act
+    result = await tracker.wait_drained({PARTITION}, timeout=0.01)
+    # assert
+    assert result is False
+    assert tracker.pending({PARTITION}) == 1
+
+
+def test_broker_offset_tracker_discard_then_forget_offsets_and_bump_generation() -> None:
+    """Test discarding a partition forgets its offsets and marks the dispatched messages as stale."""
+    # arrange
+    tracker = BrokerOffsetTracker()
+    tracker.track(PARTITION, 0)
+    # act
+    tracker.discard({PARTITION})
+    # assert
+    assert tracker.pending({PARTITION}) == 0
+    assert tracker.generation(PARTITION) == 1
+    assert tracker.complete(PARTITION, 0) is None
+
+
+@pytest.mark.asyncio
+async def test_broker_offset_committer_mark_below_max_messages_then_not_commit() -> None:
+    """Test marking fewer offsets than the policy does not commit."""
+    # arrange
+    consumer = AsyncMock(spec=AIOKafkaConsumer)
+    committer = BrokerOffsetCommitter(consumer, max_messages=3)
+    # act
+    await committer.mark(PARTITION, 1)
+    await committer.mark(PARTITION, 2)
+    # assert
+    consumer.commit.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_broker_offset_committer_flush_revoked_partitions_then_commit_only_those() -> None:
+    """Test flushing a set of partitions commits only their marked offsets."""
+    # arrange
+    other_partition = TopicPartition('topic', 1)
+    consumer = AsyncMock(spec=AIOKafkaConsumer)
+    committer = BrokerOffsetCommitter(consumer, max_messages=10)
+    await committer.mark(PARTITION, 3)
+    await committer.mark(other_partition, 7)
+    # act
+    await committer.flush({other_partition})
+    await committer.flush()
+    # assert
+    assert consumer.commit.await_args_list == [call({other_partition: 7}), call({PARTITION: 3})]
+
+
+@pytest.mark.asyncio
+async def test_broker_offset_committer_flush_with_commit_error_then_keep_offsets() -> None:
+    """Test a failed commit keeps the offsets for the next flush."""
+    # arrange
+    consumer = AsyncMock(spec=AIOKafkaConsumer)
+    consumer.commit.side_effect = [RuntimeError('commit failed'), None]
+    committer = BrokerOffsetCommitter(consumer, max_messages=10)
+    await committer.mark(PARTITION, 3)
+    # act
+    with pytest.raises(RuntimeError):
+        await committer.flush()
+    await committer.flush()
+    # assert
+    assert consumer.commit.await_args_list == [call({PARTITION: 3}), call({PARTITION: 3})]
+
+
+@pytest.mark.asyncio
+async def test_broker_offset_committer_flush_periodically_with_commit_error_then_keep_committing() -> None:
+    """Test a failed periodic commit is logged and the next interval commits the kept offsets."""
+    # arrange
+    consumer = AsyncMock(spec=AIOKafkaConsumer)
+    consumer.commit.side_effect = [RuntimeError('commit failed'), None]
+    committer = BrokerOffsetCommitter(consumer, max_messages=10, interval_ms=10)
+    await committer.mark(PARTITION, 3)
+    # act
+    periodic_flush = asyncio.create_task(committer.flush_periodically())
+    while consumer.commit.await_count < 2:
+        await asyncio.sleep(0.01)
+    # assert
+    assert not periodic_flush.done()
+    assert consumer.commit.await_args_list == [call({PARTITION: 3}), call({PARTITION: 3})]
+    periodic_flush.cancel()
@@ -0,0 +1,159 @@
+import asyncio
+from collections.abc import Callable
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from aiokafka.structs import TopicPartition
+from freezegun import freeze_time
+
+from solkit.broker.rate import BrokerCacheRateWindow, BrokerRateLimiter, BrokerTokenBucket
+
+ORDERS = TopicPartition('orders', 0)
+INVOICES = TopicPartition('invoices', 0)
+
+
+def test_broker_token_bucket_take_within_capacity_then_no_delay() -> None:
+    """Test taking tokens available in the bucket does not wait."""
+    # arrange
+    bucket = BrokerTokenBucket(rate=10)
+    # act
+    result = bucket.take(10)
+    # assert
+    assert result == 0.0
+
+
+def test_broker_token_bucket_take_over_capacity_then_wait_for_debt() -> None:
+    """Test taking more tokens than available waits for the debt to be refilled."""
+    # arrange
+    with freeze_time('2025-08-13T12:00:00Z'):
+        bucket = BrokerTokenBucket(rate=10)
+        # act
+        result = bucket.take(15)
+        # assert
+        assert result == pytest.approx(0.5)
+
+
+def test_broker_token_bucket_take_after_refill_then_no_delay() -> None:
+    """Test the bucket is refilled at its rate over time."""
+    # arrange
+    with freeze_time('2025-08-13T12:00:00Z') as frozen:
+        bucket = BrokerTokenBucket(rate=10)
+        bucket.take(15)
+        frozen.tick(1)
+        # act
+        result = bucket.take(5)
+        # assert
+        assert result == 0.0
+
+
+@pytest.mark.asyncio
+async def test_broker_cache_rate_window_take_over_rate_then_wait_for_next_window() -> None:
+    """Test exceeding the shared rate waits until the overdraft is absorbed by the next windows."""
+    # arrange
+    cache = AsyncMock()
+    cache.increment_key = AsyncMock(return_value=15)
+    window = BrokerCacheRateWindow(cache, 'broker:rate:group', rate=10)
+    # act
+    with freeze_time('2025-08-13T12:00:00.250000Z'):
+        result = await window.take(5)
+    # assert
+    cache.increment_key.assert_awaited_once_with('broker:rate:group:1755086400', 5, ttl=2)
+    assert result == pytest.approx(1.25)
+
+
+@pytest.mark.asyncio
+async def test_broker_cache_rate_window_take_with_unavailable_cache_then_no_delay() -> None:
+    """Test the shared rate is not enforced when the cache is unavailable."""
+    # arrange
+    cache = AsyncMock()
+    cache.increment_key = AsyncMock(side_effect=ConnectionError('unavailable'))
+    window = BrokerCacheRateWindow(cache, 'broker:rate:group', rate=10)
+    # act
+    result = await window.take(50)
+    # assert
+    assert result == 0.0
+
+
+@pytest.mark.asyncio
+async def test_broker_rate_limiter_throttle_within_rate_then_no_pause(
+    build_consumer_record_mock: Callable[..., Mock], build_consumer_mock: Callable[..., Mock]
+) -> None:
+    """Test messages within the rate limits do not pause any partition."""
+    # arrange
+    consumer = build_consumer_mock(ORDERS, INVOICES)
+    rate_limiter = BrokerRateLimiter(consumer, messages_per_second=10)
+    # act
+    await rate_limiter.throttle({ORDERS: [build_consumer_record_mock(ORDERS) for _ in range(10)]})
+    # assert
+    consumer.pause.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_broker_rate_limiter_throttle_over_rate_then_pause_and_resume_when_refilled(
+    build_consumer_record_mock: Callable[..., Mock], build_consumer_mock: Callable[..., Mock]
+) -> None:
+    """Test exceeding the consumer rate pauses every assigned partition until the bucket is refilled."""
+    # arrange
+    consumer = build_consumer_mock(ORDERS, INVOICES)
+    rate_limiter = BrokerRateLimiter(consumer, messages_per_second=100)
+    # act
+    await rate_limiter.throttle({ORDERS: [build_consumer_record_mock(ORDERS) for _ in range(105)]})
+    paused = {call.args[0] for call in consumer.pause.call_args_list}
+    await asyncio.sleep(0.1)
+    # assert
+    assert paused == {ORDERS, INVOICES}
+    assert {call.args[0] for call in consumer.resume.call_args_list} == {ORDERS, INVOICES}
+
+
+@pytest.mark.asyncio
+async def test_broker_rate_limiter_throttle_over_bytes_rate_per_topic_then_pause_topic(
+    build_consumer_record_mock: Callable[..., Mock], build_consumer_mock: Callable[..., Mock]
+) -> None:
+    """Test exceeding the bytes rate of a topic only pauses the partitions of this topic."""
+    # arrange
+    consumer = build_consumer_mock(ORDERS, INVOICES)
+    rate_limiter = BrokerRateLimiter(consumer, bytes_per_second=100, per_topic=True)
+    # act
+    await rate_limiter.throttle(
+        {
+            ORDERS: [build_consumer_record_mock(ORDERS, value=bytes(150))],
+            INVOICES: [build_consumer_record_mock(INVOICES, value=bytes(50))],
+        }
+    )
+    # assert
+    consumer.pause.assert_called_once_with(ORDERS)
+    await rate_limiter.release()
+
+
+@pytest.mark.asyncio
+async def test_broker_rate_limiter_throttle_with_cache_then_take_from_shared_window(
+    build_consumer_record_mock: Callable[..., Mock], build_consumer_mock: Callable[..., Mock]
+) -> None:
+    """Test the shared rate window of the group and lane pauses a replica within its own rate."""
+    # arrange
+    consumer = build_consumer_mock(ORDERS, INVOICES)
+    cache = AsyncMock()
+    cache.increment_key = AsyncMock(return_value=25)
+    rate_limiter = BrokerRateLimiter(consumer, messages_per_second=10, cache=cache, group_id='group', lane='retry')
+    # act
+    await rate_limiter.throttle({ORDERS: [build_consumer_record_mock(ORDERS) for _ in range(5)]})
+    # assert
+    assert cache.increment_key.await_args.args[0].startswith('broker:rate:group:retry:*:messages:')
+    assert consumer.pause.call_count == 2
+    await rate_limiter.release()
+
+
+@pytest.mark.asyncio
+async def test_broker_rate_limiter_release_then_cancel_resume(
+    build_consumer_record_mock: Callable[..., Mock], build_consumer_mock: Callable[..., Mock]
+) -> None:
+    """Test releasing the rate limiter cancels the pending resumes."""
+    # arrange
+    consumer = build_consumer_mock(ORDERS, INVOICES)
+    rate_limiter = BrokerRateLimiter(consumer, messages_per_second=100)
+    await rate_limiter.throttle({ORDERS: [build_consumer_record_mock(ORDERS) for _ in range(105)]})
+    # act
+    await rate_limiter.release()
+    await asyncio.sleep(0.1)
+    # assert
+    consumer.resume.assert_not_called()
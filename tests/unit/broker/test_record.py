@@ -0,0 +1,159 @@
+import pickle
+from collections.abc import Callable
+from unittest.mock import Mock
+
+import pytest
+from aiokafka.structs import ConsumerRecord
+from pydantic import BaseModel, TypeAdapter
+
+from solkit.broker.codecs import BrokerJsonCodec
+from solkit.broker.constants import (
+    BROKER_CLAIM_CHECK_HEADER,
+    BROKER_ENVELOPE_VERSION_HEADER,
+    BROKER_ERROR_HEADER,
+    BROKER_RETRY_COUNT_HEADER,
+    BrokerEnvelopeVersion,
+)
+from solkit.broker.record import BrokerRecord
+
+
+def test_broker_record_envelope_v1_then_return_data_and_metadata(
+    build_consumer_record_mock: Callable[..., Mock],
+) -> None:
+    """Test a version 1 envelope record decodes its data and metadata from the value."""
+    # arrange
+    message = build_consumer_record_mock(value=b'{"data": {"some": "data"}, "metadata": {"error": "boom"}}', headers=[])
+    # act
+    record = BrokerRecord(message, BrokerJsonCodec())
+    # assert
+    assert record.envelope_version == BrokerEnvelopeVersion.V1
+    assert record.data == {'some': 'data'}
+    assert record.metadata == {'error': 'boom'}
+    assert record.error == 'boom'
+    assert record.retry_count == 0
+    assert record.topic == 'topic'
+
+
+def test_broker_record_envelope_v2_then_return_data_and_headers_metadata(
+    build_consumer_record_mock: Callable[..., Mock],
+) -> None:
+    """Test a version 2 envelope record decodes its data from the value and its metadata from the headers."""
+    # arrange
+    headers = [
+        (BROKER_ENVELOPE_VERSION_HEADER, b'2'),
+        ('X-Metadata-service', b'unittest'),
+        (BROKER_ERROR_HEADER, b'boom'),
+        (BROKER_RETRY_COUNT_HEADER, b'2'),
+    ]
+    message = build_consumer_record_mock(value=b'{"some": "data"}', headers=headers)
+    # act
+    record = BrokerRecord(message, BrokerJsonCodec())
+    # assert
+    assert record.envelope_version == BrokerEnvelopeVersion.V2
+    assert record.data == {'some': 'data'}
+    assert record.metadata == {'service': 'unittest'}
+    assert record.error == 'boom'
+    assert record.retry_count == 2
+
+
+def test_broker_record_data_then_decode_once_on_first_access(build_consumer_record_mock: Callable[..., Mock]) -> None:
+    """Test the record decodes its value only when the data is accessed, and only once."""
+    # arrange
+    codec = Mock(spec=BrokerJsonCodec)
+    codec.decode.return_value = {'some': 'data'}
+    record = BrokerRecord(
+        build_consumer_record_mock(value=b'{}', headers=[(BROKER_ENVELOPE_VERSION_HEADER, b'2')]), codec
+    )
+    # act
+    codec.decode.assert_not_called()
+    first = record.data
+    second = record.data
+    # assert
+    assert first is second
+    codec.decode.assert_called_once_with(b'{}')
+
+
+class PayloadModel(BaseModel):
+    """Payload model for the schema tests."""
+
+    some: str
+
+
+def test_broker_record_envelope_v2_with_schema_then_validate_json_without_decoding(
+    build_consumer_record_mock: Callable[..., Mock],
+) -> None:
+    """Test a JSON version 2 envelope record with a schema validates the raw value in a single pass."""
+    # arrange
+    codec = Mock(spec=BrokerJsonCodec)
+    codec.content_type = BrokerJsonCodec.content_type
+    message = build_consumer_record_mock(value=b'{"some": "data"}', headers=[(BROKER_ENVELOPE_VERSION_HEADER, b'2')])
+    # act
+    record = BrokerRecord(message, codec, TypeAdapter(PayloadModel))
+    # assert
+    assert record.data == PayloadModel(some='data')
+    codec.decode.assert_not_called()
+
+
+def test_broker_record_envelope_v1_with_schema_then_validate_data(
+    build_consumer_record_mock: Callable[..., Mock],
+) -> None:
+    """Test a version 1 envelope record with a schema validates the data of the envelope."""
+    # arrange
+    message = build_consumer_record_mock(value=b'{"data": {"some": "data"}, "metadata": {}}', headers=[])
+    # act
+    record = BrokerRecord(message, BrokerJsonCodec(), TypeAdapter(PayloadModel))
+    # assert
+    assert record.data == PayloadModel(some='data')
+
+
+def test_broker_record_pickle_then_keep_decoded_data_without_codec() -> None:
+    """Test a pickled record carries its decoded data and metadata but not its codec."""
+    # arrange
+    message = ConsumerRecord(
+        topic='topic',
+        partition=0,
+        offset=0,
+        timestamp=0,
+        timestamp_type=0,
+        key=b'key',
+        value=b'{"data": {"some": "data"}, "metadata": {"origin": "test"}}',
+        checksum=None,
+        serialized_key_size=3,
+        serialized_value_size=0,
+        headers=[],
+    )
+    record = BrokerRecord(message, BrokerJsonCodec())
+    # act
+    result = pickle.loads(pickle.dumps(record))  # noqa: S301
+    # assert
+    assert result.data == {'some': 'data'}
+    assert result.metadata == {'origin': 'test'}
+    assert result.offset == 0
+    assert result._codec is None
+
+
+def test_broker_record_claim_checked_with_payload_then_decode_payload(
+    build_consumer_record_mock: Callable[..., Mock],
+) -> None:
+    """Test a claim-checked record decodes its rehydrated payload and keeps the reference on the consumer record."""
+    # arrange
+    message = build_consumer_record_mock(value=b'', headers=[(BROKER_CLAIM_CHECK_HEADER, b'reference')])
+    # act
+    record = BrokerRecord(message, BrokerJsonCodec(), payload=b'{"data": {"some": "data"}, "metadata": {}}')
+    # assert
+    assert record.claim_check == 'reference'
+    assert record.data == {'some': 'data'}
+    assert record.consumer_record.value == b''
+
+
+def test_broker_record_claim_checked_without_payload_then_raise(
+    build_consumer_record_mock: Callable[..., Mock],
+) -> None:
+    """Test a claim-checked record can not be decoded before it is rehydrated."""
+    # arrange
+    record = BrokerRecord(
+        build_consumer_record_mock(value=b'', headers=[(BROKER_CLAIM_CHECK_HEADER, b'reference')]), BrokerJsonCodec()
+    )
+    # act
+    with pytest.raises(ValueError, match='reference'):
+        _ = record.data
@@ -0,0 +1,33 @@
+from aiokafka.structs import TopicPartition
+
+from solkit.broker.replay import BrokerReplayProgress
+
+PARTITION = TopicPartition('topic', 0)
+OTHER_PARTITION = TopicPartition('topic', 1)
+
+
+def test_broker_replay_progress_advance_then_update_remaining_and_done() -> None:
+    """Test advancing the partitions updates the replayed messages, the remaining offsets and the done partitions."""
+    # arrange
+    progress = BrokerReplayProgress({PARTITION: 10, OTHER_PARTITION: 0}, {PARTITION: 20, OTHER_PARTITION: 5})
+    # act
+    progress.advance(PARTITION, 20, 10)
+    progress.advance(OTHER_PARTITION, 2, 2)
+    # assert
+    assert progress.total == 15
+    assert progress.remaining == 3
+    assert progress.messages == 12
+    assert progress.is_done(PARTITION)
+    assert not progress.is_done(OTHER_PARTITION)
+    assert progress.rate > 0
+
+
+def test_broker_replay_progress_start_after_end_then_nothing_to_replay() -> None:
+    """Test a partition starting at or after its end offset has nothing to replay."""
+    # arrange
+    # act
+    progress = BrokerReplayProgress({PARTITION: 8}, {PARTITION: 5})
+    # assert
+    assert progress.total == 0
+    assert progress.remaining == 0
+    assert progress.is_done(PARTITION)
@@ -1,14 +1,76 @@
-from unittest.mock import Mock
+import asyncio
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, Mock, call
 
 import pytest
-from aiokafka.structs import ConsumerRecord
+from aiokafka.errors import ConsumerStoppedError
+from aiokafka.structs import ConsumerRecord, TopicPartition
 from freezegun import freeze_time
+from pydantic import BaseModel, ValidationError
 
 from solkit.broker.abstracts import BrokerAdapterAbstract
+from solkit.broker.adapter import BrokerKafkaAdapter
+from solkit.broker.codecs import BrokerJsonCodec, BrokerMsgpackCodec
+from solkit.broker.constants import (
+    BROKER_CONTENT_TYPE_HEADER,
+    BROKER_ENVELOPE_VERSION_HEADER,
+    BROKER_ERROR_HEADER,
+    BROKER_RETRY_COUNT_HEADER,
+    BROKER_RETRY_NOT_BEFORE_HEADER,
+    BrokerConsumeMode,
+    BrokerEnvelopeVersion,
+)
+from solkit.broker.dedupe import BrokerDeduplicator
+from solkit.broker.exceptions import BrokerBatchException
+from solkit.broker.record import BrokerRecord
 from solkit.broker.repository import BrokerRepository
+from solkit.broker.settings import BrokerKafkaConsumerSettings
 from solkit.common.trace_correlation_id import CORRELATION_ID_HEADER
 
 
+class PayloadModel(BaseModel):
+    """Payload model for the schema tests."""
+
+    id: int
+    name: str
+
+
+class ConsumerStub:
+    """Consumer stub fetching a fixed list of records."""
+
+    def __init__(self, records: list[ConsumerRecord]) -> None:
+        """Initialize the consumer stub."""
+        self._records = records
+        self.commit = AsyncMock()
+        self.pause = Mock()
+        self.resume = Mock()
+        self.seek = Mock()
+        self.highwater = Mock(return_value=None)
+        self.assignment = Mock(return_value={TopicPartition(record.topic, record.partition) for record in records})
+
+    async def getmany(self, timeout_ms: int = 0, max_records: int | None = None) -> dict[TopicPartition, list]:
+        """Return the records grouped by partition once, then behave as a stopped consumer."""
+        if not self._records:
+            raise ConsumerStoppedError()
+        count = max_records or len(self._records)
+        records, self._records = self._records[:count], self._records[count:]
+        batches: dict[TopicPartition, list] = {}
+        for record in records:
+            batches.setdefault(TopicPartition(record.topic, record.partition), []).append(record)
+        return batches
+
+
+def build_broker_adapter(records: list[ConsumerRecord], **settings: object) -> Mock:
+    """Build a broker adapter mock with a consumer stub and consumer settings overridden by keyword."""
+    adapter = Mock(spec=BrokerKafkaAdapter)
+    adapter.consumer = ConsumerStub(records)
+    adapter.producer = AsyncMock()
+    adapter.consumer_settings = BrokerKafkaConsumerSettings.model_construct(**settings)
+    adapter.transactional = False
+    return adapter
+
+
 @pytest.mark.parametrize(
     'key, expected',
     [
@@ -47,6 +109,50 @@ def test_broker_repository_unparse_message_value_then_return_tuple() -> None:
     assert result[1] == {'some': 'metadata'}
 
 
+def test_broker_repository_parse_message_value_with_codec_then_return_codec_bytes() -> None:
+    """Test the parse message value method with a codec."""
+    # arrange
+    codec = BrokerMsgpackCodec()
+    # act
+    result = BrokerRepository._parse_message_value({'some': 'data'}, {}, codec)
+    # assert
+    assert codec.decode(result) == {'data': {'some': 'data'}, 'metadata': {}}
+
+
+@pytest.mark.parametrize(
+    'headers, expected',
+    [
+        pytest.param([], BrokerJsonCodec, id='without-content-type'),
+        pytest.param([(BROKER_CONTENT_TYPE_HEADER, b'application/json')], BrokerJsonCodec, id='json'),
+        pytest.param([(BROKER_CONTENT_TYPE_HEADER, b'application/msgpack')], BrokerMsgpackCodec, id='msgpack'),
+        pytest.param(
+            [(BROKER_CONTENT_TYPE_HEADER, b'Application/JSON; charset=utf-8')], BrokerJsonCodec, id='json-parameters'
+        ),
+    ],
+)
+def test_broker_repository_get_codec_then_return_codec_of_content_type(headers: list, expected: type) -> None:
+    """Test the get codec method picks the codec announced by the content type header."""
+    # arrange
+    message = Mock(spec=ConsumerRecord)
+    message.headers = headers
+    repository = BrokerRepository(adapter=Mock(spec=BrokerAdapterAbstract))
+    # act
+    result = repository._get_codec(message)
+    # assert
+    assert isinstance(result, expected)
+
+
+def test_broker_repository_get_codec_with_unknown_content_type_then_raise_error() -> None:
+    """Test the get codec method with an unsupported content type."""
+    # arrange
+    message = Mock(spec=ConsumerRecord)
+    message.headers = [(BROKER_CONTENT_TYPE_HEADER, b'application/xml')]
+    repository = BrokerRepository(adapter=Mock(spec=BrokerAdapterAbstract))
+    # act & assert
+    with pytest.raises(ValueError):
+        repository._get_codec(message)
+
+
 def test_broker_repository_set_correlation_id_then_return_list() -> None:
     """Test the set correlation id method."""
     # arrange
@@ -115,3 +221,485 @@ def test_broker_repository_concat_metadata_then_return_dict() -> None:
     assert result[topic.lower()] == '2025-08-13T12:00:00+00:00'
     assert result['common'] == 'metadata'
     assert result['extra'] == 'metadata'
+
+
+@pytest.mark.asyncio
+async def test_broker_repository_consume_sequential_then_commit_each_message(
+    build_consumer_record: Callable[..., ConsumerRecord],
+) -> None:
+    """Test the sequential consume commits the offset following each message."""
+    # arrange
+    records = [build_consumer_record('topic', 0, 0), build_consumer_record('topic', 0, 1)]
+    adapter = build_broker_adapter(records)
+    handler = AsyncMock()
+    repository = BrokerRepository(adapter=adapter)
+    # act
+    await repository.consume(handler)
+    # assert
+    assert handler.await_count == 2
+    assert adapter.consumer.commit.await_args_list == [
+        call({TopicPartition('topic', 0): 1}),
+        call({TopicPartition('topic', 0): 2}),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_broker_repository_consume_with_deduplicator_then_skip_and_commit_duplicates(
+    build_consumer_record: Callable[..., ConsumerRecord],
+) -> None:
+    """Test the consume skips the messages already seen, commits their offsets and marks the processed ones."""
+    # arrange
+    records = [build_consumer_record('topic', 0, 0), build_consumer_record('topic', 0, 1)]
+    adapter = build_broker_adapter(records)
+    cache = AsyncMock()
+    cache.exists_keys = AsyncMock(return_value=[True, False])
+    deduplicator = BrokerDeduplicator(cache, group_id='group')
+    handler = AsyncMock()
+    repository = BrokerRepository(adapter=adapter, deduplicator=deduplicator)
+    # act
+    await repository.consume(handler)
+    # assert
+    cache.exists_keys.assert_awaited_once_with('broker:dedupe:group:topic:0:0', 'broker:dedupe:group:topic:0:1')
+    assert [call.args[0].offset for call in handler.await_args_list] == [1]
+    assert deduplicator.duplicates == 1
+    assert adapter.consumer.commit.await_args_list == [
+        call({TopicPartition('topic', 0): 1}),
+        call({TopicPartition('topic', 0): 2}),
+    ]
+    cache.set_keys.assert_awaited_once_with({'broker:dedupe:group:topic:0:1': '1'}, ttl=86400)
+
+
+@pytest.mark.asyncio
+async def test_broker_repository_consume_by_key_with_deduplicator_then_commit_past_duplicates(
+    build_consumer_record: Callable[..., ConsumerRecord],
+) -> None:
+    """Test the key consume completes the duplicated offsets without dispatching them."""
+    # arrange
+    records = [build_consumer_record('topic', 0, offset) for offset in range(3)]
+    adapter = build_broker_adapter(records, consume_mode=BrokerConsumeMode.KEY, key_concurrency=2)
+    cache = AsyncMock()
+    cache.exists_keys = AsyncMock(return_value=[False, True, True])
+    handler = AsyncMock()
+    repository = BrokerRepository(adapter=adapter, deduplicator=BrokerDeduplicator(cache, group_id='group'))
+    # act
+    await repository.consume(handler)
+    # assert
+    assert handler.await_count == 1
+    assert adapter.consumer.commit.await_args_list[-1] == call({TopicPartition('topic', 0): 3})
+
+
+@pytest.mark.asyncio
+async def test_broker_repository_consume_sync_handler_failure_then_retry_message(
+    build_consumer_record: Callable[..., ConsumerRecord],
+) -> None:
+    """Test a failing sync handler run on the executor routes the message to the retry topic."""
+    # arrange
+    records = [build_consumer_record('topic', 0, 0)]
+    adapter = build_broker_adapter(records, retry_max_times=1)
+
+    def handler(message: BrokerRecord) -> None:
+        raise ValueError('invalid')
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        repository = BrokerRepository(adapter=adapter, executor=executor)
+        # act
+        await repository.consume(handler)
+    # assert
+    assert adapter.producer.send_and_wait.await_args.kwargs['topic'] == 'topic-RETRY-1'
+    adapter.consumer.commit.assert_awaited_once_with({TopicPartition('topic', 0): 1})
+
+
+@pytest.mark.asyncio
+async def test_broker_repository_consume_handler_past_timeout_then_retry_message_with_timeout_error(
+    build_consumer_record: Callable[..., ConsumerRecord],
+) -> None:
+    """Test a hung handler is cancelled at the handler timeout and its message routed to the retry topic."""
+    # arrange
+    records = [build_consumer_record('topic', 0, 0)]
+    adapter = build_broker_adapter(records, retry_max_times=1, handler_timeout_ms=10)
+
+    async def handler(message: BrokerRecord) -> None:
+        await asyncio.Event().wait()
+
+    repository = BrokerRepository(adapter=adapter)
+    # act
+    await repository.consume(handler)
+    # assert
+    retried = adapter.producer.send_and_wait.await_args.kwargs
+    assert retried['topic'] == 'topic-RETRY-1'
+    assert b'BrokerHandlerTimeoutException' in retried['value']
+    adapter.consumer.commit.assert_awaited_once_with({TopicPartition('topic', 0): 1})
+
+
+@pytest.mark.asyncio
+async def test_broker_repository_consume_then_record_metrics(
+    build_consumer_record: Callable[..., ConsumerRecord],
+) -> None:
+    """Test the consume records the handler runs, retries, dead letters and commits."""
+    # arrange
+    records = [
+        build_consumer_record('topic', 0, 0),
+        build_consumer_record('topic', 0, 1),
+        build_consumer_record('topic-RETRY-1', 0, 0),
+    ]
+    adapter = build_broker_adapter(records, retry_max_times=1)
+    handler = AsyncMock(side_effect=[None, ValueError('invalid'), ValueError('invalid')])
+    repository = BrokerRepository(adapter=adapter)
+    # act
+    await repository.consume(handler)
+    # assert
+    snapshot = repository.metrics.snapshot()
+    assert snapshot['consumed'] == {'topic': 2, 'topic-RETRY-1': 1}
+    assert snapshot['retried'] == {'topic': 1}
+    assert snapshot['dead_lettered'] == {'topic-RETRY-1': 1}
+    assert snapshot['commit_latency']['count'] == 3
+
+
+@pytest.mark.asyncio
+async def test_broker_repository_consume_by_partition_then_slow_partition_does_not_block_others(
+    build_consumer_record: Callable[..., ConsumerRecord],
+) -> None:
+    """Test the partition consume processes partitions concurrently and keeps the order inside a partition."""
+    # arrange
+    records = [
+        build_consumer_record('topic', 0, 0),
+        build_consumer_record('topic', 0, 1),
+        build_consumer_record('topic', 1, 0),
+    ]
+    adapter = build_broker_adapter(records, consume_mode=BrokerConsumeMode.PARTITION)
+    release = asyncio.Event()
+    processed: list[tuple[int, int]] = []
+
+    async def handler(message: BrokerRecord) -> None:
+        if message.partition == 0:
+            await release.wait()
+        else:
+            release.set()
+        processed.append((message.partition, message.offset))
+
+    repository = BrokerRepository(adapter=adapter)
+    # act
+    await asyncio.wait_for(repository.consume(handler), timeout=1)
+    # assert
+    assert processed == [(1, 0), (0, 0), (0, 1)]
+    assert adapter.consumer.commit.await_args_list == [
+        call({TopicPartition('topic', 1): 1}),
+        call({TopicPartition('topic', 0): 1}),
+        call({TopicPartition('topic', 0): 2}),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_broker_repository_consume_by_key_then_commit_highest_contiguous_offset(
+    build_consumer_record: Callable[..., ConsumerRecord],
+) -> None:
+    """Test the key consume processes keys concurrently and commits only contiguous processed offsets."""
+    # arrange
+    records = [
+        build_consumer_record('topic', 0, 0, key=b'slow'),
+        build_consumer_record('topic', 0, 1, key=b'fast'),
+        build_consumer_record('topic', 0, 2, key=b'slow'),
+    ]
+    adapter = build_broker_adapter(records, consume_mode=BrokerConsumeMode.KEY, key_concurrency=2)
+    repository = BrokerRepository(adapter=adapter)
+    repository._route_by_key = lambda message: message.key  # type: ignore
+    release = asyncio.Event()
+    processed: list[int] = []
+
+    async def handler(message: BrokerRecord) -> None:
+        if message.key == b'slow' and message.offset == 0:
+            await release.wait()
+        else:
+            release.set()
+        processed.append(message.offset)
+
+    # act
+    await asyncio.wait_for(repository.consume(handler), timeout=1)
+    # assert
+    assert processed == [1, 0, 2]
+    assert adapter.consumer.commit.await_args_list == [
+        call({TopicPartition('topic', 0): 2}),
+        call({TopicPartition('topic', 0): 3}),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_broker_repository_consume_above_high_watermark_then_pause_until_low_watermark(
+    build_consumer_record: Callable[..., ConsumerRecord],
+) -> None:
+    """Test the consume pauses a partition with too many in-flight messages and resumes it once drained."""
+    # arrange
+    records = [build_consumer_record('topic', 0, offset) for offset in range(3)]
+    adapter = build_broker_adapter(records, in_flight_high_watermark=2, in_flight_low_watermark=0)
+    partition = TopicPartition('topic', 0)
+    handler = AsyncMock()
+    repository = BrokerRepository(adapter=adapter)
+    # act
+    await repository.consume(handler)
+    # assert
+    assert handler.await_count == 3
+    adapter.consumer.pause.assert_called_once_with(partition)
+    adapter.consumer.resume.assert_called_once_with(partition)
+
+
+@pytest.mark.asyncio
+async def test_broker_repository_consume_with_commit_max_messages_then_commit_in_batches(
+    build_consumer_record: Callable[..., ConsumerRecord],
+) -> None:
+    """Test the consume commits explicit offsets once per batch and flushes the remainder on shutdown."""
+    # arrange
+    records = [build_consumer_record('topic', 0, offset) for offset in range(5)]
+    adapter = build_broker_adapter(records, commit_max_messages=2)
+    repository = BrokerRepository(adapter=adapter)
+    # act
+    await repository.consume(AsyncMock())
+    # assert
+    assert adapter.consumer.commit.await_args_list == [
+        call({TopicPartition('topic', 0): 2}),
+        call({TopicPartition('topic', 0): 4}),
+        call({TopicPartition('topic', 0): 5}),
+    ]
+    listener = adapter.rebalance_listener
+    assert listener.add_revoked_callback.call_args_list == listener.remove_revoked_callback.call_args_list[::-1]
+
+
+@pytest.mark.asyncio
+async def test_broker_repository_consume_batch_then_handle_batches_per_partition(
+    build_consumer_record: Callable[..., ConsumerRecord],
+) -> None:
+    """Test the batch consume hands one batch per partition and commits the offset following each batch."""
+    # arrange
+    records = [
+        build_consumer_record('topic', 0, 0),
+        build_consumer_record('topic', 1, 0),
+        build_consumer_record('topic', 0, 1),
+    ]
+    adapter = build_broker_adapter(records, commit_max_messages=10)
+    handler = AsyncMock()
+    repository = BrokerRepository(adapter=adapter)
+    # act
+    await repository.consume_batch(handler, max_records=10)
+    # assert
+    assert [[message.offset for message in call.args[0]] for call in handler.await_args_list] == [[0, 1], [0]]
+    adapter.consumer.commit.assert_awaited_once_with({TopicPartition('topic', 0): 2, TopicPartition('topic', 1): 1})
+    adapter.producer.send_and_wait.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_broker_repository_consume_batch_with_deduplicator_then_exclude_duplicates(
+    build_consumer_record: Callable[..., ConsumerRecord],
+) -> None:
+    """Test the batch consume hands only the unseen messages and commits the whole fetched batch."""
+    # arrange
+    records = [build_consumer_record('topic', 0, offset) for offset in range(3)]
+    adapter = build_broker_adapter(records, commit_max_messages=10)
+    cache = AsyncMock()
+    cache.exists_keys = AsyncMock(return_value=[True, False, True])
+    handler = AsyncMock()
+    repository = BrokerRepository(adapter=adapter, deduplicator=BrokerDeduplicator(cache, group_id='group'))
+    # act
+    await repository.consume_batch(handler)
+    # assert
+    assert [[message.offset for message in call.args[0]] for call in handler.await_args_list] == [[1]]
+    adapter.consumer.commit.assert_awaited_once_with({TopicPartition('topic', 0): 3})
+
+
+@pytest.mark.asyncio
+async def test_broker_repository_consume_batch_with_partial_failure_then_retry_only_failed_messages(
+    build_consumer_record: Callable[..., ConsumerRecord],
+) -> None:
+    """Test the batch consume routes only the messages reported as failed to the retry topic."""
+    # arrange
+    records = [build_consumer_record('topic', 0, offset) for offset in range(3)]
+    adapter = build_broker_adapter(records, retry_max_times=1)
+    repository = BrokerRepository(adapter=adapter)
+
+    async def handler(messages: list[BrokerRecord]) -> None:
+        raise BrokerBatchException([(messages[1], ValueError('invalid'))])
+
+    # act
+    await repository.consume_batch(handler, wait_time=0)
+    # assert
+    adapter.producer.send_and_wait.assert_awaited_once()
+    retry_kwargs = adapter.producer.send_and_wait.await_args.kwargs
+    assert retry_kwargs['topic'] == 'topic-RETRY-1'
+    assert BROKER_RETRY_NOT_BEFORE_HEADER in dict(retry_kwargs['headers'])
+    adapter.consumer.commit.assert_awaited_once_with({TopicPartition('topic', 0): 3})
+
+
+@pytest.mark.asyncio
+async def test_broker_repository_consume_batch_with_unexpected_error_then_retry_whole_batch(
+    build_consumer_record: Callable[..., ConsumerRecord],
+) -> None:
+    """Test the batch consume routes every message of the batch when the handler raises another exception."""
+    # arrange
+    records = [build_consumer_record('topic', 0, offset) for offset in range(2)]
+    adapter = build_broker_adapter(records, retry_max_times=1)
+    repository = BrokerRepository(adapter=adapter)
+    # act
+    await repository.consume_batch(AsyncMock(side_effect=RuntimeError('down')), wait_time=0)
+    # assert
+    assert adapter.producer.send_and_wait.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_broker_repository_consume_retry_message_not_due_then_hold_partition(
+    build_consumer_record: Callable[..., ConsumerRecord],
+) -> None:
+    """Test the consume holds back a retry message that is not due without blocking the other partitions."""
+    # arrange
+    not_before = [(BROKER_RETRY_NOT_BEFORE_HEADER, b'32503680000000')]
+    records = [
+        build_consumer_record('topic-RETRY-1', 0, 4, headers=not_before),
+        build_consumer_record('topic-RETRY-1', 0, 5),
+        build_consumer_record('topic', 0, 0),
+    ]
+    adapter = build_broker_adapter(records, retry_max_times=1)
+    handler = AsyncMock()
+    repository = BrokerRepository(adapter=adapter)
+    # act
+    await repository.consume(handler)
+    # assert
+    handler.assert_awaited_once()
+    assert handler.await_args.args[0].consumer_record == records[2]
+    adapter.consumer.pause.assert_called_once_with(TopicPartition('topic-RETRY-1', 0))
+    adapter.consumer.seek.assert_called_once_with(TopicPartition('topic-RETRY-1', 0), 4)
+    adapter.consumer.commit.assert_awaited_once_with({TopicPartition('topic', 0): 1})
+
+
+@pytest.mark.asyncio
+async def test_broker_repository_produce_many_then_return_result_per_item() -> None:
+    """Test producing many messages queues every send and returns each delivery result in order."""
+    # arrange
+    loop = asyncio.get_running_loop()
+    delivered, failed = loop.create_future(), loop.create_future()
+    record_metadata = Mock()
+    delivered.set_result(record_metadata)
+    delivery_error = RuntimeError('delivery failed')
+    failed.set_exception(delivery_error)
+    send_error = ValueError('message too large')
+    adapter = Mock(spec=BrokerKafkaAdapter)
+    adapter.producer = AsyncMock()
+    adapter.producer.send.side_effect = [delivered, send_error, failed]
+    repository = BrokerRepository(adapter=adapter, metadata={'common': 'metadata'})
+    items = [('first', {'id': 1}), ('second', {'id': 2}), (b'third', {'id': 3})]
+    # act
+    results = await repository.produce_many('topic', items)
+    # assert
+    assert results == [record_metadata, send_error, delivery_error]
+    assert adapter.producer.send.await_count == 3
+    adapter.producer.send_and_wait.assert_not_awaited()
+    first_send = adapter.producer.send.await_args_list[0].kwargs
+    assert first_send['key'] == b'first'
+    assert b'"common": "metadata"' in first_send['value']
+
+
+@pytest.mark.asyncio
+async def test_broker_repository_produce_with_codec_then_announce_content_type() -> None:
+    """Test producing with a codec encodes the value with it and sets the content type header."""
+    # arrange
+    codec = BrokerMsgpackCodec()
+    adapter = Mock(spec=BrokerKafkaAdapter)
+    adapter.producer = AsyncMock()
+    repository = BrokerRepository(adapter=adapter, codec=codec)
+    # act
+    await repository.produce('topic', 'key', {'some': 'data'})
+    # assert
+    sent = adapter.producer.send_and_wait.await_args.kwargs
+    assert (BROKER_CONTENT_TYPE_HEADER, b'application/msgpack') in sent['headers']
+    assert codec.decode(sent['value'])['data'] == {'some': 'data'}
+
+
+@pytest.mark.asyncio
+async def test_broker_repository_produce_envelope_v2_then_send_raw_value_and_metadata_headers() -> None:
+    """Test producing with the version 2 envelope sends the raw data and the metadata as headers."""
+    # arrange
+    adapter = Mock(spec=BrokerKafkaAdapter)
+    adapter.producer = AsyncMock()
+    repository = BrokerRepository(
+        adapter=adapter, metadata={'service': 'unittest'}, envelope_version=BrokerEnvelopeVersion.V2
+    )
+    # act
+    await repository.produce('topic', 'key', {'some': 'data'})
+    # assert
+    sent = adapter.producer.send_and_wait.await_args.kwargs
+    assert sent['value'] == b'{"some": "data"}'
+    assert (BROKER_ENVELOPE_VERSION_HEADER, b'2') in sent['headers']
+    assert ('X-Metadata-service', b'unittest') in sent['headers']
+
+
+@pytest.mark.asyncio
+async def test_broker_repository_consume_envelope_v2_failure_then_forward_original_value(
+    build_consumer_record: Callable[..., ConsumerRecord],
+) -> None:
+    """Test a failed version 2 envelope message is forwarded with its original value and retry headers."""
+    # arrange
+    headers = [(BROKER_ENVELOPE_VERSION_HEADER, b'2'), (BROKER_ERROR_HEADER, b'previous')]
+    records = [build_consumer_record('topic', 0, 0, headers=headers, value=b'{"raw": true}')]
+    adapter = build_broker_adapter(records, retry_max_times=2)
+    repository = BrokerRepository(adapter=adapter)
+    # act
+    await repository.consume(AsyncMock(side_effect=RuntimeError('down')), wait_time=0)
+    # assert
+    sent = adapter.producer.send_and_wait.await_args.kwargs
+    sent_headers = dict(sent['headers'])
+    assert sent['topic'] == 'topic-RETRY-1'
+    assert sent['value'] == b'{"raw": true}'
+    assert sent_headers[BROKER_ERROR_HEADER] == b"RuntimeError('down')"
+    assert sent_headers[BROKER_RETRY_COUNT_HEADER] == b'1'
+    assert sent_headers[BROKER_ENVELOPE_VERSION_HEADER] == b'2'
+
+
+@pytest.mark.parametrize(
+    'topic, expected',
+    [
+        pytest.param('some-topic', 'some-topic', id='main-topic'),
+        pytest.param('some-topic-RETRY-2', 'some-topic', id='retry-topic'),
+        pytest.param('some-topic-DLQ', 'some-topic', id='dlq-topic'),
+    ],
+)
+def test_broker_repository_base_topic_then_return_main_topic(topic: str, expected: str) -> None:
+    """Test the base topic method."""
+    # arrange
+    # act
+    result = BrokerRepository._base_topic(topic)
+    # assert
+    assert result == expected
+
+
+@pytest.mark.asyncio
+async def test_broker_repository_produce_with_schema_then_validate_value() -> None:
+    """Test producing to a topic with a registered schema validates and serializes the value."""
+    # arrange
+    adapter = Mock(spec=BrokerKafkaAdapter)
+    adapter.producer = AsyncMock()
+    repository = BrokerRepository(adapter=adapter, envelope_version=BrokerEnvelopeVersion.V2)
+    repository.register_schema('topic', PayloadModel)
+    # act
+    await repository.produce('topic', 'key', PayloadModel(id=1, name='first'))
+    with pytest.raises(ValidationError):
+        await repository.produce('topic', 'key', {'id': 'not-an-int'})
+    # assert
+    adapter.producer.send_and_wait.assert_awaited_once()
+    assert adapter.producer.send_and_wait.await_args.kwargs['value'] == b'{"id": 1, "name": "first"}'
+
+
+@pytest.mark.asyncio
+async def test_broker_repository_consume_with_schema_then_hand_typed_data(
+    build_consumer_record: Callable[..., ConsumerRecord],
+) -> None:
+    """Test consuming a retry topic of a topic with a registered schema hands the validated model."""
+    # arrange
+    records = [build_consumer_record('topic-RETRY-1', 0, 0, value=b'{"data": {"id": 1, "name": "first"}}')]
+    adapter = build_broker_adapter(records, retry_max_times=1)
+    repository = BrokerRepository(adapter=adapter)
+    repository.register_schema('topic', PayloadModel)
+    received: list[PayloadModel] = []
+
+    async def handler(message: BrokerRecord) -> None:
+        received.append(message.data)  # type: ignore
+
+    # act
+    await repository.consume(handler)
+    # assert
+    assert received == [PayloadModel(id=1, name='first')]
@@ -0,0 +1,118 @@
+import asyncio
+from collections.abc import Callable
+from unittest.mock import Mock
+
+import pytest
+from aiokafka.structs import TopicPartition
+from freezegun import freeze_time
+
+from solkit.broker.constants import BROKER_RETRY_NOT_BEFORE_HEADER
+from solkit.broker.retry import BrokerRetryScheduler
+
+PARTITION = TopicPartition('topic-RETRY-1', 0)
+
+
+@freeze_time('2025-08-13T12:00:00.000000Z')
+def test_broker_retry_scheduler_not_before_header_then_return_timestamp_ms() -> None:
+    """Test the not before header holds the due timestamp in milliseconds."""
+    # arrange
+    # act
+    result = BrokerRetryScheduler.not_before_header(3)
+    # assert
+    assert result == (BROKER_RETRY_NOT_BEFORE_HEADER, b'1755086403000')
+
+
+@pytest.mark.asyncio
+async def test_broker_retry_scheduler_hold_without_header_then_return_false(
+    build_consumer_record_mock: Callable[..., Mock], build_consumer_mock: Callable[..., Mock]
+) -> None:
+    """Test a message without not before header is not held."""
+    # arrange
+    consumer = build_consumer_mock(PARTITION)
+    retries = BrokerRetryScheduler(consumer)
+    # act
+    result = retries.hold(build_consumer_record_mock(PARTITION, 0, []))
+    # assert
+    assert result is False
+    consumer.pause.assert_not_called()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    'not_before',
+    [
+        pytest.param(b'soon', id='not-numeric'),
+        pytest.param(b'1.5', id='not-integer'),
+        pytest.param(b'\xff', id='not-utf8'),
+        pytest.param(b'9' * 400, id='overflow'),
+    ],
+)
+async def test_broker_retry_scheduler_hold_invalid_header_then_return_false_and_warn(
+    not_before: bytes,
+    build_consumer_record_mock: Callable[..., Mock],
+    build_consumer_mock: Callable[..., Mock],
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    """Test a message with an invalid not before header is not held and logs a warning."""
+    # arrange
+    consumer = build_consumer_mock(PARTITION)
+    retries = BrokerRetryScheduler(consumer)
+    # act
+    result = retries.hold(build_consumer_record_mock(PARTITION, 0, [(BROKER_RETRY_NOT_BEFORE_HEADER, not_before)]))
+    # assert
+    assert result is False
+    consumer.pause.assert_not_called()
+    assert 'INVALID NOT BEFORE' in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_broker_retry_scheduler_hold_past_due_then_return_false(
+    build_consumer_record_mock: Callable[..., Mock], build_consumer_mock: Callable[..., Mock]
+) -> None:
+    """Test a message already due is not held."""
+    # arrange
+    consumer = build_consumer_mock(PARTITION)
+    retries = BrokerRetryScheduler(consumer)
+    # act
+    result = retries.hold(build_consumer_record_mock(PARTITION, 0, [(BROKER_RETRY_NOT_BEFORE_HEADER, b'0')]))
+    # assert
+    assert result is False
+
+
+@pytest.mark.asyncio
+async def test_broker_retry_scheduler_hold_not_due_then_pause_and_resume_when_due(
+    build_consumer_record_mock: Callable[..., Mock], build_consumer_mock: Callable[..., Mock]
+) -> None:
+    """Test a message not due pauses and rewinds its partition, then resumes it once due."""
+    # arrange
+    consumer = build_consumer_mock(PARTITION)
+    retries = BrokerRetryScheduler(consumer)
+    _, not_before = BrokerRetryScheduler.not_before_header(0.05)
+    # act
+    held = retries.hold(build_consumer_record_mock(PARTITION, 7, [(BROKER_RETRY_NOT_BEFORE_HEADER, not_before)]))
+    next_held = retries.hold(build_consumer_record_mock(PARTITION, 8, []))
+    await asyncio.sleep(0.1)
+    # assert
+    assert held is True
+    assert next_held is True
+    consumer.pause.assert_called_once_with(PARTITION)
+    consumer.seek.assert_called_once_with(PARTITION, 7)
+    consumer.resume.assert_called_once_with(PARTITION)
+
+
+@pytest.mark.asyncio
+async def test_broker_retry_scheduler_release_then_cancel_resume(
+    build_consumer_record_mock: Callable[..., Mock], build_consumer_mock: Callable[..., Mock]
+) -> None:
+    """Test releasing a held partition cancels its resume."""
+    # arrange
+    consumer = build_consumer_mock(PARTITION)
+    retries = BrokerRetryScheduler(consumer)
+    _, not_before = BrokerRetryScheduler.not_before_header(0.05)
+    retries.hold(build_consumer_record_mock(PARTITION, 7, [(BROKER_RETRY_NOT_BEFORE_HEADER, not_before)]))
+    # act
+    await retries.release({PARTITION})
+    await asyncio.sleep(0.1)
+    # assert
+    consumer.resume.assert_not_called()
+    assert retries.hold(build_consumer_record_mock(PARTITION, 8, [])) is False
@@ -3,7 +3,7 @@ from unittest.mock import patch
 import pytest
 from pydantic import ValidationError
 
-from solkit.broker.constants import BrokerKafkaAcks
+from solkit.broker.constants import BrokerConsumeLane, BrokerConsumeMode, BrokerKafkaAcks, BrokerKafkaProducerProfile
 from solkit.broker.settings import (
     BrokerKafkaConsumerSettings,
     BrokerKafkaProducerSettings,
@@ -79,6 +79,10 @@ def test_create_consumer_settings_with_minimum_environment_variables() -> None:
     assert settings.heartbeat_interval_ms == 15 * 1000
     assert settings.session_timeout_ms == 90 * 1000
     assert settings.retry_max_times == 0
+    assert settings.consume_mode == BrokerConsumeMode.SEQUENTIAL
+    assert settings.key_concurrency == 10
+    assert settings.commit_max_messages == 1
+    assert settings.commit_interval_ms == 0
 
 
 def test_create_consumer_settings_with_all_environment_variables() -> None:
@@ -94,6 +98,10 @@ def test_create_consumer_settings_with_all_environment_variables() -> None:
         'BROKER_HEARTBEAT_INTERVAL_MS': '30000',
         'BROKER_SESSION_TIMEOUT_MS': '120000',
         'BROKER_RETRY_MAX_TIMES': '2',
+        'BROKER_CONSUME_MODE': 'partition',
+        'BROKER_KEY_CONCURRENCY': '4',
+        'BROKER_COMMIT_MAX_MESSAGES': '50',
+        'BROKER_COMMIT_INTERVAL_MS': '1000',
     }
     with patch.dict(ENVIRONMENT_PATH, environment_variables):
         # act
@@ -109,6 +117,10 @@ def test_create_consumer_settings_with_all_environment_variables() -> None:
     assert settings.heartbeat_interval_ms == 30000
     assert settings.session_timeout_ms == 120000
     assert settings.retry_max_times == 2
+    assert settings.consume_mode == BrokerConsumeMode.PARTITION
+    assert settings.key_concurrency == 4
+    assert settings.commit_max_messages == 50
+    assert settings.commit_interval_ms == 1000
 
 
 def test_consumer_settings_parse_topics_then_return_list() -> None:
@@ -165,7 +177,7 @@ def test_consumer_settings_generate_dead_letter_queue_topics() -> None:
 
 
 def test_consumer_settings_get_topics_single_topic() -> None:
-    """Test getting topics for a single topic."""
+    """Test getting topics for a single topic, dead letter queue topics are not consumed by default."""
     # arrange
     environment_variables = {
         'BROKER_BOOTSTRAP_SERVERS': 'localhost:9092',
@@ -178,18 +190,19 @@ def test_consumer_settings_get_topics_single_topic() -> None:
         topics = settings.get_topics()
 
     # assert
-    expected_topics = ['test-topic', 'test-topic-DLQ']
+    expected_topics = ['test-topic']
     assert topics == expected_topics
 
 
 def test_consumer_settings_get_topics_multiple_topics_with_retry() -> None:
-    """Test getting topics for multiple topics with retry enabled."""
+    """Test getting topics for multiple topics with retry and dead letter queue enabled."""
     # arrange
     environment_variables = {
         'BROKER_BOOTSTRAP_SERVERS': 'localhost:9092',
         'BROKER_TOPICS': 'some-topic,another-topic',
         'BROKER_GROUP_ID': 'test-group',
         'BROKER_RETRY_MAX_TIMES': '2',
+        'BROKER_CONSUME_DEAD_LETTER_QUEUE': 'true',
     }
     with patch.dict(ENVIRONMENT_PATH, environment_variables):
         settings = BrokerKafkaConsumerSettings()
@@ -210,6 +223,103 @@ def test_consumer_settings_get_topics_multiple_topics_with_retry() -> None:
     assert topics == expected_topics
 
 
+def test_consumer_settings_get_topics_by_lane() -> None:
+    """Test getting the topics of each consumption lane."""
+    # arrange
+    environment_variables = {
+        'BROKER_BOOTSTRAP_SERVERS': 'localhost:9092',
+        'BROKER_TOPICS': 'some-topic',
+        'BROKER_GROUP_ID': 'test-group',
+        'BROKER_RETRY_MAX_TIMES': '2',
+        'BROKER_CONSUME_DEAD_LETTER_QUEUE': 'true',
+    }
+    with patch.dict(ENVIRONMENT_PATH, environment_variables):
+        settings = BrokerKafkaConsumerSettings()
+        # act
+        lanes = {lane: settings.get_topics(lane) for lane in BrokerConsumeLane}
+
+    # assert
+    assert lanes == {
+        BrokerConsumeLane.MAIN: ['some-topic'],
+        BrokerConsumeLane.RETRY: ['some-topic-RETRY-1', 'some-topic-RETRY-2'],
+        BrokerConsumeLane.DLQ: ['some-topic-DLQ'],
+    }
+
+
+def test_consumer_settings_lane_settings_then_apply_retry_lane_budget() -> None:
+    """Test the retry lane gets the retry lane budget and its own instance id, the main lane is unchanged."""
+    # arrange
+    environment_variables = {
+        'BROKER_BOOTSTRAP_SERVERS': 'localhost:9092',
+        'BROKER_TOPICS': 'some-topic',
+        'BROKER_GROUP_ID': 'test-group',
+        'BROKER_GROUP_INSTANCE_ID': 'instance',
+        'BROKER_MAX_POLL_RECORDS': '200',
+        'BROKER_RETRY_LANE_MAX_POLL_RECORDS': '20',
+        'BROKER_RETRY_LANE_CONCURRENCY': '2',
+    }
+    with patch.dict(ENVIRONMENT_PATH, environment_variables):
+        settings = BrokerKafkaConsumerSettings()
+        # act
+        main = settings.lane_settings(BrokerConsumeLane.MAIN)
+        retry = settings.lane_settings(BrokerConsumeLane.RETRY)
+
+    # assert
+    assert (main.max_poll_records, main.key_concurrency, main.group_instance_id) == (200, 10, 'instance')
+    assert (retry.max_poll_records, retry.key_concurrency, retry.handler_concurrency) == (20, 2, 2)
+    assert retry.group_instance_id == 'instance-retry'
+
+
+@pytest.mark.parametrize(
+    'retry_lane_rate, expected',
+    [
+        pytest.param(None, {'main': (100.0, None), 'retry': (100.0, None), 'dlq': (100.0, None)}, id='even-share'),
+        pytest.param('50', {'main': (200.0, None), 'retry': (50.0, None), 'dlq': (50.0, None)}, id='retry-lane-rate'),
+    ],
+)
+def test_consumer_settings_rate_limits_with_lanes_then_split_consumer_budget(
+    retry_lane_rate: str | None, expected: dict[str, tuple[float | None, float | None]]
+) -> None:
+    """Test the rate limits of the consumer are split between its lanes instead of applying to each lane."""
+    # arrange
+    environment_variables = {
+        'BROKER_BOOTSTRAP_SERVERS': 'localhost:9092',
+        'BROKER_TOPICS': 'some-topic',
+        'BROKER_GROUP_ID': 'test-group',
+        'BROKER_RETRY_MAX_TIMES': '1',
+        'BROKER_CONSUME_LANES': 'true',
+        'BROKER_CONSUME_DEAD_LETTER_QUEUE': 'true',
+        'BROKER_RATE_LIMIT_MESSAGES_PER_SECOND': '300',
+    }
+    if retry_lane_rate is not None:
+        environment_variables['BROKER_RETRY_LANE_RATE_LIMIT_MESSAGES_PER_SECOND'] = retry_lane_rate
+    with patch.dict(ENVIRONMENT_PATH, environment_variables):
+        settings = BrokerKafkaConsumerSettings()
+        # act
+        lanes = {lane.value: settings.lane_settings(lane).rate_limits(lane) for lane in BrokerConsumeLane}
+
+    # assert
+    assert lanes == expected
+    assert settings.rate_limits() == (300.0, None)
+
+
+def test_consumer_settings_retry_lane_rate_limits_above_consumer_budget_then_raise_error() -> None:
+    """Test the retry lane rate limits must leave a budget to the main lane."""
+    # arrange
+    environment_variables = {
+        'BROKER_BOOTSTRAP_SERVERS': 'localhost:9092',
+        'BROKER_TOPICS': 'some-topic',
+        'BROKER_GROUP_ID': 'test-group',
+        'BROKER_RETRY_MAX_TIMES': '1',
+        'BROKER_CONSUME_LANES': 'true',
+        'BROKER_RATE_LIMIT_BYTES_PER_SECOND': '1000',
+        'BROKER_RETRY_LANE_RATE_LIMIT_BYTES_PER_SECOND': '1000',
+    }
+    # act & assert
+    with patch.dict(ENVIRONMENT_PATH, environment_variables), pytest.raises(ValidationError):
+        BrokerKafkaConsumerSettings()
+
+
 def test_consumer_settings_validate_topics_names_valid() -> None:
     """Test topic name validation with valid names."""
     # arrange
@@ -351,6 +461,21 @@ def test_consumer_settings_validate_session_heartbeat_invalid() -> None:
         BrokerKafkaConsumerSettings()
 
 
+def test_consumer_settings_validate_in_flight_watermarks_invalid() -> None:
+    """Test in-flight watermarks validation with a low watermark not lower than the high watermark."""
+    # arrange
+    environment_variables = {
+        'BROKER_BOOTSTRAP_SERVERS': 'localhost:9092',
+        'BROKER_TOPICS': 'test-topic',
+        'BROKER_GROUP_ID': 'test-group',
+        'BROKER_IN_FLIGHT_HIGH_WATERMARK': '100',
+        'BROKER_IN_FLIGHT_LOW_WATERMARK': '100',
+    }
+    with patch.dict(ENVIRONMENT_PATH, environment_variables), pytest.raises(ValidationError):
+        # act
+        BrokerKafkaConsumerSettings()
+
+
 def test_producer_settings_create_with_valid_environment_variables() -> None:
     """Test creating producer settings with valid environment variables."""
     # arrange
@@ -395,6 +520,7 @@ def test_producer_settings_create_with_defaults() -> None:
     assert settings.bootstrap_servers == 'localhost:9092'
     assert settings.acks == BrokerKafkaAcks.ALL
     assert settings.connections_max_idle_ms == 10000
+    assert settings.profile == BrokerKafkaProducerProfile.LATENCY
 
 
 @pytest.mark.parametrize(
@@ -413,3 +539,86 @@ def test_producer_settings_parsed_acks(acks_value: str, expected_result: str | i
 
     # assert
     assert result == expected_result
+
+
+@pytest.mark.parametrize(
+    'profile,expected_profile',
+    [
+        pytest.param(
+            'latency',
+            {'compression_type': None, 'linger_ms': 0, 'max_batch_size': 16384, 'max_request_size': 1048576},
+            id='latency',
+        ),
+        pytest.param(
+            'balanced',
+            {'compression_type': None, 'linger_ms': 5, 'max_batch_size': 65536, 'max_request_size': 1048576},
+            id='balanced',
+        ),
+        pytest.param(
+            'throughput',
+            {'compression_type': 'gzip', 'linger_ms': 50, 'max_batch_size': 524288, 'max_request_size': 4194304},
+            id='throughput',
+        ),
+    ],
+)
+def test_producer_settings_parsed_profile(profile: str, expected_profile: dict[str, str | int | None]) -> None:
+    """Test parsed_profile method with each producer profile."""
+    # arrange
+    environment_variables = {'BROKER_BOOTSTRAP_SERVERS': 'localhost:9092', 'BROKER_PRODUCER_PROFILE': profile}
+    with patch.dict(ENVIRONMENT_PATH, environment_variables):
+        settings = BrokerKafkaProducerSettings()
+
+    # act
+    result = settings.parsed_profile()
+
+    # assert
+    assert settings.profile == BrokerKafkaProducerProfile(profile)
+    assert result == expected_profile
+
+
+def test_producer_settings_parsed_profile_with_overrides() -> None:
+    """Test parsed_profile method with options overriding the profile."""
+    # arrange
+    environment_variables = {
+        'BROKER_BOOTSTRAP_SERVERS': 'localhost:9092',
+        'BROKER_PRODUCER_PROFILE': 'throughput',
+        'BROKER_COMPRESSION_TYPE': 'lz4',
+        'BROKER_LINGER_MS': '10',
+    }
+    with patch.dict(ENVIRONMENT_PATH, environment_variables):
+        settings = BrokerKafkaProducerSettings()
+
+    # act
+    result = settings.parsed_profile()
+
+    # assert
+    assert result['compression_type'] == 'lz4'
+    assert result['linger_ms'] == 10
+    assert result['max_batch_size'] == 524288
+
+
+def test_producer_settings_parsed_transaction_then_enable_idempotence() -> None:
+    """Test parsed_transaction method enables the idempotent transactional producer."""
+    # arrange
+    environment_variables = {'BROKER_BOOTSTRAP_SERVERS': 'localhost:9092', 'BROKER_TRANSACTIONAL_ID': 'pipeline'}
+    with patch.dict(ENVIRONMENT_PATH, environment_variables):
+        settings = BrokerKafkaProducerSettings()
+
+    # act
+    result = settings.parsed_transaction()
+
+    # assert
+    assert result == {'transactional_id': 'pipeline', 'enable_idempotence': True}
+
+
+def test_producer_settings_transactional_without_acks_all_then_raise_error() -> None:
+    """Test a transactional producer requires acks all."""
+    # arrange
+    environment_variables = {
+        'BROKER_BOOTSTRAP_SERVERS': 'localhost:9092',
+        'BROKER_TRANSACTIONAL_ID': 'pipeline',
+        'BROKER_ACKS': '1',
+    }
+    with patch.dict(ENVIRONMENT_PATH, environment_variables), pytest.raises(ValidationError):
+        # act
+        BrokerKafkaProducerSettings()
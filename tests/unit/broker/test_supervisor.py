@@ -0,0 +1,140 @@
+import asyncio
+import os
+import time
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from solkit.broker.supervisor import BrokerSupervisor, _consume_worker, _set_group_instance_id, _set_transactional_id
+
+
+def build_process_mock(alive: bool = True) -> Mock:
+    """Build a worker process mock."""
+    process = Mock()
+    process.is_alive.return_value = alive
+    return process
+
+
+def test_broker_supervisor_supervise_then_restart_exited_workers() -> None:
+    """Test the supervise restarts only the workers that exited."""
+    # arrange
+    supervisor = BrokerSupervisor(AsyncMock(), workers=2)
+    supervisor._context = Mock()
+    crashed, running = build_process_mock(alive=False), build_process_mock()
+    supervisor._processes = {0: crashed, 1: running}
+    # act
+    supervisor._supervise()
+    # assert
+    crashed.close.assert_called_once()
+    supervisor._context.Process.assert_called_once()
+    supervisor._processes[0].start.assert_called_once()
+    assert supervisor._processes[1] is running
+
+
+def test_broker_supervisor_supervise_when_stopping_then_do_not_restart() -> None:
+    """Test the supervise does not restart workers once stopping."""
+    # arrange
+    supervisor = BrokerSupervisor(AsyncMock(), workers=1)
+    supervisor._context = Mock()
+    supervisor._processes = {0: build_process_mock(alive=False)}
+    supervisor.stop()
+    # act
+    supervisor._supervise()
+    # assert
+    supervisor._context.Process.assert_not_called()
+
+
+def test_broker_supervisor_supervise_crashing_worker_then_restart_after_backoff() -> None:
+    """Test a worker crashing again is only restarted once its backoff elapsed."""
+    # arrange
+    supervisor = BrokerSupervisor(AsyncMock(), workers=1, restart_backoff=60.0)
+    supervisor._context = Mock()
+    supervisor._context.Process.side_effect = lambda **_: build_process_mock(alive=False)
+    supervisor._processes = {0: build_process_mock(alive=False)}
+    supervisor._supervise()
+    # act
+    supervisor._supervise()
+    supervisor._supervise()
+    # assert
+    assert supervisor._context.Process.call_count == 1
+    assert supervisor._restart_at[0] > time.monotonic() + 55
+
+
+def test_broker_supervisor_restart_delay_then_double_up_to_max_and_reset_after_stable_run() -> None:
+    """Test the restart delay doubles with each crash up to its max, and resets once a worker ran long enough."""
+    # arrange
+    supervisor = BrokerSupervisor(AsyncMock(), workers=1, restart_backoff=1.0, restart_backoff_max=5.0)
+    supervisor._started_at = {0: time.monotonic()}
+    # act
+    delays = [supervisor._restart_delay(0) for _ in range(6)]
+    supervisor._started_at = {0: time.monotonic() - 5.0}
+    after_stable_run = supervisor._restart_delay(0)
+    # assert
+    assert delays == [0.0, 1.0, 2.0, 4.0, 5.0, 5.0]
+    assert after_stable_run == 0.0
+
+
+def test_broker_supervisor_shutdown_then_terminate_and_kill_stuck_workers() -> None:
+    """Test the shutdown terminates every worker and kills the ones still running after the timeout."""
+    # arrange
+    supervisor = BrokerSupervisor(AsyncMock(), workers=2, shutdown_timeout=0)
+    stopped = build_process_mock()
+    stopped.join.side_effect = lambda timeout=None: setattr(stopped.is_alive, 'return_value', False)
+    stuck = build_process_mock()
+    supervisor._processes = {0: stopped, 1: stuck}
+    # act
+    supervisor._shutdown()
+    # assert
+    stopped.terminate.assert_called_once()
+    stuck.terminate.assert_called_once()
+    stopped.kill.assert_not_called()
+    stuck.kill.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_broker_supervisor_consume_worker_when_cancelled_then_disconnect() -> None:
+    """Test a worker disconnects its adapter once its consumption is cancelled."""
+    # arrange
+    adapter = Mock()
+    adapter.connect = AsyncMock()
+    adapter.disconnect = AsyncMock()
+    repository = Mock()
+    repository.consume = AsyncMock(side_effect=asyncio.CancelledError())
+    handler = AsyncMock()
+    with patch('solkit.broker.supervisor.BrokerKafkaAdapter.config', return_value=adapter):
+        # act
+        await _consume_worker(handler, Mock(return_value=repository), 3)
+    # assert
+    adapter.connect.assert_awaited_once()
+    repository.consume.assert_awaited_once_with(handler, 3)
+    adapter.disconnect.assert_awaited_once()
+
+
+def test_broker_supervisor_set_group_instance_id_then_suffix_with_worker_index() -> None:
+    """Test each worker gets its own static membership instance id."""
+    # arrange
+    with patch.dict(os.environ, {'BROKER_GROUP_INSTANCE_ID': 'consumer'}):
+        # act
+        _set_group_instance_id(2)
+        # assert
+        assert os.environ['BROKER_GROUP_INSTANCE_ID'] == 'consumer-2'
+
+
+def test_broker_supervisor_set_group_instance_id_when_not_configured_then_keep_dynamic_membership() -> None:
+    """Test no instance id is set without static membership."""
+    # arrange
+    with patch.dict(os.environ, clear=True):
+        # act
+        _set_group_instance_id(0)
+        # assert
+        assert 'BROKER_GROUP_INSTANCE_ID' not in os.environ
+
+
+def test_broker_supervisor_set_transactional_id_then_suffix_with_worker_index() -> None:
+    """Test each worker gets its own transactional id."""
+    # arrange
+    with patch.dict(os.environ, {'BROKER_TRANSACTIONAL_ID': 'pipeline'}):
+        # act
+        _set_transactional_id(1)
+        # assert
+        assert os.environ['BROKER_TRANSACTIONAL_ID'] == 'pipeline-1'
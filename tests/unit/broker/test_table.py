@@ -0,0 +1,88 @@
+import asyncio
+from collections.abc import Callable
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+import pytest
+from aiokafka.structs import ConsumerRecord
+
+from solkit.broker.codecs import BrokerJsonCodec
+from solkit.broker.record import BrokerRecord
+from solkit.broker.table import BrokerTable, _read_snapshot, _write_snapshot
+
+
+async def load(message: ConsumerRecord) -> BrokerRecord:
+    """Wrap a consumer record with the JSON codec."""
+    return BrokerRecord(message, BrokerJsonCodec())
+
+
+def test_broker_table_snapshot_write_then_read_records_and_offsets(
+    tmp_path: Path, build_consumer_record: Callable[..., ConsumerRecord]
+) -> None:
+    """Test a snapshot reads back the partition offsets and the records with their headers."""
+    # arrange
+    path = tmp_path / 'table.snapshot'
+    messages = [
+        build_consumer_record(
+            'table', key=b'a', value=b'{"data": {"value": 1}}', offset=3, headers=[('X-Header', b'header')]
+        ),
+        build_consumer_record('table', key=b'b', value=b'', partition=1, offset=7),
+    ]
+    # act
+    _write_snapshot(path, {0: 4, 1: 8}, messages)
+    offsets, loaded = _read_snapshot(path, 'table')
+    # assert
+    assert offsets == {0: 4, 1: 8}
+    assert loaded == messages
+    assert not path.with_suffix('.tmp').exists()
+
+
+def test_broker_table_snapshot_invalid_file_then_raise(tmp_path: Path) -> None:
+    """Test reading a file which is not a table snapshot raises."""
+    # arrange
+    path = tmp_path / 'table.snapshot'
+    path.write_bytes(b'XXXX' + bytes(8))
+    # act
+    # assert
+    with pytest.raises(ValueError, match='Invalid table snapshot'):
+        _read_snapshot(path, 'table')
+
+
+@pytest.mark.asyncio
+async def test_broker_table_apply_then_keep_last_value_and_remove_tombstones(
+    build_consumer_record: Callable[..., ConsumerRecord],
+) -> None:
+    """Test the table keeps the last record of each key, removes tombstoned keys and skips keyless records."""
+    # arrange
+    table = BrokerTable(None, 'table', load)  # type: ignore
+    # act
+    await table._apply(build_consumer_record('table', key=b'a', value=b'{"data": {"value": 1}}', offset=0))
+    await table._apply(build_consumer_record('table', key=b'b', value=b'{"data": {"value": 2}}', offset=1))
+    await table._apply(build_consumer_record('table', key=b'a', value=b'{"data": {"value": 3}}', offset=2))
+    await table._apply(build_consumer_record('table', key=b'b', value=None, offset=3))
+    await table._apply(build_consumer_record('table', offset=4, key=None, value=b'{}'))
+    # assert
+    assert table.get('a') == {'value': 3}
+    assert table.get(b'b') is None
+    assert 'a' in table
+    assert 'b' not in table
+    assert len(table) == 1
+
+
+@pytest.mark.asyncio
+async def test_broker_table_stop_failed_follow_then_stop_consumer() -> None:
+    """Test stopping a table whose follow task failed still stops its consumer."""
+    # arrange
+    consumer = AsyncMock()
+    table = BrokerTable(consumer, 'table', load)
+
+    async def fail() -> None:
+        raise RuntimeError('follow failed')
+
+    table._task = asyncio.create_task(fail())
+    await asyncio.sleep(0)
+    # act
+    with pytest.raises(RuntimeError, match='follow failed'):
+        await table.stop()
+    # assert
+    consumer.stop.assert_awaited_once()
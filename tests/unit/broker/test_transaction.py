@@ -0,0 +1,126 @@
+from collections.abc import Callable
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from aiokafka import AIOKafkaConsumer, AIOKafkaProducer
+from aiokafka.structs import TopicPartition
+
+from solkit.broker.dedupe import BrokerDeduplicator
+from solkit.broker.metrics import BrokerMetrics
+from solkit.broker.transaction import BrokerTransactionCommitter
+
+PARTITION = TopicPartition('topic', 0)
+
+
+def build_transaction_committer(
+    max_messages: int = 10, interval_ms: int = 60000, metrics: BrokerMetrics | None = None
+) -> tuple[BrokerTransactionCommitter, AsyncMock, Mock]:
+    """Build a transaction committer with a producer and a consumer mock."""
+    producer = AsyncMock(spec=AIOKafkaProducer)
+    consumer = Mock(spec=AIOKafkaConsumer)
+    consumer.assignment.return_value = {PARTITION}
+    transaction = BrokerTransactionCommitter(producer, consumer, 'group', max_messages, interval_ms, metrics)
+    return transaction, producer, consumer
+
+
+@pytest.mark.asyncio
+async def test_broker_transaction_committer_batch_below_max_messages_then_keep_transaction_open(
+    build_consumer_record_mock: Callable[..., Mock],
+) -> None:
+    """Test batches below the max messages share the open transaction."""
+    # arrange
+    transaction, producer, _ = build_transaction_committer()
+    # act
+    for offset in range(2):
+        async with transaction.batch():
+            transaction.mark(PARTITION, [build_consumer_record_mock(PARTITION, offset)])
+    # assert
+    producer.begin_transaction.assert_awaited_once()
+    producer.commit_transaction.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_broker_transaction_committer_batch_max_messages_then_commit_offsets_in_transaction(
+    build_consumer_record_mock: Callable[..., Mock],
+) -> None:
+    """Test reaching the max messages sends the consumed offsets to the transaction and commits it."""
+    # arrange
+    metrics = BrokerMetrics()
+    transaction, producer, _ = build_transaction_committer(max_messages=3, metrics=metrics)
+    # act
+    async with transaction.batch():
+        transaction.mark(PARTITION, [build_consumer_record_mock(PARTITION, offset) for offset in range(3)])
+    # assert
+    producer.send_offsets_to_transaction.assert_awaited_once_with({PARTITION: 3}, 'group')
+    producer.commit_transaction.assert_awaited_once()
+    assert metrics.committed == {PARTITION: 3}
+
+
+@pytest.mark.asyncio
+async def test_broker_transaction_committer_batch_failure_then_abort_and_rewind(
+    build_consumer_record_mock: Callable[..., Mock],
+) -> None:
+    """Test a failed batch aborts the transaction and rewinds the partition to its first offset in it."""
+    # arrange
+    transaction, producer, consumer = build_transaction_committer()
+    async with transaction.batch():
+        transaction.mark(PARTITION, [build_consumer_record_mock(PARTITION, 5)])
+    # act
+    with pytest.raises(ValueError):
+        async with transaction.batch():
+            raise ValueError('failed')
+    # assert
+    producer.abort_transaction.assert_awaited_once()
+    producer.send_offsets_to_transaction.assert_not_awaited()
+    consumer.seek.assert_called_once_with(PARTITION, 5)
+
+
+@pytest.mark.asyncio
+async def test_broker_transaction_committer_flush_then_commit_open_transaction_only(
+    build_consumer_record_mock: Callable[..., Mock],
+) -> None:
+    """Test flushing commits the open transaction and does nothing without one."""
+    # arrange
+    transaction, producer, _ = build_transaction_committer()
+    async with transaction.batch():
+        transaction.mark(PARTITION, [build_consumer_record_mock(PARTITION, 0)])
+    # act
+    await transaction.flush({PARTITION})
+    await transaction.flush()
+    # assert
+    producer.commit_transaction.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_broker_transaction_committer_flush_if_due_after_interval_then_commit() -> None:
+    """Test an open transaction is committed once its interval elapsed, even without new messages."""
+    # arrange
+    transaction, producer, _ = build_transaction_committer(interval_ms=1)
+    async with transaction.batch():
+        pass
+    transaction._begun -= 1
+    # act
+    await transaction.flush_if_due()
+    # assert
+    producer.commit_transaction.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_broker_transaction_committer_with_deduplicator_then_mark_seen_only_once_committed(
+    build_consumer_record_mock: Callable[..., Mock],
+) -> None:
+    """Test the messages of a transaction join the seen-set once committed, never when aborted."""
+    # arrange
+    transaction, producer, _ = build_transaction_committer(max_messages=1)
+    transaction._deduplicator = deduplicator = BrokerDeduplicator(AsyncMock(), group_id='group')
+    aborted, committed = build_consumer_record_mock(PARTITION, 0), build_consumer_record_mock(PARTITION, 0)
+    producer.commit_transaction.side_effect = [RuntimeError('commit failed'), None]
+    # act
+    with pytest.raises(RuntimeError):
+        async with transaction.batch():
+            transaction.mark(PARTITION, [aborted])
+    async with transaction.batch():
+        transaction.mark(PARTITION, [committed])
+    # assert
+    producer.abort_transaction.assert_awaited_once()
+    deduplicator._cache.set_keys.assert_awaited_once_with({'broker:dedupe:group:topic:0:0': '1'}, ttl=86400)  # type: ignore
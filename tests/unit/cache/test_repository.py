@@ -105,6 +105,34 @@ async def test_cache_repository_get_key(cache_adapter: CacheAdapter) -> None:
     cache_adapter_mock.get.assert_awaited_once_with(key)
 
 
+@pytest.mark.asyncio
+async def test_cache_repository_set_bytes_then_set_raw_value_with_ttl(cache_adapter: CacheAdapter) -> None:
+    """Test the set bytes method stores the value as is, with its ttl in the same command."""
+    # arrange
+    cache_adapter_mock = AsyncMock(spec=cache_adapter)
+    cache_adapter_mock.set = AsyncMock(return_value=True)
+    cache_repository = CacheRepository(cache_session=cache_adapter_mock)
+    # act
+    result = await cache_repository.set_bytes('key', b'\x00value', ttl=10)
+    # assert
+    assert result is True
+    cache_adapter_mock.set.assert_awaited_once_with('key', b'\x00value', ex=10)
+
+
+@pytest.mark.asyncio
+async def test_cache_repository_get_bytes_then_return_raw_value(cache_adapter: CacheAdapter) -> None:
+    """Test the get bytes method returns the value without decoding it."""
+    # arrange
+    cache_adapter_mock = AsyncMock(spec=cache_adapter)
+    cache_adapter_mock.get = AsyncMock(return_value=b'\x00value')
+    cache_repository = CacheRepository(cache_session=cache_adapter_mock)
+    # act
+    result = await cache_repository.get_bytes('key')
+    # assert
+    assert result == b'\x00value'
+    cache_adapter_mock.get.assert_awaited_once_with('key')
+
+
 @pytest.mark.asyncio
 async def test_cache_repository_exists_key(cache_adapter: CacheAdapter) -> None:
     """Test the exists key method."""
@@ -120,6 +148,63 @@ async def test_cache_repository_exists_key(cache_adapter: CacheAdapter) -> None:
     cache_adapter_mock.exists.assert_awaited_once_with(key)
 
 
+@pytest.mark.asyncio
+async def test_cache_repository_set_keys_then_use_a_single_pipeline(cache_adapter: CacheAdapter) -> None:
+    """Test the set keys method."""
+    # arrange
+    pipeline_mock = Mock()
+    pipeline_mock.execute = AsyncMock(return_value=[True, True])
+    cache_adapter_mock = AsyncMock(spec=cache_adapter)
+    cache_adapter_mock.pipeline = Mock(return_value=pipeline_mock)
+    cache_repository = CacheRepository(cache_session=cache_adapter_mock)
+    # act
+    result = await cache_repository.set_keys({'key-1': 'value', 'key-2': 'value'}, ttl=60)
+    # assert
+    assert result is True
+    cache_adapter_mock.pipeline.assert_called_once_with(transaction=False)
+    pipeline_mock.set.assert_any_call('key-1', b'value', ex=60)
+    pipeline_mock.set.assert_any_call('key-2', b'value', ex=60)
+    pipeline_mock.execute.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_cache_repository_increment_key_then_increment_and_expire_in_a_single_pipeline(
+    cache_adapter: CacheAdapter,
+) -> None:
+    """Test the increment key method."""
+    # arrange
+    pipeline_mock = Mock()
+    pipeline_mock.execute = AsyncMock(return_value=[7, True])
+    cache_adapter_mock = AsyncMock(spec=cache_adapter)
+    cache_adapter_mock.pipeline = Mock(return_value=pipeline_mock)
+    cache_repository = CacheRepository(cache_session=cache_adapter_mock)
+    # act
+    result = await cache_repository.increment_key('key', 5, ttl=2)
+    # assert
+    assert result == 7
+    pipeline_mock.incrby.assert_called_once_with('key', 5)
+    pipeline_mock.expire.assert_called_once_with('key', 2)
+    pipeline_mock.execute.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_cache_repository_exists_keys_then_use_a_single_pipeline(cache_adapter: CacheAdapter) -> None:
+    """Test the exists keys method."""
+    # arrange
+    pipeline_mock = Mock()
+    pipeline_mock.execute = AsyncMock(return_value=[1, 0])
+    cache_adapter_mock = AsyncMock(spec=cache_adapter)
+    cache_adapter_mock.pipeline = Mock(return_value=pipeline_mock)
+    cache_repository = CacheRepository(cache_session=cache_adapter_mock)
+    # act
+    result = await cache_repository.exists_keys('key-1', 'key-2')
+    # assert
+    assert result == [True, False]
+    cache_adapter_mock.pipeline.assert_called_once_with(transaction=False)
+    assert pipeline_mock.exists.call_count == 2
+    pipeline_mock.execute.assert_awaited_once()
+
+
 @pytest.mark.asyncio
 async def test_cache_repository_delete_key(cache_adapter: CacheAdapter) -> None:
     """Test the delete key method."""